@@ -26,6 +26,7 @@ SECRET_KEY = 'django-insecure-p8vrg(e$0yt7-4e@w$)lytk9_!cdb_@yf8ko9o5em+yad23ga0
 DEBUG = True
 
 import os
+import sys
 
 # Application definition
 
@@ -50,6 +51,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'personnel.middleware.ProfilerMiddleware',
+    'personnel.middleware.AuditUserMiddleware',
+    'personnel.middleware.ReplicaRoutingMiddleware',
+    'personnel.middleware.QueryDetectorMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -90,6 +95,13 @@ if os.environ.get('DB_NAME'):
             'PORT': os.environ.get('DB_PORT'),
         }
     }
+    # Read replicas: DB_REPLICA_HOSTS=host1,host2 (same credentials as the primary)
+    for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+        DATABASES[f'replica{index}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
 else:
     DATABASES = {
         'default': {
@@ -97,6 +109,121 @@ else:
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+    # SQLITE_REPLICA=1 adds a second alias on the same file to exercise replica routing locally
+    if os.environ.get('SQLITE_REPLICA'):
+        DATABASES['replica1'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+# Safe API requests read from replicas; writes and everything else use 'default'
+DATABASE_ROUTERS = ['personnel.db_router.ReplicaRouter']
+DATABASE_REPLICA_APPS = ['personnel']
+REPLICA_PATH_PREFIXES = ['/api/']
+# Seconds a client that just wrote keeps reading from the primary
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+RUNNING_TESTS = sys.argv[1:2] == ['test']
+
+# Cache
+# Must be shared by every process (web workers, run_worker, import_snapshot, apply_changes):
+# cached dossiers and dashboards and the autocomplete index are invalidated through it.
+# Files under BASE_DIR/.cache by default; point CACHE_BACKEND/CACHE_LOCATION at e.g.
+# memcached or redis when the processes run on several hosts. A process-local backend
+# (LocMemCache) is refused at start-up unless ALLOW_PROCESS_LOCAL_CACHE is set, as in tests.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache' if RUNNING_TESTS
+            else 'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'pms-default' if RUNNING_TESTS else str(BASE_DIR / '.cache')),
+    }
+}
+ALLOW_PROCESS_LOCAL_CACHE = bool(os.environ.get('ALLOW_PROCESS_LOCAL_CACHE')) or RUNNING_TESTS
+
+# Seconds a personnel dossier stays cached (it is also invalidated on change)
+DOSSIER_CACHE_TIMEOUT = int(os.environ.get('DOSSIER_CACHE_TIMEOUT', 300))
+
+# Seconds the /api/dashboard/ figures stay cached (they are also invalidated on change)
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 60))
+
+# How often (seconds) each process checks the cache for personnel changes made by
+# other processes before answering /api/personnel/autocomplete/
+AUTOCOMPLETE_VERSION_CHECK_SECONDS = 1
+# Rebuild each process's index from the database at least this often (seconds), in case
+# a change notice in the cache was lost
+AUTOCOMPLETE_MAX_AGE_SECONDS = 900
+
+# Upper bound on records accepted by POST /api/personnel/bulk/
+PERSONNEL_BULK_MAX_RECORDS = int(os.environ.get('PERSONNEL_BULK_MAX_RECORDS', 1000))
+
+# Upper bound on sub-requests in one POST /api/batch/
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+
+
+# Guard duty roster solver rules - overrides personnel.rostering.DEFAULT_ROSTER_RULES
+ROSTER_RULES = {}
+
+# Longest horizon (in days) the roster solver accepts per request
+ROSTER_MAX_HORIZON_DAYS = 92
+
+# Background jobs (python manage.py run_worker): a RUNNING job without a heartbeat for
+# this long is assumed to belong to a dead worker and is re-queued
+JOB_STALE_AFTER_SECONDS = 600
+# How often a worker refreshes the heartbeat of the job it is running
+JOB_HEARTBEAT_SECONDS = 60
+JOB_MAX_ATTEMPTS = 3
+
+# History archival (personnel.archive): guard duties and finished leave older than
+# these many days move to archive tables; the job worker queues it daily
+ARCHIVE_DAILY = os.environ.get('ARCHIVE_DAILY', '1') not in ('0', 'false', '')
+ARCHIVE_GUARD_DUTY_AFTER_DAYS = int(os.environ.get('ARCHIVE_GUARD_DUTY_AFTER_DAYS', 365))
+ARCHIVE_LEAVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_LEAVE_AFTER_DAYS', 730))
+
+
+# Retirement rule: whichever of these comes first
+RETIREMENT_AGE = 60
+RETIREMENT_SERVICE_YEARS = 35
+
+# Minimum whole years in rank before promotion, per rank code; overrides
+# personnel.services.DEFAULT_PROMOTION_MIN_YEARS
+PROMOTION_MIN_YEARS = {}
+# The job worker rebuilds the promotion board once a day
+PROMOTIONS_DAILY = os.environ.get('PROMOTIONS_DAILY', '1') not in ('0', 'false', '')
+
+
+# Audit trail: entries are buffered in-process and written in batches
+AUDIT_ENABLED = True
+AUDIT_ASYNC = True
+AUDIT_FLUSH_INTERVAL_MS = 200
+AUDIT_BUFFER_SIZE = 500
+
+# Leave entitlements in working days per year, overriding
+# personnel.leave_ledger.DEFAULT_LEAVE_ENTITLEMENTS, e.g. {'ANNUAL': {'default': 30, 'DII': 21}}
+LEAVE_ENTITLEMENTS = {}
+# Weekdays (Monday=0) that are not working days; public holidays are kept in the Holiday table
+LEAVE_WEEKEND_DAYS = [5, 6]
+
+# Multi-site replication: this instance's site code (prefixes replicated keys) and the
+# default conflict rule for apply_changes ('field' merge or record-level 'lww')
+SITE_CODE = os.environ.get('SITE_CODE', 'HQ')
+REPLICATION_ENABLED = True
+REPLICATION_STRATEGY = 'field'
+
+# Development N+1 detector (personnel.query_detector): log query shapes a request repeats
+# more than QUERY_DETECTOR_THRESHOLD times; under `manage.py test` it is on and raises
+QUERY_DETECTOR_ENABLED = bool(os.environ.get('QUERY_DETECTOR_ENABLED')) or RUNNING_TESTS
+QUERY_DETECTOR_THRESHOLD = int(os.environ.get('QUERY_DETECTOR_THRESHOLD', 5))
+QUERY_DETECTOR_RAISE = bool(os.environ.get('QUERY_DETECTOR_RAISE')) or RUNNING_TESTS
+
+# Staff-only request profiler (personnel.profiler): ?_profile=1 or X-Profile: 1 returns a
+# sampled flame-graph profile and SQL timeline; PROFILER_KEEP saves the last N under MEDIA_ROOT
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '1') not in ('0', 'false', '')
+PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 1))
+PROFILER_KEEP = int(os.environ.get('PROFILER_KEEP', 0))
+
+# Warm up URL resolution, serializers and reference-data caches when the WSGI app is
+# loaded (personnel.warmup); with gunicorn's preload_app this runs once, before forking
+WARM_UP_ON_START = bool(os.environ.get('WARM_UP_ON_START'))
 
 
 # Password validation
@@ -135,6 +262,12 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded personnel photos/documents (content-addressed, see personnel.attachments)
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+ATTACHMENT_MAX_BYTES = int(os.environ.get('ATTACHMENT_MAX_BYTES', 10 * 1024 * 1024))
+# Thumbnail sizes (longest side, px) generated in the background for images
+ATTACHMENT_THUMBNAIL_SIZES = [64, 256]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
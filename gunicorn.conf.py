@@ -0,0 +1,26 @@
+"""
+Gunicorn settings (read automatically from the working directory).
+
+With GUNICORN_PRELOAD=1 the Django app is imported once in the master and
+workers are forked from it, so a worker started after a crash or max_requests
+recycle does not repeat the imports. Combine with WARM_UP_ON_START=1 to also
+prime URL resolution, serializers and reference-data caches before forking.
+Preloaded code is not reloaded on HUP; deploy new code with USR2 or a restart.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+# Gunicorn's default (1 worker) unless set: each worker holds its own autocomplete
+# index and, on SQLite, is one more writer
+if os.environ.get('GUNICORN_WORKERS'):
+    workers = int(os.environ['GUNICORN_WORKERS'])
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+
+def post_fork(server, worker):
+    # Never share the master's database sockets with a worker
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
@@ -1,14 +1,20 @@
 from django.contrib import admin
-from .models import Personnel, Section, Assignment, CareerProgression, Qualification, GuardDutyRoster, Leave, Department, Designation
-from .services import generate_roster_pdf
+from .models import (
+    Personnel, Section, Assignment, CareerProgression, Qualification, GuardDutyRoster, Leave, Department,
+    Designation, Job, Holiday, LeaveBalance, LeaveUsage, Attachment
+)
+from .jobs import enqueue
+from .services import completed_years
 from django.http import HttpResponse
 from django.urls import path
 from django.utils.html import format_html
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'section_count')
+    list_display = ('name', 'head', 'section_count')
+    list_select_related = ('head',)
     search_fields = ('name',)
+    raw_id_fields = ('head',)
 
     def section_count(self, obj):
         return obj.sections.count()
@@ -33,6 +39,7 @@ class SectionAdmin(admin.ModelAdmin):
 @admin.register(Designation)
 class DesignationAdmin(admin.ModelAdmin):
     list_display = ('name', 'section', 'get_department')
+    list_select_related = ('section__department',)
     list_filter = ('section__department', 'section')
     search_fields = ('name', 'section__name')
 
@@ -49,6 +56,8 @@ class PersonnelAdmin(admin.ModelAdmin):
 @admin.register(Assignment)
 class AssignmentAdmin(admin.ModelAdmin):
     list_display = ('personnel', 'disposition', 'section', 'designation', 'sub_unit', 'date_of_posting', 'status')
+    # Section and Designation __str__ reach through to department/section
+    list_select_related = ('personnel', 'section__department', 'designation__section')
     list_filter = ('status', 'section', 'designation', 'date_of_posting')
     search_fields = ('personnel__service_number', 'personnel__last_name', 'disposition')
 
@@ -56,6 +65,18 @@ class AssignmentAdmin(admin.ModelAdmin):
 class CareerProgressionAdmin(admin.ModelAdmin):
     list_display = ('personnel', 'current_rank', 'command_last_served', 'years_in_service')
     search_fields = ('personnel__service_number', 'personnel__last_name')
+    list_select_related = ('personnel',)
+
+    def get_queryset(self, request):
+        # Years in service is derived from the enlistment date, not stored
+        return super().get_queryset(request).annotate(
+            service_years=completed_years('personnel__date_of_enlistment')
+        )
+
+    def years_in_service(self, obj):
+        return obj.service_years
+    years_in_service.short_description = 'Years in Service'
+    years_in_service.admin_order_field = 'service_years'
 
 @admin.register(Qualification)
 class QualificationAdmin(admin.ModelAdmin):
@@ -69,6 +90,33 @@ class LeaveAdmin(admin.ModelAdmin):
     search_fields = ('personnel__service_number', 'personnel__first_name', 'personnel__last_name')
     readonly_fields = ('requested_date', 'approved_date', 'days_count')
 
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ('date', 'name')
+    date_hierarchy = 'date'
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = ('personnel', 'leave_type', 'year', 'entitlement', 'taken', 'reserved', 'remaining')
+    list_filter = ('year', 'leave_type')
+    search_fields = ('personnel__service_number', 'personnel__last_name')
+    readonly_fields = ('personnel', 'leave_type', 'year', 'entitlement', 'taken', 'reserved')
+
+@admin.register(LeaveUsage)
+class LeaveUsageAdmin(admin.ModelAdmin):
+    list_display = ('month', 'leave_type', 'section', 'rank', 'leaves', 'days')
+    list_filter = ('leave_type', 'rank')
+    date_hierarchy = 'month'
+    readonly_fields = ('month', 'leave_type', 'section', 'rank', 'leaves', 'days')
+
+@admin.register(Attachment)
+class AttachmentAdmin(admin.ModelAdmin):
+    list_display = ('personnel', 'kind', 'file_name', 'uploaded_by', 'uploaded_at')
+    list_filter = ('kind',)
+    list_select_related = ('personnel', 'uploaded_by')
+    search_fields = ('personnel__service_number', 'personnel__last_name', 'file_name')
+    readonly_fields = ('personnel', 'kind', 'file', 'file_name', 'uploaded_by', 'uploaded_at')
+
 @admin.register(GuardDutyRoster)
 class GuardDutyRosterAdmin(admin.ModelAdmin):
     list_display = ('date', 'shift_type', 'personnel')
@@ -84,11 +132,24 @@ class GuardDutyRosterAdmin(admin.ModelAdmin):
         return custom_urls + urls
 
     def generate_report_view(self, request):
-        # Placeholder for report generation
-        # For now, just return a simple text response
-        # In real app, calculate dates based on request or default to this week
+        # Report generation runs in the background worker; this just queues it
         from django.utils import timezone
         today = timezone.now().date()
-        result = generate_roster_pdf(today, today + timezone.timedelta(days=7))
-        return HttpResponse(result, content_type="text/plain")
-
+        end_date = today + timezone.timedelta(days=7)
+        job = enqueue(
+            'roster.report',
+            {'from': today, 'to': end_date},
+            user=request.user,
+        )
+        return HttpResponse(
+            f"Report queued as job {job.id} ({job.get_status_display()}).\n"
+            f"Poll /api/jobs/{job.id}/ and download from /api/jobs/{job.id}/artifact/ when it has finished.",
+            content_type="text/plain"
+        )
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'progress', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'started_at', 'heartbeat_at', 'finished_at', 'worker', 'attempts')
+    exclude = ('artifact',)
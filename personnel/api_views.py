@@ -1,29 +1,180 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, mixins, permissions
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
-from .models import Personnel, Assignment, Section, Leave
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
+from .models import (
+    Personnel, Assignment, Section, Leave, GuardDutyRoster, Job, RosterChange,
+    PromotionEligibility, AuditEntry, LeaveBalance, Attachment, StoredFile, VersionConflictError,
+    ArchivedGuardDuty, ArchivedLeave
+)
 from .serializers import (
-    PersonnelSerializer, PersonnelCreateUpdateSerializer, 
-    SectionSerializer, LeaveSerializer, LeaveCreateUpdateSerializer
+    PersonnelSerializer, PersonnelCreateUpdateSerializer, PersonnelAsOfSerializer,
+    SectionSerializer, LeaveSerializer, LeaveCreateUpdateSerializer,
+    GuardDutyRosterSerializer, JobSerializer, RosterChangeSerializer,
+    PromotionEligibilitySerializer, AuditEntrySerializer, LeaveBalanceSerializer, AttachmentSerializer
+)
+from django.conf import settings
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from .services import (
+    DOSSIER_SECTIONS, get_personnel_dossier, bulk_upsert_personnel,
+    compute_roster_fairness, retirement_forecast, personnel_as_of, org_tree,
+    dashboard_summary
+)
+from .rostering import solve_roster, validate_roster_rules
+from .jobs import enqueue, request_key
+from .leave_ledger import get_entitlement
+from .leave_usage import DIMENSIONS as LEAVE_USAGE_DIMENSIONS, leave_usage_report
+from .command_chain import chain_entry, chain_of, subordinates
+from .batch import BatchError, run_batch
+from .archive import guard_duties_reach_archive, leaves_reach_archive, merge_ordered
+from . import autocomplete, profiler
+from .db_router import query_load, reset_query_load
+from .attachments import (
+    AttachmentError, attach, delete_attachment, file_path, thumbnail_path, with_photo
 )
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+
+
+# Service numbers contain slashes (e.g. NA/11/3022). Segments after the first start
+# with a digit, so they cannot be confused with action names like /dossier/.
+SERVICE_NUMBER_REGEX = r'[^/.]+(?:/[0-9][^/.]*)*'
+
+
+class StandardPagination(PageNumberPagination):
+    """Opt-in page-number pagination (?page=, ?page_size=) for large listings"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def parse_date_param(request, name, default=None):
+    """Read a YYYY-MM-DD query parameter; raises ValueError naming the parameter if malformed"""
+    value = request.query_params.get(name, None)
+    if not value:
+        return default
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date for '{name}': {value} (expected YYYY-MM-DD)")
+    return parsed
+
+def parse_if_match(request):
+    """The version named by an If-Match header ("3" or W/"3"); None if absent or '*'"""
+    header = request.headers.get('If-Match', '').strip()
+    if not header or header == '*':
+        return None
+    tag = header.split(',')[0].strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise ValidationError({'error': f"Invalid If-Match header: {header} (expected the ETag of a record)"})
+
+
+class VersionedViewSetMixin:
+    """
+    Optimistic concurrency for viewsets over VersionedMixin models. Detail
+    responses carry the record's version as ETag. On writes and deletes, an If-Match
+    header makes the change conditional on that version. When it loses to another
+    change, the response is 409 (412 for a stale If-Match) with the current record.
+    """
+    # Serializer used to return the current state on a conflict
+    current_serializer_class = None
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method not in permissions.SAFE_METHODS:
+            version = parse_if_match(self.request)
+            if version is not None:
+                instance.expect_version(version)
+        return instance
+
+    def perform_destroy(self, instance):
+        """Delete only the version that was loaded (or named by If-Match)"""
+        expected = instance.__dict__.pop('_expected_version', instance.version)
+        label = instance._meta.label
+        _, deleted = type(instance).objects.filter(pk=instance.pk, version=expected).delete()
+        if not deleted.get(label):
+            raise VersionConflictError(instance, expected)
+
+    def handle_exception(self, exc):
+        if not isinstance(exc, VersionConflictError):
+            return super().handle_exception(exc)
+        current = self.get_queryset().filter(pk=exc.instance.pk).first()
+        response = Response(
+            {
+                'error': 'This record was changed by someone else; review the current version and try again',
+                'current': self.current_serializer_class(current, context=self.get_serializer_context()).data
+                if current else None,
+            },
+            status=status.HTTP_412_PRECONDITION_FAILED if parse_if_match(self.request) is not None
+            else status.HTTP_409_CONFLICT,
+        )
+        if current:
+            response['ETag'] = f'"{current.version}"'
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        data = getattr(response, 'data', None)
+        if self.detail and response.status_code < 300 and isinstance(data, dict) and 'version' in data:
+            response['ETag'] = f'"{data["version"]}"'
+        return response
+
 
-class PersonnelViewSet(viewsets.ModelViewSet):
+class PersonnelViewSet(VersionedViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Personnel with search and filter capabilities
     """
     queryset = Personnel.objects.all()
+    current_serializer_class = PersonnelSerializer
+    lookup_value_regex = SERVICE_NUMBER_REGEX
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['service_number', 'first_name', 'last_name', 'rank']
     ordering_fields = ['service_number', 'last_name', 'date_of_enlistment']
     ordering = ['last_name']  # Default ordering
 
+    def get_as_of(self):
+        """?as_of=YYYY-MM-DD switches list/retrieve to the historical view"""
+        try:
+            return parse_date_param(self.request, 'as_of')
+        except ValueError as exc:
+            raise ValidationError({'error': str(exc)})
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        as_of = self.get_as_of() if self.action in ['list', 'retrieve'] else None
+        if self.action in ['list', 'retrieve']:
+            queryset = with_photo(queryset)
+        if as_of:
+            queryset = personnel_as_of(queryset, as_of)
+        elif self.action == 'list':
+            # PersonnelSerializer reads section and status from the latest assignments
+            queryset = queryset.prefetch_related(Prefetch(
+                'assignments', queryset=Assignment.objects.select_related('section').order_by('-date_of_posting')
+            ))
+        return queryset
+
     def get_serializer_class(self):
         """Use different serializers for read vs write operations"""
         if self.action in ['create', 'update', 'partial_update']:
             return PersonnelCreateUpdateSerializer
+        if self.action in ['list', 'retrieve'] and self.get_as_of():
+            return PersonnelAsOfSerializer
         return PersonnelSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ['list', 'retrieve']:
+            context['as_of'] = self.get_as_of()
+        return context
+
     def create(self, request, *args, **kwargs):
         """Create new personnel with proper error handling"""
         serializer = self.get_serializer(data=request.data)
@@ -35,18 +186,137 @@ class PersonnelViewSet(viewsets.ModelViewSet):
             return Response(read_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create or update many personnel in one request.
+        Body is a list of records in the create/update format; invalid rows are
+        reported by index and the valid rows are still written.
+        """
+        records = request.data
+        if not isinstance(records, list):
+            return Response(
+                {'error': 'Expected a list of personnel records'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_records = getattr(settings, 'PERSONNEL_BULK_MAX_RECORDS', 1000)
+        if len(records) > max_records:
+            return Response(
+                {'error': f'At most {max_records} records per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = bulk_upsert_personnel(records)
+        if result['errors'] and not (result['created'] or result['updated'] or result['unchanged']):
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif result['errors']:
+            response_status = status.HTTP_200_OK
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response(result, status=response_status)
+
+    @action(detail=True, methods=['get'], url_path='leave-balances')
+    def leave_balances(self, request, pk=None):
+        """Entitlement, taken, reserved and remaining working days per leave type for ?year= (default this year)"""
+        personnel = self.get_object()
+        try:
+            year = int(request.query_params.get('year', timezone.now().year))
+        except ValueError:
+            return Response({'error': "'year' must be a whole number"}, status=status.HTTP_400_BAD_REQUEST)
+        balances = {
+            balance.leave_type: balance
+            for balance in LeaveBalance.objects.filter(personnel=personnel, year=year)
+        }
+        # Types without a ledger row yet have nothing taken or reserved
+        rows = [
+            balances.get(leave_type) or LeaveBalance(
+                personnel=personnel, leave_type=leave_type, year=year,
+                entitlement=get_entitlement(leave_type, personnel.rank),
+            )
+            for leave_type, _ in Leave.LEAVE_TYPE_CHOICES
+        ]
+        return Response(LeaveBalanceSerializer(rows, many=True).data)
+
+    @action(detail=True, methods=['get', 'post'], parser_classes=[MultiPartParser, FormParser])
+    def attachments(self, request, pk=None):
+        """
+        GET lists the person's photos and documents; POST uploads one
+        (multipart: file, kind=PHOTO|DOCUMENT, description).
+        """
+        personnel = self.get_object()
+        if request.method == 'GET':
+            attachments = personnel.attachments.select_related('file')
+            return Response(AttachmentSerializer(attachments, many=True, context={'request': request}).data)
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': "A 'file' is required"}, status=status.HTTP_400_BAD_REQUEST)
+        kind = request.data.get('kind', 'DOCUMENT').upper()
+        if kind not in dict(Attachment.KIND_CHOICES):
+            return Response({'error': f"Unknown kind '{kind}'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            attachment = attach(personnel, upload, kind, request.data.get('description', ''), request.user)
+        except AttachmentError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            AttachmentSerializer(attachment, context={'request': request}).data, status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=['get'])
+    def chain(self, request, pk=None):
+        """The person's chain of command, direct superior first, up to their department head"""
+        chain = chain_of(pk)
+        if not chain and not Personnel.objects.filter(pk=pk).exists():
+            return Response({'error': 'Personnel not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(chain)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Type-ahead for personnel pickers: ?q=<prefix of service number or names>&limit=10"""
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response({'error': "'limit' must be a whole number"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(autocomplete.search(request.query_params.get('q', ''), max(limit, 1)))
+
+    @action(detail=True, methods=['get'])
+    def dossier(self, request, pk=None):
+        """
+        Full profile in one response: personnel record plus assignments, career history,
+        qualifications, leaves and guard duties.
+        Use ?include=assignments,leaves to return only some sections.
+        """
+        include = None
+        include_param = request.query_params.get('include', None)
+        if include_param:
+            include = {item.strip() for item in include_param.split(',') if item.strip()}
+            unknown = include - set(DOSSIER_SECTIONS)
+            if unknown:
+                return Response(
+                    {'error': f"Unknown sections: {', '.join(sorted(unknown))}",
+                     'sections': list(DOSSIER_SECTIONS)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        try:
+            dossier = get_personnel_dossier(pk, include)
+        except Personnel.DoesNotExist:
+            return Response({'error': 'Personnel not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(dossier)
+
 class SectionViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Read-only ViewSet for Sections - used for dropdowns
     """
-    queryset = Section.objects.all()
+    queryset = Section.objects.select_related('department')
     serializer_class = SectionSerializer
 
-class LeaveViewSet(viewsets.ModelViewSet):
+class LeaveViewSet(VersionedViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Leave management with approve/reject actions
     """
     queryset = Leave.objects.all()
+    current_serializer_class = LeaveSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['personnel__service_number', 'personnel__first_name', 'personnel__last_name']
     ordering_fields = ['requested_date', 'start_date', 'status']
@@ -60,8 +330,10 @@ class LeaveViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filter queryset based on query parameters"""
-        queryset = Leave.objects.all()
-        
+        return self.filter_leaves(Leave.objects.select_related('personnel', 'approved_by'))
+
+    def filter_leaves(self, queryset):
+        """The query parameter filters, for Leave or ArchivedLeave"""
         # Filter by status
         status_param = self.request.query_params.get('status', None)
         if status_param:
@@ -81,6 +353,22 @@ class LeaveViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(end_date__lte=end_date)
         
         return queryset
+
+    def list(self, request, *args, **kwargs):
+        """Date-filtered listings that reach back past the hot table include archived leave"""
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            start_date = parse_date(request.query_params.get('start_date') or '')
+            end_date = parse_date(request.query_params.get('end_date') or '')
+        except ValueError:
+            start_date = end_date = None
+        if not leaves_reach_archive(start_date, end_date):
+            return Response(self.get_serializer(queryset, many=True).data)
+        archived = self.filter_queryset(
+            self.filter_leaves(ArchivedLeave.objects.select_related('personnel', 'approved_by'))
+        )
+        ordering = filters.OrderingFilter().get_ordering(request, queryset, self)
+        return Response(self.get_serializer(merge_ordered(queryset, archived, ordering), many=True).data)
     
     def create(self, request, *args, **kwargs):
         """Create new leave request"""
@@ -143,3 +431,442 @@ class LeaveViewSet(viewsets.ModelViewSet):
         
         serializer = LeaveSerializer(leave)
         return Response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Mark an approved leave as completed (the person resumes duty)"""
+        leave = self.get_object()
+
+        if leave.status != 'APPROVED':
+            return Response(
+                {'error': 'Only approved leaves can be completed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        leave.complete()
+
+        serializer = LeaveSerializer(leave)
+        return Response(serializer.data)
+
+class GuardDutyRosterViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only ViewSet for guard duty rosters, filterable by ?from=&to= dates
+    """
+    queryset = GuardDutyRoster.objects.select_related('personnel')
+    serializer_class = GuardDutyRosterSerializer
+
+    def get_queryset(self):
+        """Filter queryset by date range"""
+        return self.filter_dates(super().get_queryset())
+
+    def filter_dates(self, queryset):
+        """?from=/?to= for GuardDutyRoster or ArchivedGuardDuty"""
+        start_date = parse_date_param(self.request, 'from')
+        end_date = parse_date_param(self.request, 'to')
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """Ranges that reach back past the hot table include archived duties"""
+        try:
+            queryset = self.get_queryset()
+            start_date = parse_date_param(request, 'from')
+            end_date = parse_date_param(request, 'to')
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        rows = queryset
+        if guard_duties_reach_archive(start_date, end_date):
+            archived = self.filter_dates(ArchivedGuardDuty.objects.select_related('personnel'))
+            rows = merge_ordered(queryset, archived, ['-date'])
+        return Response(self.get_serializer(rows, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def fairness(self, request):
+        """
+        Duty count, night share and mean gap per person plus force-wide spread
+        (Gini, max/min ratio) for ?from=&to= (defaults to the last 90 days).
+        """
+        today = timezone.now().date()
+        try:
+            end_date = parse_date_param(request, 'to', today)
+            start_date = parse_date_param(request, 'from', end_date - timedelta(days=90))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if end_date < start_date:
+            return Response(
+                {'error': "'to' must be on or after 'from'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(compute_roster_fairness(start_date, end_date))
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Diff log of incremental roster repairs (leave approvals, suspensions, transfers).
+        Filter with ?personnel=<service number> (removed or added), ?batch=<id> or ?leave=<id>.
+        """
+        queryset = RosterChange.objects.all()
+        personnel_param = request.query_params.get('personnel', None)
+        if personnel_param:
+            queryset = queryset.filter(Q(removed_id=personnel_param) | Q(added_id=personnel_param))
+        batch_param = request.query_params.get('batch', None)
+        if batch_param:
+            queryset = queryset.filter(batch=batch_param)
+        leave_param = request.query_params.get('leave', None)
+        if leave_param:
+            queryset = queryset.filter(leave_id=leave_param)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(RosterChangeSerializer(page, many=True).data)
+        return Response(RosterChangeSerializer(queryset, many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        """
+        Fill the roster for a horizon with the constraint-aware solver.
+        Body: {"from": "YYYY-MM-DD", "to": "YYYY-MM-DD", "rules": {...}, "dryRun": false}
+        Returns the planned duties and any slots that could not be filled, or with
+        "background": true queues a job and returns it (poll /api/jobs/<id>/).
+        """
+        start_date = parse_date(str(request.data.get('from', '')))
+        end_date = parse_date(str(request.data.get('to', '')))
+        if not start_date or not end_date:
+            return Response(
+                {'error': "'from' and 'to' are required (YYYY-MM-DD)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_days = getattr(settings, 'ROSTER_MAX_HORIZON_DAYS', 92)
+        if end_date < start_date or (end_date - start_date).days >= max_days:
+            return Response(
+                {'error': f"'to' must be on or after 'from' and the horizon at most {max_days} days"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rules = request.data.get('rules') or None
+        if rules is not None:
+            try:
+                validate_roster_rules(rules)
+            except ValueError as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = bool(request.data.get('dryRun', False))
+        if request.data.get('background', False):
+            client_key = str(request.data.get('idempotencyKey') or '')
+            if len(client_key) > 150:
+                return Response(
+                    {'error': "'idempotencyKey' must be at most 150 characters"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            params = {'from': start_date, 'to': end_date, 'rules': rules, 'dryRun': dry_run}
+            # Without a client key, the same horizon, rules and dryRun map to the same job,
+            # so resubmitting never duplicates work; send a new idempotencyKey to run it again
+            job = enqueue(
+                'roster.generate',
+                params,
+                user=request.user if request.user.is_authenticated else None,
+                idempotency_key=request_key('roster.generate', params, client_key),
+            )
+            return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        result = solve_roster(start_date, end_date, rules, commit=not dry_run)
+        return Response(result, status=status.HTTP_201_CREATED if result['committed'] else status.HTTP_200_OK)
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only ViewSet for polling background jobs and downloading their artifacts
+    """
+    queryset = Job.objects.defer('artifact')
+    serializer_class = JobSerializer
+
+    @action(detail=True, methods=['get'])
+    def artifact(self, request, pk=None):
+        """Download the file produced by a finished job"""
+        job = self.get_object()
+        if job.status != 'SUCCEEDED' or not job.artifact_name:
+            return Response(
+                {'error': 'Job has no artifact yet', 'status': job.status},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        response = HttpResponse(bytes(job.artifact), content_type=job.artifact_content_type)
+        response['Content-Disposition'] = f'attachment; filename="{job.artifact_name}"'
+        return response
+
+class ReportViewSet(viewsets.ViewSet):
+    """
+    Workforce planning reports computed on the server
+    """
+
+    @action(detail=False, methods=['get'], url_path='retirement-forecast')
+    def retirement_forecast(self, request):
+        """Retirements over the next ?years=N (default 5), by quarter, rank and section"""
+        try:
+            years = int(request.query_params.get('years', 5))
+        except ValueError:
+            return Response({'error': "'years' must be a whole number"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= years <= 40:
+            return Response({'error': "'years' must be between 1 and 40"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(retirement_forecast(years))
+
+    @action(detail=False, methods=['get'], url_path='leave-usage')
+    def leave_usage(self, request):
+        """
+        Leave taken, grouped by ?group_by=<comma list of leave_type, month, year,
+        section, department, rank> (default leave_type,month). Filter with
+        ?from=/?to=YYYY-MM-DD and ?leave_type=, ?section=, ?department=, ?rank=.
+        """
+        group_by = [
+            name.strip() for name in request.query_params.get('group_by', 'leave_type,month').split(',') if name.strip()
+        ]
+        unknown = [name for name in group_by if name not in LEAVE_USAGE_DIMENSIONS]
+        if unknown or not group_by:
+            return Response(
+                {'error': f"'group_by' must list some of: {', '.join(LEAVE_USAGE_DIMENSIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            date_from = parse_date_param(request, 'from')
+            date_to = parse_date_param(request, 'to')
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        filters = {
+            'leave_type': request.query_params.get('leave_type', '').upper(),
+            'rank': request.query_params.get('rank', '').upper(),
+        }
+        for name in ('section', 'department'):
+            value = request.query_params.get(name)
+            if value not in (None, ''):
+                try:
+                    filters[name] = int(value)
+                except ValueError:
+                    return Response({'error': f"'{name}' must be a whole number"}, status=status.HTTP_400_BAD_REQUEST)
+        rows = leave_usage_report(list(dict.fromkeys(group_by)), date_from, date_to, filters)
+        return Response({
+            'groupBy': group_by,
+            'from': date_from,
+            'to': date_to,
+            'rows': rows,
+            'total': {
+                'leaves': sum(row['leaves'] for row in rows),
+                'days': sum(row['days'] for row in rows),
+            },
+        })
+
+    @action(detail=False, methods=['get'], url_path='database-load',
+            permission_classes=[permissions.IsAdminUser])
+    def database_load(self, request):
+        """Queries served by the primary vs. replicas in this process (?reset=1 clears the counters)"""
+        load = query_load()
+        if request.query_params.get('reset') == '1':
+            reset_query_load()
+        return Response(load)
+
+class PromotionEligibilityViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Promotion board: personnel due for promotion, ranked by seniority within section.
+    Reads the nightly precomputed table; filter with ?section=<id> and ?rank=<code>.
+    """
+    queryset = PromotionEligibility.objects.select_related('personnel', 'section')
+    serializer_class = PromotionEligibilitySerializer
+    pagination_class = StandardPagination
+
+    def get_queryset(self):
+        """Filter queryset based on query parameters"""
+        queryset = super().get_queryset()
+        section_param = self.request.query_params.get('section', None)
+        if section_param:
+            if not section_param.isdigit():
+                raise ValidationError({'error': "'section' must be a section id"})
+            queryset = queryset.filter(section_id=int(section_param))
+        rank_param = self.request.query_params.get('rank', None)
+        if rank_param:
+            queryset = queryset.filter(current_rank=rank_param.upper())
+        return queryset
+
+class OrgViewSet(viewsets.ViewSet):
+    """
+    Organization structure views
+    """
+    lookup_value_regex = SERVICE_NUMBER_REGEX
+
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        Departments -> sections -> designations with section strength.
+        ?as_of=YYYY-MM-DD gives the structure's strength on a past date (statuses are
+        not dated, so within someone's latest posting today's status is used);
+        ?members=1 lists the people in each section.
+        """
+        try:
+            as_of = parse_date_param(request, 'as_of')
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        include_members = request.query_params.get('members', '') in ('1', 'true', 'yes')
+        return Response(org_tree(as_of, include_members))
+
+    @action(detail=True, methods=['get'])
+    def subordinates(self, request, pk=None):
+        """
+        Everyone under an org node, nearest first, paginated. The node is a service
+        number, section:<id> (under its principal officer) or department:<id>
+        (under its head); ?depth=1 gives direct reports only.
+        """
+        try:
+            depth = request.query_params.get('depth', None)
+            depth = int(depth) if depth else None
+        except ValueError:
+            return Response({'error': "'depth' must be a whole number"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = subordinates(pk, depth)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        paginator = StandardPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        return paginator.get_paginated_response([chain_entry(row.subordinate, row.depth) for row in page])
+
+class AttachmentViewSet(mixins.DestroyModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Personnel photos and documents; filter with ?personnel=<service number> and ?kind=.
+    Upload through /api/personnel/<service number>/attachments/.
+    """
+    queryset = Attachment.objects.select_related('file')
+    serializer_class = AttachmentSerializer
+    pagination_class = StandardPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        personnel_param = self.request.query_params.get('personnel', None)
+        if personnel_param:
+            queryset = queryset.filter(personnel_id=personnel_param)
+        kind_param = self.request.query_params.get('kind', None)
+        if kind_param:
+            queryset = queryset.filter(kind=kind_param.upper())
+        return queryset
+
+    def perform_destroy(self, instance):
+        delete_attachment(instance)
+
+class FileViewSet(viewsets.ViewSet):
+    """
+    Stored files by SHA-256, and their thumbnails. Content never changes under a
+    hash, so responses are cacheable for a year and revalidate by ETag.
+    """
+    lookup_value_regex = '[0-9a-f]{64}'
+
+    def _serve(self, request, path, content_type, etag):
+        etag = f'"{etag}"'
+        headers = {'ETag': etag, 'Cache-Control': 'public, max-age=31536000, immutable'}
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            return HttpResponseNotModified(headers=headers)
+        try:
+            stream = open(path, 'rb')
+        except FileNotFoundError:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(stream, content_type=content_type, headers=headers)
+
+    def retrieve(self, request, pk=None):
+        stored = StoredFile.objects.filter(pk=pk).first()
+        if stored is None:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        return self._serve(request, file_path(pk), stored.content_type, pk)
+
+    @action(detail=True, methods=['get'], url_path=r'thumbnail/(?P<size>\d+)')
+    def thumbnail(self, request, pk=None, size=None):
+        """JPEG thumbnail, 404 until the background job has generated it"""
+        size = int(size)
+        if size not in (StoredFile.objects.filter(pk=pk).values_list('thumbnails', flat=True).first() or []):
+            return Response({'error': 'Thumbnail not available'}, status=status.HTTP_404_NOT_FOUND)
+        return self._serve(request, thumbnail_path(pk, size), 'image/jpeg', f"{pk}.{size}")
+
+class DashboardViewSet(viewsets.ViewSet):
+    """
+    Dashboard figures computed on the server (cached briefly, refreshed on change)
+    """
+
+    def list(self, request):
+        return Response(dashboard_summary())
+
+class BatchViewSet(viewsets.ViewSet):
+    """
+    Several API calls in one round trip. POST a list of
+    {"method": "GET", "url": "/api/sections/", "body": ..., "headers": {...}}
+    (method defaults to GET); the response lists {"status", "body"} for each, in order.
+    A call that raises is rolled back and listed with status 500.
+    """
+
+    def create(self, request):
+        items = request.data.get('requests') if isinstance(request.data, dict) else request.data
+        try:
+            return Response(run_batch(request, items, type(self)))
+        except BatchError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+class ProfileViewSet(viewsets.ViewSet):
+    """
+    Staff-only download of the request profiles kept by PROFILER_KEEP (see
+    personnel.profiler). /api/profiles/<id>/folded/ gives the stacks for a flame graph.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    lookup_value_regex = r'[0-9T]+-[0-9a-f]+'
+
+    def list(self, request):
+        return Response(profiler.kept_profiles())
+
+    def retrieve(self, request, pk=None):
+        profile = profiler.load(pk)
+        if profile is None:
+            return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(profile)
+
+    @action(detail=True, methods=['get'])
+    def folded(self, request, pk=None):
+        """Collapsed stacks as text, for flamegraph.pl or speedscope"""
+        profile = profiler.load(pk)
+        if profile is None:
+            return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        return HttpResponse(profile['folded'], content_type='text/plain; charset=utf-8', headers={
+            'Content-Disposition': f'attachment; filename="{pk}.folded"',
+        })
+
+class AuditEntryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Staff-only audit trail. Filter by object (?model=leave&object=<pk>), by user
+    (?user=<id>) and by period (?from=&to=, which also narrows the month partitions read).
+    """
+    queryset = AuditEntry.objects.all()
+    serializer_class = AuditEntrySerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = StandardPagination
+
+    def get_queryset(self):
+        """Filter queryset based on query parameters"""
+        queryset = super().get_queryset()
+        model_param = self.request.query_params.get('model', None)
+        if model_param:
+            label = model_param.lower()
+            queryset = queryset.filter(model=label if '.' in label else f'personnel.{label}')
+        object_param = self.request.query_params.get('object', None)
+        if object_param:
+            queryset = queryset.filter(object_pk=object_param)
+        user_param = self.request.query_params.get('user', None)
+        if user_param:
+            if not user_param.isdigit():
+                raise ValidationError({'error': "'user' must be a user id"})
+            queryset = queryset.filter(user_id=int(user_param))
+
+        try:
+            start_date = parse_date_param(self.request, 'from')
+            end_date = parse_date_param(self.request, 'to')
+        except ValueError as exc:
+            raise ValidationError({'error': str(exc)})
+        if start_date:
+            queryset = queryset.filter(
+                month__gte=start_date.year * 100 + start_date.month, timestamp__date__gte=start_date
+            )
+        if end_date:
+            queryset = queryset.filter(
+                month__lte=end_date.year * 100 + end_date.month, timestamp__date__lte=end_date
+            )
+        return queryset
@@ -1,5 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Backends each process keeps to itself; invalidations would never reach the others
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
 
 class PersonnelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'personnel'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        backend = settings.CACHES['default']['BACKEND']
+        if backend in PROCESS_LOCAL_CACHES and not getattr(settings, 'ALLOW_PROCESS_LOCAL_CACHE', False):
+            raise ImproperlyConfigured(
+                f"The default cache ({backend}) is not shared between processes, so changes made by "
+                "run_worker, apply_changes or import_snapshot would never reach the web workers. "
+                "Use a shared backend, or set ALLOW_PROCESS_LOCAL_CACHE=1 for a single process."
+            )
@@ -0,0 +1,129 @@
+"""
+Hot/cold tiering for guard-duty and leave history.
+
+GuardDutyRoster gains hundreds of rows a day and Leave keeps every finished request,
+but nearly every query is about the recent past. archive_history() moves guard
+duties older than ARCHIVE_GUARD_DUTY_AFTER_DAYS, and completed, rejected or
+cancelled leave that ended more than ARCHIVE_LEAVE_AFTER_DAYS ago, into
+ArchivedGuardDuty / ArchivedLeave. Each batch is one INSERT ... SELECT plus one
+DELETE, so the hot tables and their indexes stay bounded. The worker queues it
+once a day (ARCHIVE_DAILY); `manage.py archive_history` runs it by hand.
+
+Reads whose date range reaches back past the hot rows get the archived rows as
+well: the roster and leave listings, roster fairness, the dossier, and the leave
+balance and usage rebuilds. Least-recently-tasked ordering reads the last duty from
+both tables (services.with_last_duty). Archived rows keep their ids, and are not audited or
+replicated as deletes. A roster change that pointed at an archived leave loses
+that link.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ArchivedGuardDuty, ArchivedLeave, GuardDutyRoster, Leave, RosterChange
+
+ARCHIVE_JOB = 'archive.history'
+ARCHIVED_LEAVE_STATUSES = ('COMPLETED', 'REJECTED', 'CANCELLED')
+DEFAULT_GUARD_DUTY_AFTER_DAYS = 365
+DEFAULT_LEAVE_AFTER_DAYS = 730
+
+
+def guard_duty_cutoff(today=None):
+    """Guard duties dated before this are archived"""
+    days = getattr(settings, 'ARCHIVE_GUARD_DUTY_AFTER_DAYS', DEFAULT_GUARD_DUTY_AFTER_DAYS)
+    return (today or timezone.now().date()) - timedelta(days=days)
+
+
+def leave_cutoff(today=None):
+    """Finished leave that ended before this is archived"""
+    days = getattr(settings, 'ARCHIVE_LEAVE_AFTER_DAYS', DEFAULT_LEAVE_AFTER_DAYS)
+    return (today or timezone.now().date()) - timedelta(days=days)
+
+
+def _move(model, archive_model, queryset, batch_size, before_delete=None):
+    """Move the rows of `queryset` into `archive_model` in batches; returns the number moved"""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in model._meta.concrete_fields)
+    hot, cold = quote(model._meta.db_table), quote(archive_model._meta.db_table)
+    moved = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return moved
+        placeholders = ', '.join(['%s'] * len(ids))
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Plain SQL: no model instances, and no delete signals (this is not a user deletion)
+            cursor.execute(
+                f"INSERT INTO {cold} ({columns}, {quote('archived_at')}) "
+                f"SELECT {columns}, %s FROM {hot} WHERE {quote('id')} IN ({placeholders})",
+                [timezone.now(), *ids],
+            )
+            if before_delete:
+                before_delete(ids)
+            cursor.execute(f"DELETE FROM {hot} WHERE {quote('id')} IN ({placeholders})", ids)
+        moved += len(ids)
+
+
+def archive_guard_duties(cutoff=None, batch_size=5000):
+    cutoff = cutoff or guard_duty_cutoff()
+    return _move(GuardDutyRoster, ArchivedGuardDuty, GuardDutyRoster.objects.filter(date__lt=cutoff), batch_size)
+
+
+def archive_leaves(cutoff=None, batch_size=5000):
+    cutoff = cutoff or leave_cutoff()
+    return _move(
+        Leave, ArchivedLeave,
+        Leave.objects.filter(status__in=ARCHIVED_LEAVE_STATUSES, end_date__lt=cutoff),
+        batch_size,
+        before_delete=lambda ids: RosterChange.objects.filter(leave_id__in=ids).update(leave=None),
+    )
+
+
+def archive_history(today=None):
+    """Move everything past its horizon to the archive tables; returns counts per table"""
+    return {
+        'guardDuties': archive_guard_duties(guard_duty_cutoff(today)),
+        'leaves': archive_leaves(leave_cutoff(today)),
+    }
+
+
+def schedule_archival():
+    """Queue today's archive run unless it is already queued or done"""
+    from .jobs import enqueue
+    if getattr(settings, 'ARCHIVE_DAILY', True):
+        return enqueue(ARCHIVE_JOB, idempotency_key=f"archive:{timezone.now().date()}")
+    return None
+
+
+# Reading across both tiers
+
+def _reaches_archive(archive_model, date_field, date_from, date_to):
+    if date_from is not None:
+        newest = archive_model.objects.aggregate(newest=Max(date_field))['newest']
+        return newest is not None and date_from <= newest
+    # Only an upper bound: everything archived is old enough to match
+    return date_to is not None and archive_model.objects.exists()
+
+
+def guard_duties_reach_archive(date_from, date_to=None):
+    """True if guard duties dated within [date_from, date_to] may include archived rows"""
+    return _reaches_archive(ArchivedGuardDuty, 'date', date_from, date_to)
+
+
+def leaves_reach_archive(date_from, date_to=None):
+    """True if leave filtered by start date >= date_from / end date <= date_to may include archived rows"""
+    return _reaches_archive(ArchivedLeave, 'start_date', date_from, date_to)
+
+
+def merge_ordered(hot, cold, ordering):
+    """Merge two lists of rows by Django-style `ordering` (e.g. ['-start_date', 'id'])"""
+    rows = [*hot, *cold]
+    for name in reversed(ordering):
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        # Stable sorts from the last key to the first; None sorts before any value
+        rows.sort(key=lambda row: (getattr(row, name) is not None, getattr(row, name)), reverse=descending)
+    return rows
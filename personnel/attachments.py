@@ -0,0 +1,197 @@
+"""
+Content-addressed storage for personnel photos and documents.
+
+Uploads are hashed (SHA-256) while being streamed to disk and stored once under
+MEDIA_ROOT/files/<aa>/<bb>/<hash>; uploading the same file again only adds an
+Attachment row pointing at the existing StoredFile. The content type is detected
+from the bytes (Pillow for images), so a mislabelled file is refused and photos
+must really be images. Because a hash never changes
+meaning, files and thumbnails can be served with far-future cache headers and the
+hash as ETag.
+
+Thumbnails (ATTACHMENT_THUMBNAIL_SIZES, longest side in px, JPEG) are never made
+inside a request: an upload queues an 'attachments.thumbnails' background job,
+and `manage.py generate_thumbnails` backfills in a process pool.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Attachment, StoredFile
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_THUMBNAIL_SIZES = [64, 256]
+DEFAULT_CONTENT_TYPES = ['image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/tiff', 'application/pdf']
+THUMBNAIL_JOB = 'attachments.thumbnails'
+
+
+class AttachmentError(Exception):
+    pass
+
+
+def storage_root():
+    return os.path.join(settings.MEDIA_ROOT, 'files')
+
+
+def thumbnail_sizes():
+    return list(getattr(settings, 'ATTACHMENT_THUMBNAIL_SIZES', DEFAULT_THUMBNAIL_SIZES))
+
+
+def file_path(sha256):
+    return os.path.join(storage_root(), sha256[:2], sha256[2:4], sha256)
+
+
+def thumbnail_path(sha256, size):
+    return os.path.join(storage_root(), sha256[:2], sha256[2:4], f"{sha256}.{size}.jpg")
+
+
+def is_image(content_type):
+    return content_type.startswith('image/')
+
+
+def detect_content_type(path):
+    """The type a file's content actually has: a PDF, an image Pillow can read, or None"""
+    from PIL import Image, UnidentifiedImageError
+
+    with open(path, 'rb') as stream:
+        if stream.read(5) == b'%PDF-':
+            return 'application/pdf'
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+    return Image.MIME.get(image_format)
+
+
+def store_upload(upload, images_only=False):
+    """
+    Save an uploaded file (Django UploadedFile) by content hash and return its
+    StoredFile, reusing the existing one for a duplicate upload. The stored type is
+    the one detected from the content, not the one the client declared.
+    """
+    max_bytes = getattr(settings, 'ATTACHMENT_MAX_BYTES', 10 * 1024 * 1024)
+    allowed = getattr(settings, 'ATTACHMENT_CONTENT_TYPES', DEFAULT_CONTENT_TYPES)
+    declared = (upload.content_type or '').split(';')[0].strip().lower()
+    if declared not in allowed:
+        raise AttachmentError(f"Files of type '{declared or 'unknown'}' are not accepted")
+    if upload.size > max_bytes:
+        raise AttachmentError(f"File is larger than {max_bytes // (1024 * 1024)} MB")
+
+    os.makedirs(storage_root(), exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=storage_root(), delete=False) as temp:
+        try:
+            for chunk in upload.chunks(CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                temp.write(chunk)
+        except BaseException:
+            os.unlink(temp.name)
+            raise
+    content_type = detect_content_type(temp.name)
+    if content_type not in allowed or (images_only and not is_image(content_type)):
+        os.unlink(temp.name)
+        expected = 'an image' if images_only else 'an accepted file type'
+        raise AttachmentError(f"File content is not {expected} (declared as '{declared}')")
+    sha256 = digest.hexdigest()
+    path = file_path(sha256)
+    if os.path.exists(path):
+        os.unlink(temp.name)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp.name, path)
+
+    stored, _ = StoredFile.objects.get_or_create(
+        sha256=sha256, defaults={'size': size, 'content_type': content_type}
+    )
+    return stored
+
+
+def attach(personnel, upload, kind='DOCUMENT', description='', user=None):
+    """Store an upload on a personnel record; thumbnails are queued for images"""
+    stored = store_upload(upload, images_only=kind == 'PHOTO')
+    attachment = Attachment.objects.create(
+        personnel=personnel, kind=kind, file=stored, file_name=os.path.basename(upload.name)[:255],
+        description=description, uploaded_by=user if user and user.is_authenticated else None,
+    )
+    queue_thumbnails(stored)
+    return attachment
+
+
+def queue_thumbnails(stored):
+    """Queue thumbnail generation for an image that is missing some sizes"""
+    from .jobs import enqueue
+    if not is_image(stored.content_type) or set(thumbnail_sizes()) <= set(stored.thumbnails):
+        return
+    sha256 = stored.sha256
+    transaction.on_commit(lambda: enqueue(
+        THUMBNAIL_JOB, {'sha256': sha256}, idempotency_key=f"thumbnails:{sha256}:{thumbnail_sizes()}"
+    ))
+
+
+def render_thumbnails(sha256, sizes):
+    """
+    Write the missing thumbnails for one stored image and return the sizes now on
+    disk. Touches no database, so it can run in a process pool.
+    """
+    from PIL import Image, ImageOps
+
+    done = [size for size in sizes if os.path.exists(thumbnail_path(sha256, size))]
+    missing = [size for size in sizes if size not in done]
+    if not missing:
+        return sorted(done)
+    with Image.open(file_path(sha256)) as source:
+        image = ImageOps.exif_transpose(source).convert('RGB')
+    for size in sorted(missing, reverse=True):
+        # Largest first, so each smaller size is resampled from a smaller image
+        image.thumbnail((size, size), Image.LANCZOS)
+        path = thumbnail_path(sha256, size)
+        temp = f"{path}.tmp"
+        image.save(temp, 'JPEG', quality=85, optimize=True, progressive=True)
+        os.replace(temp, path)
+        done.append(size)
+    return sorted(done)
+
+
+def record_thumbnails(sha256, sizes):
+    StoredFile.objects.filter(pk=sha256).update(thumbnails=sorted(sizes))
+
+
+def generate_thumbnails(sha256):
+    """Render and record the configured thumbnail sizes for one stored image"""
+    sizes = render_thumbnails(sha256, thumbnail_sizes())
+    record_thumbnails(sha256, sizes)
+    return sizes
+
+
+def delete_attachment(attachment):
+    """Delete an attachment, and its file once no other attachment uses it"""
+    sha256 = attachment.file_id
+    with transaction.atomic():
+        attachment.delete()
+        if Attachment.objects.filter(file_id=sha256).exists():
+            return
+        StoredFile.objects.filter(pk=sha256).delete()
+    paths = [file_path(sha256), *(thumbnail_path(sha256, size) for size in thumbnail_sizes())]
+
+    def remove_files():
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
+    transaction.on_commit(remove_files)
+
+
+def with_photo(queryset):
+    """Annotate a Personnel queryset with the hash and thumbnail sizes of each person's latest photo"""
+    latest = Attachment.objects.filter(personnel=OuterRef('pk'), kind='PHOTO').order_by('-uploaded_at', '-id')
+    return queryset.annotate(
+        photo_sha256=Subquery(latest.values('file_id')[:1]),
+        photo_thumbnails=Subquery(latest.values('file__thumbnails')[:1]),
+    )
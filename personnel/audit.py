@@ -0,0 +1,182 @@
+"""
+Append-only audit trail with batched writes.
+
+Model signals capture a field-level diff of each save/delete of an audited model
+(using the values snapshotted by TrackedFieldsMixin, so no extra read). Once the
+surrounding transaction commits, the entry goes into an in-process buffer; a
+daemon thread writes the buffer with one bulk_create every AUDIT_FLUSH_INTERVAL_MS,
+or sooner once AUDIT_BUFFER_SIZE entries are waiting. The request itself never
+waits on an audit INSERT.
+
+With AUDIT_ASYNC = False (handy in tests and management commands) entries are
+written at commit instead.
+"""
+import atexit
+import contextvars
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AuditEntry
+
+logger = logging.getLogger(__name__)
+
+# Callable returning the acting user (set per request by AuditUserMiddleware)
+_current_user = contextvars.ContextVar('audit_current_user', default=None)
+
+# Bookkeeping columns whose changes are not worth an audit line
+UNAUDITED_FIELDS = ('version',)
+
+_buffer = []
+_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = None
+_flusher_pid = None
+
+
+def set_current_user(get_user):
+    """Register a callable returning the acting user; returns a token for reset_current_user"""
+    return _current_user.set(get_user)
+
+
+def reset_current_user(token):
+    _current_user.reset(token)
+
+
+def current_user_id():
+    get_user = _current_user.get()
+    if get_user is None:
+        return None
+    user = get_user()
+    if user is not None and getattr(user, 'is_authenticated', False):
+        return user.pk
+    return None
+
+
+def audit_enabled():
+    return getattr(settings, 'AUDIT_ENABLED', True)
+
+
+def model_label(instance):
+    return instance._meta.label_lower
+
+
+def record(label, object_pk, action, changes):
+    """Queue one audit entry, to be buffered once the current transaction commits"""
+    record_many([(label, object_pk, action, changes)])
+
+
+def record_many(items):
+    """Queue (label, pk, action, changes) entries together, e.g. for bulk writes"""
+    if not audit_enabled():
+        return
+    now = timezone.now()
+    user_id = current_user_id()
+    entries = [
+        AuditEntry(
+            timestamp=now,
+            month=now.year * 100 + now.month,
+            user_id=user_id,
+            model=label,
+            object_pk=str(object_pk),
+            action=action,
+            changes=changes,
+        )
+        for label, object_pk, action, changes in items
+    ]
+    if entries:
+        transaction.on_commit(lambda: _append(entries))
+
+
+def capture_save(instance, created):
+    """Diff a just-saved TrackedFieldsMixin instance against its loaded values"""
+    if not audit_enabled():
+        return
+    current = {
+        name: value for name, value in instance.tracked_values().items() if name not in UNAUDITED_FIELDS
+    }
+    loaded = None if created else getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        changes = {name: [None, value] for name, value in current.items()}
+    else:
+        changes = {
+            name: [loaded.get(name), value]
+            for name, value in current.items()
+            if name not in loaded or loaded[name] != value
+        }
+        if not changes:
+            return
+    record(model_label(instance), instance.pk, 'C' if created else 'U', changes)
+
+
+def capture_delete(instance):
+    if not audit_enabled():
+        return
+    changes = {name: [value, None] for name, value in instance.tracked_values().items()}
+    record(model_label(instance), instance.pk, 'D', changes)
+
+
+def _append(entries):
+    if not getattr(settings, 'AUDIT_ASYNC', True):
+        AuditEntry.objects.bulk_create(entries, batch_size=500)
+        return
+    with _lock:
+        _buffer.extend(entries)
+        waiting = len(_buffer)
+    _ensure_flusher()
+    if waiting >= getattr(settings, 'AUDIT_BUFFER_SIZE', 500):
+        _wake.set()
+
+
+def flush():
+    """Write everything buffered so far; returns the number of entries written"""
+    with _lock:
+        entries = _buffer[:]
+        del _buffer[:]
+    if not entries:
+        return 0
+    try:
+        AuditEntry.objects.bulk_create(entries, batch_size=500)
+    except Exception:
+        logger.exception("Audit flush failed; %d entries re-queued", len(entries))
+        with _lock:
+            _buffer[:0] = entries
+        raise
+    return len(entries)
+
+
+def _flush_loop():
+    interval = getattr(settings, 'AUDIT_FLUSH_INTERVAL_MS', 200) / 1000
+    while True:
+        _wake.wait(interval)
+        _wake.clear()
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            pass  # logged in flush(); retried on the next tick
+
+
+def _ensure_flusher():
+    """Start the flush thread for this process (again after a fork)"""
+    global _flusher, _flusher_pid
+    if _flusher is not None and _flusher_pid == os.getpid() and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is not None and _flusher_pid == os.getpid() and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flush_loop, name='audit-flusher', daemon=True)
+        _flusher_pid = os.getpid()
+        _flusher.start()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        pass
@@ -0,0 +1,188 @@
+"""
+Per-process prefix index for the personnel pickers (/api/personnel/autocomplete/).
+
+Service numbers, surnames and first names are kept lower-cased in one sorted list
+of (term, service_number) pairs. A lookup bisects to the first term with the typed
+prefix and walks forward until it has `limit` distinct people, so its cost does
+not depend on the size of the force.
+
+The index is built on first use. Personnel signals keep it current in this
+process. Other processes learn of a change through a version counter in the
+cache: each change bumps it and stores the changed service numbers under the
+new version. Readers compare versions at most every
+AUTOCOMPLETE_VERSION_CHECK_SECONDS and reload just those people, or rebuild if
+they fell too far behind. The cache must therefore be shared (see apps.py); as a
+backstop against lost notices, an index older than AUTOCOMPLETE_MAX_AGE_SECONDS
+is rebuilt.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Personnel
+
+VERSION_KEY = 'personnel-autocomplete:version'
+CHANGE_KEY = 'personnel-autocomplete:change:{}'
+# Beyond this many missed changes a full rebuild is cheaper than catching up
+MAX_CATCH_UP = 500
+
+
+def _terms(service_number, first_name, last_name):
+    return {term for term in (service_number.lower(), last_name.lower(), first_name.lower()) if term}
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = None  # sorted [(term, service_number)]
+        self._people = {}  # service_number -> (rank, last_name, first_name)
+        self._version = 0
+        self._checked_at = 0.0
+        self._built_at = 0.0
+
+    # Maintenance
+
+    def _load(self, queryset):
+        return queryset.values_list('service_number', 'first_name', 'last_name', 'rank')
+
+    def build(self):
+        """(Re)load the whole index from the database"""
+        with self._lock:
+            version = current_version()
+            entries, people = [], {}
+            rows = self._load(Personnel.objects.all()).iterator(chunk_size=5000)
+            for service_number, first_name, last_name, rank in rows:
+                people[service_number] = (rank, last_name, first_name)
+                entries.extend((term, service_number) for term in _terms(service_number, first_name, last_name))
+            entries.sort()
+            self._entries, self._people, self._version = entries, people, version
+            self._checked_at = self._built_at = time.monotonic()
+
+    def _remove(self, service_number):
+        person = self._people.pop(service_number, None)
+        if person is None:
+            return
+        rank, last_name, first_name = person
+        for term in _terms(service_number, first_name, last_name):
+            index = bisect.bisect_left(self._entries, (term, service_number))
+            if index < len(self._entries) and self._entries[index] == (term, service_number):
+                del self._entries[index]
+
+    def refresh(self, service_numbers):
+        """Reload the given people from the database (dropping those that no longer exist)"""
+        service_numbers = list(service_numbers)
+        with self._lock:
+            if self._entries is None:
+                return
+            rows = list(self._load(Personnel.objects.filter(service_number__in=service_numbers)))
+            for service_number in service_numbers:
+                self._remove(service_number)
+            for service_number, first_name, last_name, rank in rows:
+                self._people[service_number] = (rank, last_name, first_name)
+                for term in _terms(service_number, first_name, last_name):
+                    bisect.insort(self._entries, (term, service_number))
+
+    def sync(self):
+        """Build on first use, then apply changes made by other processes"""
+        if self._entries is None:
+            self.build()
+            return
+        interval = getattr(settings, 'AUTOCOMPLETE_VERSION_CHECK_SECONDS', 1)
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return
+        self._checked_at = now
+        if now - self._built_at >= getattr(settings, 'AUTOCOMPLETE_MAX_AGE_SECONDS', 900):
+            self.build()
+            return
+        version = current_version()
+        if version == self._version:
+            return
+        with self._lock:
+            missed = range(self._version + 1, version + 1)
+            if version < self._version or len(missed) > MAX_CATCH_UP:
+                self.build()
+                return
+            changes = cache.get_many([CHANGE_KEY.format(v) for v in missed])
+            if len(changes) < len(missed) or any(value is None for value in changes.values()):
+                # Expired, or a bulk change that asked for a rebuild
+                self.build()
+                return
+            self.refresh({sn for service_numbers in changes.values() for sn in service_numbers})
+            self._version = version
+
+    # Lookup
+
+    def search(self, query, limit=10):
+        """Up to `limit` people whose service number or a name starts with each word of `query`"""
+        words = query.lower().split()
+        if not words:
+            return []
+        self.sync()
+        first, rest = words[0], words[1:]
+        results, seen = [], set()
+        with self._lock:
+            if self._entries is None:
+                self.build()
+            entries, people = self._entries, self._people
+            index = bisect.bisect_left(entries, (first,))
+            while index < len(entries) and len(results) < limit:
+                term, service_number = entries[index]
+                index += 1
+                if not term.startswith(first):
+                    break
+                if service_number in seen:
+                    continue
+                seen.add(service_number)
+                rank, last_name, first_name = people[service_number]
+                if rest:
+                    terms = _terms(service_number, first_name, last_name)
+                    if not all(any(t.startswith(word) for t in terms) for word in rest):
+                        continue
+                results.append({
+                    'serviceNumber': service_number,
+                    'rank': rank,
+                    'surname': last_name,
+                    'firstName': first_name,
+                })
+        return results
+
+
+_index = PrefixIndex()
+
+
+def current_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def _bump(service_numbers):
+    cache.add(VERSION_KEY, 0, timeout=None)
+    version = cache.incr(VERSION_KEY)
+    cache.set(CHANGE_KEY.format(version), service_numbers, timeout=3600)
+    return version
+
+
+def personnel_changed(service_numbers):
+    """Record changed people for every process and update this one's index"""
+    service_numbers = sorted(set(service_numbers))
+    if not service_numbers:
+        return
+    version = _bump(service_numbers)
+    with _index._lock:
+        _index.refresh(service_numbers)
+        if _index._version == version - 1:
+            _index._version = version
+
+
+def rebuild_everywhere():
+    """After bulk loads: every process rebuilds its index on next use"""
+    _bump(None)
+    with _index._lock:
+        _index._entries = None
+
+
+def search(query, limit=10):
+    return _index.search(query, limit)
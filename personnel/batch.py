@@ -0,0 +1,145 @@
+"""
+Request batching: POST /api/batch/ carries several API calls and answers them in
+one response, so a screen that needs personnel, sections and pending leaves pays
+for one LAN round trip instead of three.
+
+Sub-requests are dispatched in-process straight to the resolved view, in order,
+on the same thread - so they share the batch request's database connection,
+authenticated user and session. They skip the middleware stack, which has
+already run for the batch itself.
+
+Each sub-request runs in its own transaction. One that raises is rolled back and
+answered with status 500; the calls before and after it are kept.
+"""
+import io
+import json
+import logging
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_REQUESTS = 20
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE')
+# Headers of a sub-response worth passing back
+RESPONSE_HEADERS = ('ETag', 'Location')
+# Headers of the batch request that must not leak into its sub-requests
+REQUEST_ONLY_HEADERS = (
+    'CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE',
+)
+
+
+class BatchError(Exception):
+    pass
+
+
+def max_requests():
+    return getattr(settings, 'BATCH_MAX_REQUESTS', DEFAULT_MAX_REQUESTS)
+
+
+def _error(status, message):
+    return {'status': status, 'body': {'error': message}}
+
+
+def _sub_request(request, method, url, body, headers):
+    """A WSGIRequest for one sub-call, carrying the batch request's identity"""
+    parts = urlsplit(url)
+    payload = b'' if body is None else json.dumps(body).encode()
+    environ = {key: value for key, value in request.META.items() if key not in REQUEST_ONLY_HEADERS}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+    })
+    if body is not None:
+        environ['CONTENT_TYPE'] = 'application/json'
+    for name, value in headers.items():
+        key = name.upper().replace('-', '_')
+        environ[key if key == 'CONTENT_TYPE' else f'HTTP_{key}'] = str(value)
+
+    sub = WSGIRequest(environ)
+    django_request = getattr(request, '_request', request)
+    if hasattr(django_request, 'session'):
+        sub.session = django_request.session
+    # The batch request was authenticated (and CSRF-checked) already
+    sub.user = request.user
+    sub._force_auth_user = request.user
+    sub._force_auth_token = getattr(request, 'auth', None)
+    sub._dont_enforce_csrf_checks = True
+    return sub
+
+
+def _body(response):
+    # DRF responses are passed on unrendered; the batch response renders them once
+    if hasattr(response, 'data'):
+        return response.data
+    if hasattr(response, 'render'):
+        response.render()
+    if getattr(response, 'streaming', False):
+        raise BatchError('Streaming responses (files) cannot be batched')
+    content = response.content
+    if not content:
+        return None
+    if response.get('Content-Type', '').startswith('application/json'):
+        try:
+            return json.loads(content)
+        except ValueError:
+            raise BatchError('The response is not valid JSON')
+    return content.decode(response.charset or 'utf-8', errors='replace')
+
+
+def run_one(request, item, batch_view):
+    """Dispatch one sub-request; returns {'status', 'body'[, 'headers']}"""
+    if not isinstance(item, dict) or not isinstance(item.get('url'), str):
+        return _error(400, "Each request needs a 'url'")
+    method = str(item.get('method', 'GET')).upper()
+    if method not in METHODS:
+        return _error(405, f"Method '{method}' is not allowed")
+    headers = item.get('headers') or {}
+    if not isinstance(headers, dict):
+        return _error(400, "'headers' must be an object")
+
+    path = urlsplit(item['url']).path
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return _error(404, f"No API endpoint at {path}")
+    view = getattr(match.func, 'cls', None)
+    if view is None or not issubclass(view, APIView):
+        return _error(400, f"Only API endpoints can be batched: {path}")
+    if view is batch_view:
+        return _error(400, 'Batches cannot be nested')
+
+    sub = _sub_request(request, method, item['url'], item.get('body'), headers)
+    try:
+        with transaction.atomic():
+            response = match.func(sub, *match.args, **match.kwargs)
+            result = {'status': response.status_code, 'body': None if method == 'HEAD' else _body(response)}
+    except Http404:
+        return _error(404, 'Not found')
+    except BatchError as exc:
+        return _error(406, str(exc))
+    except Exception:
+        logger.exception("Batched %s %s failed", method, item['url'])
+        return _error(500, 'Internal server error')
+    passed = {name: response[name] for name in RESPONSE_HEADERS if response.has_header(name)}
+    if passed:
+        result['headers'] = passed
+    return result
+
+
+def run_batch(request, items, batch_view):
+    """Run the sub-requests in order and return their results, one per request"""
+    if not isinstance(items, list):
+        raise BatchError("Expected a list of requests (or {'requests': [...]})")
+    if len(items) > max_requests():
+        raise BatchError(f"At most {max_requests()} requests per batch")
+    return [run_one(request, item, batch_view) for item in items]
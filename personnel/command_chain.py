@@ -0,0 +1,208 @@
+"""
+Chain of command as a closure table (CommandChain).
+
+Each person has at most one direct superior:
+- a department head has none;
+- a section's principal officer reports to the head of that section's department;
+- everyone else reports to the principal officer of the section of their latest
+  posting, or to the department head if the section has no principal officer.
+
+CommandChain stores every (superior, subordinate, depth) pair, so "who is above
+X" and "everyone under Y" are each one indexed query at any depth.
+
+When someone's direct superior changes, refresh_chain() moves their whole
+subtree: it drops the rows linking the subtree to its old ancestors and inserts
+rows linking it to the new ones. Postings, principal officer and department
+head changes call it for just the people involved (see signals.py).
+rebuild_chain() recomputes the whole table.
+"""
+from django.db import transaction
+from django.db.models import Subquery
+
+from .models import Assignment, CommandChain, Department, Personnel, Section
+
+
+def _org():
+    """(section -> (principal officer, department), department -> head, head -> department, officer -> section)"""
+    sections = {
+        pk: (officer, department)
+        for pk, officer, department in Section.objects.values_list('pk', 'principal_officer_id', 'department_id')
+    }
+    heads = dict(Department.objects.filter(head__isnull=False).values_list('pk', 'head_id'))
+    headed_department = {head: department for department, head in heads.items()}
+    headed_section = {officer: pk for pk, (officer, _) in sections.items() if officer}
+    return sections, heads, headed_department, headed_section
+
+
+def _current_sections(service_numbers, chunk_size=500):
+    """Section of each person's latest posting (None once transferred out)"""
+    current = {}
+    service_numbers = list(service_numbers)
+    for offset in range(0, len(service_numbers), chunk_size):
+        rows = (
+            Assignment.objects.filter(personnel_id__in=service_numbers[offset:offset + chunk_size])
+            .order_by('personnel_id', 'date_of_posting', 'id')
+            .values_list('personnel_id', 'section_id', 'status')
+        )
+        for service_number, section_id, status in rows:
+            current[service_number] = None if status == 'TRANSFERRED' else section_id
+    return current
+
+
+def direct_superiors(service_numbers):
+    """service number -> service number of the direct superior (or None)"""
+    sections, heads, headed_department, headed_section = _org()
+    current = _current_sections(service_numbers)
+    superiors = {}
+    for service_number in service_numbers:
+        if service_number in headed_department:
+            superior = None
+        elif service_number in headed_section:
+            superior = heads.get(sections[headed_section[service_number]][1])
+        else:
+            officer, department = sections.get(current.get(service_number), (None, None))
+            superior = officer if officer and officer != service_number else heads.get(department)
+        superiors[service_number] = superior if superior != service_number else None
+    return superiors
+
+
+def rebuild_chain():
+    """Recompute the whole closure table; returns the number of rows written"""
+    people = list(Personnel.objects.values_list('pk', flat=True))
+    superiors = direct_superiors(people)
+    children = {}
+    for person, superior in superiors.items():
+        if superior is not None and superior in superiors:
+            children.setdefault(superior, []).append(person)
+
+    rows, placed = [], set()
+
+    def place(root):
+        # Iterative DFS carrying the path of ancestors
+        stack = [(root, [])]
+        while stack:
+            person, path = stack.pop()
+            if person in placed:
+                continue
+            placed.add(person)
+            rows.append(CommandChain(superior_id=person, subordinate_id=person, depth=0))
+            for depth, ancestor in enumerate(reversed(path), start=1):
+                rows.append(CommandChain(superior_id=ancestor, subordinate_id=person, depth=depth))
+            for child in children.get(person, []):
+                stack.append((child, path + [person]))
+
+    for person in people:
+        if superiors[person] is None or superiors[person] not in superiors:
+            place(person)
+    # Whatever is left sits on a reporting cycle; cut it at an arbitrary member
+    for person in people:
+        if person not in placed:
+            place(person)
+
+    with transaction.atomic():
+        CommandChain.objects.all().delete()
+        CommandChain.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
+
+
+def _move(person, superior):
+    """Re-attach `person` and everyone under them below `superior` (None: make them a root)"""
+    subtree = CommandChain.objects.filter(superior_id=person)
+    members = list(subtree.values_list('subordinate_id', 'depth'))
+    if superior is not None and any(member == superior for member, _ in members):
+        # Would create a reporting cycle
+        superior = None
+    CommandChain.objects.filter(
+        subordinate_id__in=Subquery(subtree.values('subordinate_id'))
+    ).exclude(superior_id__in=Subquery(subtree.values('subordinate_id'))).delete()
+    if superior is None:
+        return
+    ancestors = list(CommandChain.objects.filter(subordinate_id=superior).values_list('superior_id', 'depth'))
+    CommandChain.objects.bulk_create(
+        [
+            CommandChain(superior_id=ancestor, subordinate_id=member, depth=above + below + 1)
+            for ancestor, above in ancestors
+            for member, below in members
+        ],
+        batch_size=2000,
+    )
+
+
+def refresh_chain(service_numbers):
+    """Bring the chain up to date for people whose direct superior may have changed"""
+    people = set(Personnel.objects.filter(pk__in=list(service_numbers)).values_list('pk', flat=True))
+    if not people:
+        return 0
+    superiors = direct_superiors(people)
+    with transaction.atomic():
+        # Writing first takes the write lock up front (SQLite: no read-then-upgrade deadlock)
+        CommandChain.objects.bulk_create(
+            [CommandChain(superior_id=person, subordinate_id=person, depth=0) for person in people],
+            ignore_conflicts=True,
+        )
+        current = dict(
+            CommandChain.objects.filter(subordinate_id__in=people, depth=1).values_list('subordinate_id', 'superior_id')
+        )
+        moved = [person for person in people if current.get(person) != superiors[person]]
+        # Make the changed people self-rooted first, so the order of the moves cannot matter
+        for person in moved:
+            _move(person, None)
+        for person in moved:
+            _move(person, superiors[person])
+    return len(moved)
+
+
+def section_people(section_ids):
+    """Principal officers and current members of the given sections"""
+    section_ids = set(section_ids)
+    people = set(
+        Section.objects.filter(pk__in=section_ids, principal_officer__isnull=False)
+        .values_list('principal_officer_id', flat=True)
+    )
+    latest = Assignment.objects.filter(section_id__in=section_ids).values_list('personnel_id', flat=True).distinct()
+    candidates = set(latest)
+    people |= {person for person, section in _current_sections(candidates).items() if section in section_ids}
+    return people
+
+
+def chain_entry(person, depth):
+    return {
+        'serviceNumber': person.service_number,
+        'rank': person.rank,
+        'name': f"{person.first_name} {person.last_name}",
+        'level': depth,
+    }
+
+
+def chain_of(service_number):
+    """The person's superiors, nearest first - one indexed query"""
+    return [
+        chain_entry(row.superior, row.depth)
+        for row in CommandChain.objects.filter(subordinate_id=service_number, depth__gt=0)
+        .select_related('superior').order_by('depth')
+    ]
+
+
+def node_superior(node):
+    """
+    The person at the top of an org node: a service number, 'section:<id>' (its
+    principal officer) or 'department:<id>' (its head). Sections and departments
+    resolve to a subquery, so listing their subordinates stays one query.
+    Raises ValueError for a malformed node.
+    """
+    kind, _, pk = node.partition(':')
+    if kind not in ('section', 'department') or not pk:
+        return node
+    if not pk.isdigit():
+        raise ValueError(f"Invalid {kind} id: {pk}")
+    if kind == 'section':
+        return Subquery(Section.objects.filter(pk=pk).values('principal_officer_id')[:1])
+    return Subquery(Department.objects.filter(pk=pk).values('head_id')[:1])
+
+
+def subordinates(node, max_depth=None):
+    """CommandChain rows for everyone under an org node (see node_superior), nearest first"""
+    rows = CommandChain.objects.filter(superior_id=node_superior(node), depth__gt=0)
+    if max_depth is not None:
+        rows = rows.filter(depth__lte=max_depth)
+    return rows.select_related('subordinate').order_by('depth', 'subordinate__last_name', 'subordinate_id')
@@ -0,0 +1,108 @@
+"""
+Read/write splitting across the primary database and read replicas.
+
+Routing is opt-in per request: ReplicaRoutingMiddleware marks safe (GET/HEAD/
+OPTIONS) API requests as replica-eligible, and only reads made inside such a
+request go to a replica. Everything else - writes, requests that are not
+safe, background jobs, management commands, the audit flusher - uses the
+primary ('default').
+
+Once a request writes, the rest of that request reads from the primary too, and
+the client is pinned to the primary for REPLICA_PIN_SECONDS so that the next
+page load sees its own write despite replication lag.
+"""
+import contextvars
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+# None outside a replica-eligible scope; otherwise a dict with a 'pinned' flag
+# and the replica chosen for the scope
+_scope = contextvars.ContextVar('db_replica_scope', default=None)
+
+_query_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+def replica_apps():
+    return set(getattr(settings, 'DATABASE_REPLICA_APPS', ['personnel']))
+
+
+@contextmanager
+def use_replicas():
+    """Allow reads inside the block to go to a replica until the first write"""
+    token = _scope.set({'pinned': False})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def wrote_to_primary():
+    """True if the current replica scope has written (and is now pinned to the primary)"""
+    scope = _scope.get()
+    return bool(scope and scope['pinned'])
+
+
+class ReplicaRouter:
+    """Send eligible reads to a replica (picked at random per scope) and all writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is None or scope['pinned'] or model._meta.app_label not in replica_apps():
+            return PRIMARY
+        if 'replica' not in scope:
+            # One replica per request, so all of its reads see the same snapshot
+            replicas = replica_aliases()
+            scope['replica'] = random.choice(replicas) if replicas else PRIMARY
+        return scope['replica']
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope['pinned'] = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db == PRIMARY
+
+
+def count_query(alias):
+    """Return an execute wrapper that tallies queries run on the given alias"""
+    def wrapper(execute, sql, params, many, context):
+        with _counts_lock:
+            _query_counts[alias] += 1
+        return execute(sql, params, many, context)
+    return wrapper
+
+
+def query_load():
+    """Queries per database alias seen by this process, and the share served by replicas"""
+    with _counts_lock:
+        counts = dict(_query_counts)
+    total = sum(counts.values())
+    offloaded = total - counts.get(PRIMARY, 0)
+    return {
+        'queries': counts,
+        'total': total,
+        'replicaShare': round(offloaded * 100 / total, 1) if total else 0.0,
+    }
+
+
+def reset_query_load():
+    with _counts_lock:
+        _query_counts.clear()
@@ -0,0 +1,230 @@
+"""
+Database-backed background jobs.
+
+Views enqueue work with `enqueue()` and return the job id; the `run_worker`
+management command claims pending jobs and runs the registered handler.
+No broker is needed - the Job table is the queue.
+
+Claiming uses a conditional UPDATE (status PENDING -> RUNNING), so two workers can
+never run the same job. A job whose worker died (no heartbeat for
+JOB_STALE_AFTER_SECONDS) is put back to PENDING and retried up to JOB_MAX_ATTEMPTS.
+While a handler runs, a heartbeat thread keeps the job fresh, and the final status is
+only written if this worker still owns the job.
+Handlers must therefore be safe to re-run: roster generation is, because the solver
+keeps existing duties and only fills the slots still open, and it writes in one
+transaction.
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Job
+
+# kind -> handler(job, params); a handler returns a result dict or
+# (result dict, (artifact bytes, file name, content type))
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register a function as the handler for a job kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def request_key(kind, params, client_key=None):
+    """
+    Idempotency key for a job queued from an API request: the client's own key, or
+    a hash of the parameters when none is given. Either way it is prefixed with the
+    job kind, because keys are unique across all kinds.
+    """
+    if client_key:
+        return f"{kind}:client:{client_key}"
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{kind}:params:{digest}"
+
+
+def enqueue(kind, params=None, user=None, idempotency_key=None):
+    """
+    Queue a job and return it. With an idempotency key, a job already queued or
+    finished under that key is returned instead of creating a duplicate
+    (failed jobs are re-queued).
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    params = params or {}
+    if idempotency_key is None:
+        return Job.objects.create(kind=kind, params=params, created_by=user)
+
+    with transaction.atomic():
+        job, created = Job.objects.get_or_create(
+            idempotency_key=idempotency_key,
+            defaults={'kind': kind, 'params': params, 'created_by': user},
+        )
+        if not created and job.status == 'FAILED':
+            Job.objects.filter(pk=job.pk, status='FAILED').update(
+                status='PENDING', progress=0, message='', error='', attempts=0, finished_at=None
+            )
+            job.refresh_from_db()
+    return job
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def requeue_stale_jobs():
+    """Put RUNNING jobs whose worker stopped heart-beating back in the queue"""
+    stale_after = getattr(settings, 'JOB_STALE_AFTER_SECONDS', 600)
+    max_attempts = getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = Job.objects.filter(status='RUNNING', heartbeat_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status='FAILED', error='Worker stopped responding', finished_at=timezone.now()
+    )
+    requeued = stale.update(status='PENDING', worker='', message='Re-queued after worker failure')
+    return requeued + failed
+
+
+def claim_next_job(worker):
+    """Atomically move the oldest pending job to RUNNING for this worker; None if the queue is empty"""
+    while True:
+        candidate = (
+            Job.objects.filter(status='PENDING')
+            .order_by('created_at')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if candidate is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=candidate, status='PENDING').update(
+            status='RUNNING', worker=worker, started_at=now, heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=candidate)
+        # Another worker took it first - try the next one
+
+
+def set_progress(job, progress, message=''):
+    """Record progress from inside a handler; doubles as the worker heartbeat"""
+    job.progress = max(0, min(100, int(progress)))
+    job.message = message[:255]
+    Job.objects.filter(pk=job.pk).update(
+        progress=job.progress, message=job.message, heartbeat_at=timezone.now()
+    )
+
+
+class _Heartbeat(threading.Thread):
+    """Refresh a running job's heartbeat_at until stopped, however long the handler takes"""
+
+    def __init__(self, job):
+        super().__init__(name=f'job-heartbeat-{job.pk}', daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+        stale_after = getattr(settings, 'JOB_STALE_AFTER_SECONDS', 600)
+        self.interval = getattr(settings, 'JOB_HEARTBEAT_SECONDS', max(1, stale_after // 4))
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                Job.objects.filter(pk=self.job.pk, worker=self.job.worker, status='RUNNING').update(
+                    heartbeat_at=timezone.now()
+                )
+        finally:
+            # This thread has its own database connection
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job):
+    """
+    Run one claimed job and store its result, artifact or error. Returns False if it
+    failed, or if the job was taken away from this worker meanwhile (the result is dropped).
+    """
+    handler = JOB_HANDLERS.get(job.kind)
+    owned = Job.objects.filter(pk=job.pk, worker=job.worker, status='RUNNING')
+    heartbeat = _Heartbeat(job)
+    heartbeat.start()
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind '{job.kind}'")
+        output = handler(job, job.params)
+    except Exception:
+        heartbeat.stop()
+        owned.update(status='FAILED', error=traceback.format_exc(), finished_at=timezone.now())
+        return False
+    heartbeat.stop()
+
+    artifact = None
+    if isinstance(output, tuple):
+        output, artifact = output
+    updates = {
+        'status': 'SUCCEEDED', 'progress': 100, 'result': output, 'finished_at': timezone.now(),
+    }
+    if artifact is not None:
+        updates['artifact'], updates['artifact_name'], updates['artifact_content_type'] = artifact
+    return bool(owned.update(**updates))
+
+
+def _date_param(params, name):
+    value = parse_date(str(params.get(name, '')))
+    if value is None:
+        raise ValueError(f"Job parameter '{name}' must be a YYYY-MM-DD date")
+    return value
+
+
+@job_handler('roster.generate')
+def generate_roster_job(job, params):
+    from .rostering import solve_roster
+    set_progress(job, 5, 'Solving roster')
+    return solve_roster(
+        _date_param(params, 'from'), _date_param(params, 'to'),
+        params.get('rules') or None, commit=not params.get('dryRun', False),
+    )
+
+
+@job_handler('roster.report')
+def roster_report_job(job, params):
+    from .services import generate_roster_pdf
+    start_date, end_date = _date_param(params, 'from'), _date_param(params, 'to')
+    set_progress(job, 10, 'Building report')
+    report = generate_roster_pdf(start_date, end_date)
+    name = f"roster_{start_date}_{end_date}.txt"
+    return {'from': start_date, 'to': end_date}, (report.encode('utf-8'), name, 'text/plain')
+
+
+@job_handler('promotions.rebuild')
+def rebuild_promotions_job(job, params):
+    from .services import rebuild_promotion_eligibility
+    set_progress(job, 5, 'Computing promotion eligibility')
+    return {'eligible': rebuild_promotion_eligibility()}
+
+
+@job_handler('attachments.thumbnails')
+def thumbnails_job(job, params):
+    from .attachments import generate_thumbnails
+    set_progress(job, 10, 'Rendering thumbnails')
+    return {'sha256': params['sha256'], 'sizes': generate_thumbnails(params['sha256'])}
+
+
+@job_handler('archive.history')
+def archive_history_job(job, params):
+    from .archive import archive_history
+    set_progress(job, 5, 'Moving old guard duties and leave to the archive')
+    return archive_history()
@@ -0,0 +1,220 @@
+"""
+Leave entitlements, working-day counting and the per-person balance ledger.
+
+LeaveBalance holds one row per (person, leave type, year), with the days `taken`
+(approved or completed leave) and `reserved` (pending requests). Leave.save()
+applies the difference between what the request used to count for and what it
+counts for now, and a pre_delete receiver removes a deleted leave. Every
+transition - create, edit, approve, reject, cancel, complete, delete - is
+therefore a single-row update in the same transaction. A
+leave counts against the year of its start date.
+
+Entitlements come from DEFAULT_LEAVE_ENTITLEMENTS, overridden by
+settings.LEAVE_ENTITLEMENTS: {leave_type: {'default': days, <rank>: days}}. A
+type without an entitlement (None) is not limited but is still tallied.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import ArchivedLeave, Holiday, Leave, LeaveBalance, Personnel
+
+DEFAULT_LEAVE_ENTITLEMENTS = {
+    'ANNUAL': {'default': 30},
+    'CASUAL': {'default': 7},
+    'SICK': {'default': None},
+    'MATERNITY': {'default': 84},
+    'PATERNITY': {'default': 14},
+    'COMPASSIONATE': {'default': 7},
+    'STUDY': {'default': None},
+}
+
+# Monday=0 ... Sunday=6
+DEFAULT_WEEKEND_DAYS = (5, 6)
+
+# Which balance column a leave in each status counts against
+STATUS_COLUMN = {
+    'PENDING': 'reserved',
+    'APPROVED': 'taken',
+    'COMPLETED': 'taken',
+}
+
+
+def get_entitlement(leave_type, rank):
+    """Days per year for this leave type and rank; None if the type is not limited"""
+    configured = getattr(settings, 'LEAVE_ENTITLEMENTS', {}).get(leave_type, {})
+    rules = {**DEFAULT_LEAVE_ENTITLEMENTS.get(leave_type, {'default': None}), **configured}
+    return rules.get(rank, rules.get('default'))
+
+
+def working_days(start_date, end_date, holidays=None):
+    """
+    Days from start_date to end_date inclusive, excluding weekends and holidays.
+    Pass `holidays` (a collection of dates) to avoid the Holiday query in loops.
+    """
+    if not start_date or not end_date or end_date < start_date:
+        return 0
+    weekend = set(getattr(settings, 'LEAVE_WEEKEND_DAYS', DEFAULT_WEEKEND_DAYS))
+    total = (end_date - start_date).days + 1
+    full_weeks, remainder = divmod(total, 7)
+    days = full_weeks * (7 - len(weekend))
+    first = start_date.weekday()
+    days += sum(1 for offset in range(remainder) if (first + offset) % 7 not in weekend)
+    if holidays is None:
+        holidays = Holiday.objects.filter(date__range=(start_date, end_date)).values_list('date', flat=True)
+    days -= sum(1 for holiday in holidays if start_date <= holiday <= end_date and holiday.weekday() not in weekend)
+    return days
+
+
+def get_balance(personnel, leave_type, year):
+    """The balance row, created with the current entitlement if missing"""
+    balance, _ = LeaveBalance.objects.get_or_create(
+        personnel_id=personnel.pk,
+        leave_type=leave_type,
+        year=year,
+        defaults={'entitlement': get_entitlement(leave_type, personnel.rank)},
+    )
+    return balance
+
+
+def remaining_days(personnel, leave_type, year):
+    """Days still available (None if unlimited); one indexed read once the row exists"""
+    return get_balance(personnel, leave_type, year).remaining
+
+
+def _contribution(values):
+    """(leave_type, year, column, days) a leave counts for, or None"""
+    column = STATUS_COLUMN.get(values.get('status'))
+    if column is None or not values.get('start_date') or not values.get('days_count'):
+        return None
+    return values['leave_type'], values['start_date'].year, column, values['days_count']
+
+
+def _adjust(personnel_id, contribution, sign):
+    leave_type, year, column, days = contribution
+    updated = LeaveBalance.objects.filter(
+        personnel_id=personnel_id, leave_type=leave_type, year=year
+    ).update(**{column: F(column) + sign * days})
+    if not updated:
+        personnel = Personnel.objects.only('rank').get(pk=personnel_id)
+        balance = get_balance(personnel, leave_type, year)
+        LeaveBalance.objects.filter(pk=balance.pk).update(**{column: F(column) + sign * days})
+
+
+def apply_leave_change(leave, previous):
+    """
+    Move the leave's weight in the ledger from what `previous` (its loaded field
+    values, or None for a new leave) counted for to what it counts for now.
+    Call inside the transaction that saves the leave.
+    """
+    before = _contribution(previous or {})
+    after = _contribution({
+        'status': leave.status, 'leave_type': leave.leave_type,
+        'start_date': leave.start_date, 'days_count': leave.days_count,
+    })
+    if before == after and (previous or {}).get('personnel_id') == leave.personnel_id:
+        return
+    if before:
+        _adjust(previous['personnel_id'], before, -1)
+    if after:
+        _adjust(leave.personnel_id, after, 1)
+
+
+def remove_leave(leave, previous):
+    """Take a leave that is being deleted out of the ledger"""
+    values = previous or leave.tracked_values()
+    contribution = _contribution(values)
+    if contribution:
+        _adjust(values['personnel_id'], contribution, -1)
+
+
+def recount_leave_days(service_numbers=None):
+    """Recalculate days_count as working days (leave recorded before the ledger used calendar days)"""
+    from . import audit, replication
+    from .leave_usage import months_between, refresh_leave_usage
+    from .services import invalidate_dossier
+
+    leaves = Leave.objects.only('id', 'personnel_id', 'origin', 'start_date', 'end_date', 'days_count')
+    if service_numbers is not None:
+        leaves = leaves.filter(personnel_id__in=list(service_numbers))
+    holidays = set(Holiday.objects.values_list('date', flat=True))
+    changed, before = [], {}
+    for leave in leaves.iterator(chunk_size=2000):
+        days = working_days(leave.start_date, leave.end_date, holidays)
+        if days != leave.days_count:
+            before[leave.pk] = leave.days_count
+            leave.days_count = days
+            leave.version = F('version') + 1
+            changed.append(leave)
+    # bulk_update sends no signals: bump versions, log and audit the change explicitly
+    with transaction.atomic():
+        Leave.objects.bulk_update(changed, ['days_count', 'version'], batch_size=1000)
+        replication.record_many((leave, 'U', {'days_count': leave.days_count}) for leave in changed)
+    audit.record_many(
+        ('personnel.leave', leave.pk, 'U', {'days_count': [before[leave.pk], leave.days_count]})
+        for leave in changed
+    )
+    for personnel_id in {leave.personnel_id for leave in changed}:
+        invalidate_dossier(personnel_id, ['leaves'])
+    # Nor does the usage rollup follow bulk_update; refresh the months the recounted leaves cover
+    months = {month for leave in changed for month in months_between(leave.start_date, leave.end_date)}
+    if months:
+        refresh_leave_usage(months)
+    return len(changed)
+
+
+def rebuild_leave_balances(service_numbers=None):
+    """
+    Recompute balance rows from leave history (after bulk loads or entitlement
+    changes). Returns the number of rows written.
+    """
+    # Archived (old, finished) leave still counts towards its year
+    sources = [
+        Leave.objects.filter(status__in=list(STATUS_COLUMN)),
+        ArchivedLeave.objects.filter(status__in=list(STATUS_COLUMN)),
+    ]
+    balances = LeaveBalance.objects.all()
+    people = Personnel.objects.all()
+    if service_numbers is not None:
+        service_numbers = list(service_numbers)
+        sources = [leaves.filter(personnel_id__in=service_numbers) for leaves in sources]
+        balances = balances.filter(personnel_id__in=service_numbers)
+        people = people.filter(pk__in=service_numbers)
+
+    ranks = dict(people.values_list('pk', 'rank'))
+    totals = {}
+    for leaves in sources:
+        rows = (
+            leaves.order_by()
+            .values('personnel_id', 'leave_type', 'start_date__year', 'status')
+            .annotate(days=Sum('days_count'))
+        )
+        for row in rows:
+            key = (row['personnel_id'], row['leave_type'], row['start_date__year'])
+            counts = totals.setdefault(key, {'taken': 0, 'reserved': 0})
+            counts[STATUS_COLUMN[row['status']]] += row['days'] or 0
+
+    with transaction.atomic():
+        balances.delete()
+        LeaveBalance.objects.bulk_create(
+            [
+                LeaveBalance(
+                    personnel_id=personnel_id, leave_type=leave_type, year=year,
+                    entitlement=get_entitlement(leave_type, ranks.get(personnel_id)), **counts
+                )
+                for (personnel_id, leave_type, year), counts in totals.items()
+                if personnel_id in ranks
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def next_working_day(day):
+    """First working day after `day` (the resumption date of a leave ending on `day`)"""
+    day += timedelta(days=1)
+    while working_days(day, day) == 0:
+        day += timedelta(days=1)
+    return day
@@ -0,0 +1,245 @@
+"""
+Leave usage cube: a monthly rollup of leave taken, for trend reports.
+
+LeaveUsage holds one row per (month, leave type, section, rank) with the number
+of leaves that started in the month and the working days of leave that fell in
+it, so a leave spanning two months is split between them. Section and rank are
+the ones the person held on the leave's start date (from ServiceInterval). Only
+approved and completed leave counts.
+
+Leave.save() moves a leave's cells from what it counted for before to what it
+counts for now, a few single-row updates in the same transaction; deleting a
+leave (directly or by cascade) takes it out in a pre_delete receiver. Bulk paths
+(replication, snapshot loads) call refresh_leave_usage() for the months they
+touched instead. Reports group the rollup, so a multi-year query reads a few
+hundred rows whatever the size of the leave table.
+"""
+import calendar
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import ExtractYear
+
+from .leave_ledger import working_days
+from .models import ArchivedLeave, Holiday, Leave, LeaveUsage, Personnel, ServiceInterval
+from .services import valid_on
+
+USAGE_STATUSES = ('APPROVED', 'COMPLETED')
+
+TRACKED_FIELDS = ('status', 'leave_type', 'start_date', 'end_date', 'personnel_id')
+
+# Report dimension -> (rollup fields to group on, output key per field)
+DIMENSIONS = {
+    'leave_type': {'leave_type': 'leaveType'},
+    'month': {'month': 'month'},
+    'year': {'year': 'year'},
+    'section': {'section_id': 'sectionId', 'section__name': 'section'},
+    'department': {'section__department_id': 'departmentId', 'section__department__name': 'department'},
+    'rank': {'rank': 'rank'},
+}
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def months_between(start_date, end_date):
+    """First days of the months from start_date to end_date inclusive"""
+    months = []
+    month = month_start(start_date)
+    while month <= end_date:
+        months.append(month)
+        month = month_end(month) + timedelta(days=1)
+    return months
+
+
+def _split(start_date, end_date, holidays=None):
+    """[(month, leaves, days)] for a leave: counted once in its first month, days split by month"""
+    return [
+        (month, int(month <= start_date), working_days(max(month, start_date), min(month_end(month), end_date), holidays))
+        for month in months_between(start_date, end_date)
+    ]
+
+
+def _dimensions(personnel_id, on_date):
+    """(section_id, rank) the person held on `on_date`"""
+    row = (
+        ServiceInterval.objects.filter(valid_on(on_date), personnel_id=personnel_id)
+        .values_list('section_id', 'rank').first()
+    )
+    if row:
+        return row
+    return None, Personnel.objects.filter(pk=personnel_id).values_list('rank', flat=True).first()
+
+
+def _cells(values, dimensions=None):
+    """{(month, leave_type, section_id, rank): (leaves, days)} a leave counts for"""
+    start_date, end_date = values.get('start_date'), values.get('end_date')
+    if values.get('status') not in USAGE_STATUSES or not start_date or not end_date or end_date < start_date:
+        return {}
+    section_id, rank = dimensions or _dimensions(values['personnel_id'], start_date)
+    if rank is None:
+        return {}
+    return {
+        (month, values['leave_type'], section_id, rank): (leaves, days)
+        for month, leaves, days in _split(start_date, end_date)
+    }
+
+
+def _adjust(cells, sign):
+    for (month, leave_type, section_id, rank), (leaves, days) in cells.items():
+        increments = {'leaves': F('leaves') + sign * leaves, 'days': F('days') + sign * days}
+        cell = LeaveUsage.objects.filter(month=month, leave_type=leave_type, section_id=section_id, rank=rank)
+        if cell.update(**increments):
+            continue
+        row, created = LeaveUsage.objects.get_or_create(
+            month=month, leave_type=leave_type, section_id=section_id, rank=rank,
+            defaults={'leaves': sign * leaves, 'days': sign * days},
+        )
+        if not created:
+            LeaveUsage.objects.filter(pk=row.pk).update(**increments)
+
+
+def apply_leave_change(leave, previous):
+    """
+    Move the leave's weight in the rollup from what `previous` (its loaded field
+    values, or None for a new leave) counted for to what it counts for now.
+    Call inside the transaction that saves the leave.
+    """
+    previous = previous or {}
+    current = {name: getattr(leave, name) for name in TRACKED_FIELDS}
+    if all(previous.get(name) == current[name] for name in TRACKED_FIELDS):
+        return
+    before = _cells(previous)
+    after = _cells(current)
+    if before == after:
+        return
+    _adjust(before, -1)
+    _adjust(after, 1)
+
+
+def remove_leave(leave, previous):
+    """Take a leave that is being deleted out of the rollup"""
+    _adjust(_cells(previous or leave.tracked_values()), -1)
+
+
+def _service_history(service_numbers, chunk_size=500):
+    """
+    (intervals, ranks): service number -> [(valid_from, valid_to, section_id, rank)]
+    ordered by valid_from, and service number -> current rank
+    """
+    intervals, ranks = {}, {}
+    service_numbers = list(service_numbers)
+    for offset in range(0, len(service_numbers), chunk_size):
+        chunk = service_numbers[offset:offset + chunk_size]
+        rows = (
+            ServiceInterval.objects.filter(personnel_id__in=chunk)
+            .order_by('personnel_id', 'valid_from')
+            .values_list('personnel_id', 'valid_from', 'valid_to', 'section_id', 'rank')
+        )
+        for service_number, *interval in rows:
+            intervals.setdefault(service_number, []).append(interval)
+        ranks.update(Personnel.objects.filter(pk__in=chunk).values_list('pk', 'rank'))
+    return intervals, ranks
+
+
+def refresh_leave_usage(months=None):
+    """
+    Recompute the rollup for the given months (any date in each) or, with None, for
+    all of history. Returns the number of rows written.
+    """
+    # Archived (old, finished) leave is part of history too
+    sources = [Leave.objects.filter(status__in=USAGE_STATUSES), ArchivedLeave.objects.filter(status__in=USAGE_STATUSES)]
+    rows = LeaveUsage.objects.all()
+    if months is not None:
+        months = sorted({month_start(month) for month in months})
+        if not months:
+            return 0
+        sources = [
+            leaves.filter(start_date__lte=month_end(months[-1]), end_date__gte=months[0]) for leaves in sources
+        ]
+        rows = rows.filter(month__in=months)
+    leaves = [
+        leave for source in sources
+        for leave in source.values_list('personnel_id', 'leave_type', 'start_date', 'end_date')
+    ]
+
+    intervals, ranks = _service_history({leave[0] for leave in leaves})
+    holidays = set(Holiday.objects.values_list('date', flat=True))
+    wanted = set(months) if months is not None else None
+
+    totals = {}
+    for service_number, leave_type, start_date, end_date in leaves:
+        if end_date < start_date:
+            continue
+        section_id, rank = None, ranks.get(service_number)
+        for valid_from, valid_to, interval_section, interval_rank in intervals.get(service_number, []):
+            if valid_from <= start_date and (valid_to is None or valid_to > start_date):
+                section_id, rank = interval_section, interval_rank
+                break
+        if rank is None:
+            continue
+        for month, count, days in _split(start_date, end_date, holidays):
+            if wanted is not None and month not in wanted:
+                continue
+            cell = totals.setdefault((month, leave_type, section_id, rank), [0, 0])
+            cell[0] += count
+            cell[1] += days
+
+    with transaction.atomic():
+        rows.delete()
+        LeaveUsage.objects.bulk_create(
+            [
+                LeaveUsage(month=month, leave_type=leave_type, section_id=section_id, rank=rank,
+                           leaves=count, days=days)
+                for (month, leave_type, section_id, rank), (count, days) in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def leave_usage_report(group_by, date_from=None, date_to=None, filters=None):
+    """
+    Leave taken grouped by any of DIMENSIONS, for the months overlapping
+    [date_from, date_to]. `filters` may restrict leave_type, section, department
+    and rank. Returns a list of rows with 'leaves' and 'days'.
+    """
+    usage = LeaveUsage.objects.all()
+    if date_from:
+        usage = usage.filter(month__gte=month_start(date_from))
+    if date_to:
+        usage = usage.filter(month__lte=date_to)
+    filters = filters or {}
+    lookups = {
+        'leave_type': 'leave_type',
+        'section': 'section_id',
+        'department': 'section__department_id',
+        'rank': 'rank',
+    }
+    for name, value in filters.items():
+        if value not in (None, ''):
+            usage = usage.filter(**{lookups[name]: value})
+    if 'year' in group_by:
+        usage = usage.annotate(year=ExtractYear('month'))
+
+    fields = [field for dimension in group_by for field in DIMENSIONS[dimension]]
+    keys = {field: key for dimension in group_by for field, key in DIMENSIONS[dimension].items()}
+    grouped = usage.values(*fields).annotate(leaves=Sum('leaves'), days=Sum('days')).order_by(*fields)
+
+    rows = []
+    for row in grouped:
+        if not row['leaves'] and not row['days']:
+            continue
+        entry = {keys[field]: row[field] for field in fields}
+        if 'month' in entry:
+            entry['month'] = entry['month'].strftime('%Y-%m')
+        entry['leaves'] = row['leaves']
+        entry['days'] = row['days']
+        rows.append(entry)
+    return rows
@@ -0,0 +1,30 @@
+"""
+Management command to consolidate change files exported by other sites.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from personnel.replication import apply_changes, ReplicationError, STRATEGIES
+
+
+class Command(BaseCommand):
+    help = 'Apply change files written by export_changes at other sites'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Change files, one or more per site')
+        parser.add_argument(
+            '--strategy',
+            choices=STRATEGIES,
+            help="Conflict rule: 'field' merges per field, 'lww' keeps the latest change per record "
+                 "(default: REPLICATION_STRATEGY)",
+        )
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            try:
+                stats = apply_changes(path, strategy=options['strategy'])
+            except (ReplicationError, OSError) as exc:
+                raise CommandError(f'{path}: {exc}')
+            self.stdout.write(self.style.SUCCESS(
+                f"{stats['site']}: applied {stats['applied']}, stale {stats['stale']}, "
+                f"field conflicts {stats['conflicts']}, skipped {stats['skipped']} "
+                f"(now at change {stats['lastSeq']})"
+            ))
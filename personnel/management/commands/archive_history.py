@@ -0,0 +1,31 @@
+"""
+Management command to move old guard duties and finished leave to the archive
+tables now, instead of waiting for the worker's daily run.
+"""
+from django.core.management.base import BaseCommand
+
+from personnel.archive import (
+    ARCHIVED_LEAVE_STATUSES, archive_guard_duties, archive_leaves, guard_duty_cutoff, leave_cutoff
+)
+from personnel.models import GuardDutyRoster, Leave
+
+
+class Command(BaseCommand):
+    help = 'Archive guard duties and finished leave older than ARCHIVE_*_AFTER_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would move')
+
+    def handle(self, *args, **options):
+        duty_cutoff, leaves_cutoff = guard_duty_cutoff(), leave_cutoff()
+        if options['dry_run']:
+            duties = GuardDutyRoster.objects.filter(date__lt=duty_cutoff).count()
+            leaves = Leave.objects.filter(status__in=ARCHIVED_LEAVE_STATUSES, end_date__lt=leaves_cutoff).count()
+            self.stdout.write(f'Would archive {duties} guard duties before {duty_cutoff} '
+                              f'and {leaves} leaves ended before {leaves_cutoff}')
+            return
+        duties = archive_guard_duties(duty_cutoff)
+        leaves = archive_leaves(leaves_cutoff)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {duties} guard duties before {duty_cutoff} and {leaves} leaves ended before {leaves_cutoff}'
+        ))
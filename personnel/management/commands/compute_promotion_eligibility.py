@@ -0,0 +1,14 @@
+"""
+Management command to rebuild the promotion board table.
+Intended to run nightly (e.g. from cron) so the board screen reads precomputed rows.
+"""
+from django.core.management.base import BaseCommand
+from personnel.services import rebuild_promotion_eligibility
+
+
+class Command(BaseCommand):
+    help = 'Recompute promotion eligibility for the whole force'
+
+    def handle(self, *args, **options):
+        count = rebuild_promotion_eligibility()
+        self.stdout.write(self.style.SUCCESS(f'{count} personnel eligible for promotion'))
@@ -0,0 +1,25 @@
+"""
+Management command to write this site's outbound change log for HQ.
+"""
+from django.core.management.base import BaseCommand
+from personnel.replication import export_changes, site_code
+
+
+class Command(BaseCommand):
+    help = "Write this site's change log entries after --since to a file for apply_changes at HQ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file, e.g. LAG-changes.gz')
+        parser.add_argument(
+            '--since',
+            type=int,
+            default=0,
+            help='Last change number HQ has applied from this site (default: 0, everything)',
+        )
+
+    def handle(self, *args, **options):
+        count, last_seq = export_changes(options['path'], since=options['since'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} changes from site {site_code()} ({options['since'] + 1}-{last_seq}) "
+            f"to {options['path']}"
+        ))
@@ -0,0 +1,33 @@
+"""
+Management command to write an offline snapshot for detachments away from the LAN.
+"""
+import os
+
+from django.core.management.base import BaseCommand
+from personnel.snapshot import export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write a compressed snapshot of the nominal roll, org structure and current rosters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file, e.g. snapshot.pms.gz')
+        parser.add_argument(
+            '--roster-days',
+            type=int,
+            default=31,
+            help='Include duties from this many days back onward (default: 31)',
+        )
+        parser.add_argument(
+            '--all-rosters',
+            action='store_true',
+            help='Include the full roster history',
+        )
+
+    def handle(self, *args, **options):
+        roster_days = None if options['all_rosters'] else options['roster_days']
+        counts = export_snapshot(options['path'], roster_days=roster_days)
+        for label, count in counts.items():
+            self.stdout.write(f'  {label}: {count}')
+        size_kb = os.path.getsize(options['path']) / 1024
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['path']} ({size_kb:.0f} KB)"))
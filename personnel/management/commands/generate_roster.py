@@ -0,0 +1,53 @@
+"""
+Management command to fill the guard duty roster with the constraint-aware solver.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from personnel.rostering import solve_roster, validate_roster_rules
+import json
+
+
+class Command(BaseCommand):
+    help = 'Fill GuardDutyRoster for a date range using the constraint-aware roster solver'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='First roster date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', required=True, help='Last roster date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--rules',
+            type=str,
+            help='JSON object overriding ROSTER_RULES, e.g. \'{"min_rest_hours": 24}\'',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Plan the roster without saving it',
+        )
+
+    def handle(self, *args, **options):
+        start_date = parse_date(options['start'])
+        end_date = parse_date(options['end'])
+        if not start_date or not end_date or end_date < start_date:
+            raise CommandError('--from and --to must be valid dates with --to on or after --from')
+        try:
+            rules = json.loads(options['rules']) if options['rules'] else None
+        except json.JSONDecodeError as exc:
+            raise CommandError(f'Invalid --rules JSON: {exc}')
+
+        try:
+            if rules is not None:
+                validate_roster_rules(rules)
+        except ValueError as exc:
+            raise CommandError(f'Invalid --rules: {exc}')
+
+        result = solve_roster(start_date, end_date, rules, commit=not options['dry_run'])
+
+        for slot in result['unfilled']:
+            self.stdout.write(self.style.WARNING(
+                f"  Unfilled: {slot['date']} {slot['shift']} - {slot['missing']} short"
+            ))
+        verb = 'Planned' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['planned']} duties from {start_date} to {end_date}; "
+            f"{len(result['unfilled'])} slots not fully filled"
+        ))
@@ -0,0 +1,43 @@
+"""
+Management command to generate missing attachment thumbnails in a process pool.
+Uploads queue their own thumbnails as background jobs; run this after changing
+ATTACHMENT_THUMBNAIL_SIZES or restoring files.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from personnel.attachments import record_thumbnails, render_thumbnails, thumbnail_sizes
+from personnel.models import StoredFile
+
+
+class Command(BaseCommand):
+    help = 'Render missing thumbnails for stored images using a pool of processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Processes to use (default: CPU count)')
+
+    def handle(self, *args, **options):
+        sizes = thumbnail_sizes()
+        pending = [
+            sha256 for sha256, done in
+            StoredFile.objects.filter(content_type__startswith='image/').values_list('sha256', 'thumbnails')
+            if not set(sizes) <= set(done)
+        ]
+        if not pending:
+            self.stdout.write(self.style.SUCCESS('All thumbnails are up to date'))
+            return
+
+        # Workers only touch files; don't let them inherit open database connections
+        connections.close_all()
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {sha256: pool.submit(render_thumbnails, sha256, sizes) for sha256 in pending}
+            for sha256, future in futures.items():
+                try:
+                    record_thumbnails(sha256, future.result())
+                except Exception as exc:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'{sha256}: {exc}'))
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails for {len(pending) - failed} of {len(pending)} images'))
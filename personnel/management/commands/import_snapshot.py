@@ -0,0 +1,26 @@
+"""
+Management command to load an offline snapshot written by export_snapshot.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from personnel.snapshot import load_snapshot, SnapshotError
+
+
+class Command(BaseCommand):
+    help = 'Load a snapshot written by export_snapshot into this database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Snapshot file')
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Empty the snapshot tables (and rows referencing them) before loading',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            counts = load_snapshot(options['path'], replace=options['replace'])
+        except (SnapshotError, OSError) as exc:
+            raise CommandError(str(exc))
+        for label, count in counts.items():
+            self.stdout.write(f'  {label}: {count}')
+        self.stdout.write(self.style.SUCCESS(f"Loaded {sum(counts.values())} rows from {options['path']}"))
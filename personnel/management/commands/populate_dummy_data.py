@@ -65,8 +65,7 @@ class Command(BaseCommand):
                 current_rank=p.rank,
                 date_of_last_promotion=p.date_of_enlistment + datetime.timedelta(days=random.randint(100, 1000)),
                 date_of_last_transfer=p.date_of_enlistment + datetime.timedelta(days=random.randint(50, 500)),
-                command_last_served='Depot NA',
-                years_in_service=random.randint(1, 20)
+                command_last_served='Depot NA'
             )
             
             # Qualification
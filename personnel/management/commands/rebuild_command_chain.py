@@ -0,0 +1,25 @@
+"""
+Management command to rebuild the chain-of-command closure table.
+Run once after upgrading; afterwards the table is kept current by signals.
+"""
+from django.core.management.base import BaseCommand
+from personnel.command_chain import rebuild_chain, refresh_chain
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the chain of command (who reports to whom, at every level)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'service_numbers',
+            nargs='*',
+            help='Only re-attach these personnel (and everyone under them); default: rebuild everything',
+        )
+
+    def handle(self, *args, **options):
+        if options['service_numbers']:
+            moved = refresh_chain(options['service_numbers'])
+            self.stdout.write(self.style.SUCCESS(f'Re-attached {moved} personnel'))
+            return
+        written = rebuild_chain()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} chain of command rows'))
@@ -0,0 +1,30 @@
+"""
+Management command to recompute the leave balance ledger from leave history.
+Run once after upgrading (with --recount), and after changing LEAVE_ENTITLEMENTS.
+"""
+from django.core.management.base import BaseCommand
+from personnel.leave_ledger import rebuild_leave_balances, recount_leave_days
+
+
+class Command(BaseCommand):
+    help = 'Recompute LeaveBalance rows (taken, reserved, entitlement) from leave history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'service_numbers',
+            nargs='*',
+            help='Only rebuild these personnel (default: everyone)',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='First recalculate each leave as working days (for leave recorded as calendar days)',
+        )
+
+    def handle(self, *args, **options):
+        service_numbers = options['service_numbers'] or None
+        if options['recount']:
+            changed = recount_leave_days(service_numbers)
+            self.stdout.write(f'Recounted {changed} leave requests as working days')
+        written = rebuild_leave_balances(service_numbers)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} leave balances'))
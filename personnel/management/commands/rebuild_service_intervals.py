@@ -0,0 +1,21 @@
+"""
+Management command to re-derive the ServiceInterval history table.
+Run once after upgrading; afterwards the table is kept current by signals.
+"""
+from django.core.management.base import BaseCommand
+from personnel.services import rebuild_service_intervals
+
+
+class Command(BaseCommand):
+    help = 'Rebuild point-in-time service intervals from assignments and career history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'service_numbers',
+            nargs='*',
+            help='Only rebuild these personnel (default: everyone)',
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_service_intervals(options['service_numbers'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} service intervals'))
@@ -0,0 +1,26 @@
+"""
+Management command to recompute the monthly leave usage rollup from leave history.
+Run once after upgrading, and after backdated posting or promotion changes.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from personnel.leave_usage import months_between, refresh_leave_usage
+
+
+class Command(BaseCommand):
+    help = 'Recompute LeaveUsage rows (the leave-usage report rollup) from leave history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First month to refresh, YYYY-MM-DD (default: all history)')
+        parser.add_argument('--to', dest='date_to', help='Last month to refresh, YYYY-MM-DD (default: --from)')
+
+    def handle(self, *args, **options):
+        months = None
+        if options['date_from']:
+            date_from = parse_date(options['date_from'])
+            date_to = parse_date(options['date_to'] or options['date_from'])
+            if date_from is None or date_to is None:
+                raise CommandError('Dates must be YYYY-MM-DD')
+            months = months_between(date_from, date_to)
+        written = refresh_leave_usage(months)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} leave usage rows'))
@@ -0,0 +1,57 @@
+"""
+Management command that processes background jobs from the Job table.
+"""
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from personnel.archive import schedule_archival
+from personnel.jobs import claim_next_job, requeue_stale_jobs, run_job, worker_name
+from personnel.services import schedule_promotion_rebuild
+import time
+
+# Seconds between checks whether today's scheduled jobs (archival, promotion board) are queued
+SCHEDULE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Run a background job worker (roster generation, reports, exports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs currently queued, then exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        name = worker_name()
+        self.stdout.write(f'Worker {name} started')
+        next_schedule = 0
+        while True:
+            close_old_connections()
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Recovered {requeued} stale jobs'))
+            if time.monotonic() >= next_schedule:
+                # Idempotent per day, so any number of workers can do this
+                schedule_archival()
+                schedule_promotion_rebuild()
+                next_schedule = time.monotonic() + SCHEDULE_INTERVAL
+
+            job = claim_next_job(name)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Running {job.kind} {job.id}')
+            if run_job(job):
+                self.stdout.write(self.style.SUCCESS(f'  Succeeded {job.id}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'  Failed {job.id}'))
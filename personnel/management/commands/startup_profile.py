@@ -0,0 +1,119 @@
+"""
+Management command to profile application start-up: module import times
+(python -X importtime) and the latency of the first requests a fresh process
+serves compared with the same requests once warm.
+
+Runs a clean interpreter so nothing already imported by manage.py skews the figures.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_URLS = ['/api/', '/api/sections/', '/api/dashboard/', '/api/personnel/autocomplete/?q=a']
+
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.core.servers.basehttp import get_internal_wsgi_application
+get_internal_wsgi_application()
+loaded = time.perf_counter()
+warm = {}
+if sys.argv[1] == '1':
+    from personnel.warmup import warm_up
+    warm = warm_up()
+from django.test import Client
+client = Client()
+requests = []
+for url in sys.argv[2:]:
+    timings = []
+    for _ in range(2):
+        before = time.perf_counter()
+        status = client.get(url).status_code
+        timings.append((time.perf_counter() - before) * 1000)
+    requests.append({'url': url, 'status': status, 'firstMs': timings[0], 'secondMs': timings[1]})
+print(json.dumps({'loadMs': (loaded - started) * 1000, 'warmUp': warm, 'requests': requests}))
+'''
+
+
+def parse_importtime(output):
+    """[(self_us, cumulative_us, depth, module)] from python -X importtime output"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            module = name.rstrip()
+            depth = (len(module) - len(module.lstrip())) // 2
+            rows.append((int(self_us), int(cumulative_us), depth, module.strip()))
+        except ValueError:
+            continue
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Report import time per package and first-request latency of a fresh process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Rows to show per table (default 15)')
+        parser.add_argument('--url', action='append', dest='urls', help=f'URL to time (repeatable; default {DEFAULT_URLS})')
+        parser.add_argument('--warm', action='store_true', help='Run the warm-up (personnel.warmup) before the requests')
+        parser.add_argument('--json', action='store_true', help='Print the raw report as JSON')
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or DEFAULT_URLS
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+            'DJANGO_ALLOWED_HOSTS': ','.join([*settings.ALLOWED_HOSTS, 'testserver']),
+            'WARM_UP_ON_START': '',
+        }
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, '1' if options['warm'] else '0', *urls],
+            capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Start-up probe failed:\n{result.stderr[-2000:]}")
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        imports = parse_importtime(result.stderr)
+
+        # Cumulative time of top-level imports, rolled up to their package
+        packages = {}
+        for self_us, cumulative_us, depth, module in imports:
+            if depth == 0:
+                package = module.split('.')[0]
+                packages[package] = packages.get(package, 0) + cumulative_us
+        report = {
+            'modules': len(imports),
+            'importMs': round(sum(row[0] for row in imports) / 1000, 1),
+            'packages': sorted(packages.items(), key=lambda item: -item[1])[:options['top']],
+            'slowestModules': [
+                (module, self_us) for self_us, _, _, module in sorted(imports, key=lambda row: -row[0])[:options['top']]
+            ],
+            **probe,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"Imported {report['modules']} modules in {report['importMs']} ms; "
+                          f"app loaded in {probe['loadMs']:.0f} ms")
+        self.stdout.write('\nSlowest packages (cumulative import ms):')
+        for package, cumulative_us in report['packages']:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f}  {package}")
+        self.stdout.write('\nSlowest modules (own import ms):')
+        for module, self_us in report['slowestModules']:
+            self.stdout.write(f"  {self_us / 1000:8.1f}  {module}")
+        if probe['warmUp']:
+            self.stdout.write('\nWarm-up (ms): ' + ', '.join(f"{k} {v}" for k, v in probe['warmUp'].items()))
+        self.stdout.write('\nRequests (ms):         first   second')
+        for entry in probe['requests']:
+            self.stdout.write(
+                f"  {entry['url'][:40]:<40} {entry['firstMs']:7.1f} {entry['secondMs']:8.1f}  [{entry['status']}]"
+            )
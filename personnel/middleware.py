@@ -0,0 +1,107 @@
+"""
+Request middleware for the personnel app.
+"""
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+
+from .audit import set_current_user, reset_current_user
+from .db_router import use_replicas, wrote_to_primary, count_query, replica_aliases
+from .query_detector import detect_repeated_queries
+from . import profiler
+
+PIN_COOKIE = 'pms_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class AuditUserMiddleware:
+    """Makes the requesting user available to audit capture during the request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Resolved lazily, so DRF authentication inside the view is picked up too
+        token = set_current_user(lambda: getattr(request, 'user', None))
+        try:
+            return self.get_response(request)
+        finally:
+            reset_current_user(token)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe API requests read from replicas (see personnel.db_router) and counts
+    queries per database so the offloaded share can be reported.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def replica_eligible(self, request):
+        prefixes = getattr(settings, 'REPLICA_PATH_PREFIXES', ['/api/'])
+        return (
+            request.method in SAFE_METHODS
+            and request.path.startswith(tuple(prefixes))
+            and PIN_COOKIE not in request.COOKIES
+        )
+
+    def __call__(self, request):
+        eligible = self.replica_eligible(request)
+        wrote = request.method not in SAFE_METHODS
+        with ExitStack() as stack:
+            for alias in settings.DATABASES:
+                stack.enter_context(connections[alias].execute_wrapper(count_query(alias)))
+            if eligible:
+                stack.enter_context(use_replicas())
+            response = self.get_response(request)
+            if eligible:
+                wrote = wrote_to_primary()
+
+        pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+        if wrote and pin_seconds and replica_aliases():
+            # Read-your-writes: keep this client on the primary while replicas catch up
+            response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class QueryDetectorMiddleware:
+    """
+    Development aid: reports query shapes a request repeats more than
+    QUERY_DETECTOR_THRESHOLD times (see personnel.query_detector). Removed from
+    the stack unless QUERY_DETECTOR_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_DETECTOR_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with detect_repeated_queries(label=f"{request.method} {request.path}"):
+            return self.get_response(request)
+
+
+class ProfilerMiddleware:
+    """
+    Staff-only request profiling with ?_profile=1 or X-Profile: 1 (see
+    personnel.profiler). Removed from the stack unless PROFILER_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILER_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        output = profiler.requested(request)
+        if output is None or not profiler.is_staff(request):
+            return self.get_response(request)
+        response, profile = profiler.profile_request(request, self.get_response)
+        profile['kept'] = profiler.keep(profile)
+        if output == 'folded':
+            return HttpResponse(profile['folded'], content_type='text/plain; charset=utf-8')
+        return JsonResponse(profile)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0004_department_alter_section_options_designation_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='guarddutyroster',
+            index=models.Index(fields=['date', 'shift_type'], name='roster_date_shift_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0006_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.UUIDField(db_index=True, default=uuid.uuid4)),
+                ('roster_date', models.DateField()),
+                ('shift_type', models.CharField(choices=[('DAY', 'Day Shift'), ('NIGHT', 'Night Shift')], max_length=5)),
+                ('reason', models.CharField(choices=[('LEAVE', 'Leave Approved'), ('SUSPENDED', 'Suspended'), ('TRANSFERRED', 'Transferred')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('added', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='roster_additions', to='personnel.personnel')),
+                ('leave', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='roster_changes', to='personnel.leave')),
+                ('removed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roster_removals', to='personnel.personnel')),
+            ],
+            options={
+                'ordering': ['-created_at', 'roster_date'],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0007_rosterchange'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='careerprogression',
+            name='years_in_service',
+        ),
+        migrations.AddIndex(
+            model_name='personnel',
+            index=models.Index(fields=['dob'], name='personnel_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personnel',
+            index=models.Index(fields=['date_of_enlistment'], name='personnel_enlistment_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0008_computed_service_tenure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromotionEligibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_rank', models.CharField(choices=[('DII', 'DII'), ('DI', 'DI'), ('CD', 'CD'), ('ASO', 'ASO'), ('SO', 'SO'), ('SIOII', 'SIOII'), ('SIOI', 'SIOI'), ('SSIO', 'SSIO'), ('PSIO', 'PSIO'), ('CSIO', 'CSIO'), ('ADIS', 'ADIS'), ('DDIS', 'DDIS'), ('DIS', 'DIS'), ('ADG', 'ADG')], max_length=10)),
+                ('next_rank', models.CharField(choices=[('DII', 'DII'), ('DI', 'DI'), ('CD', 'CD'), ('ASO', 'ASO'), ('SO', 'SO'), ('SIOII', 'SIOII'), ('SIOI', 'SIOI'), ('SSIO', 'SSIO'), ('PSIO', 'PSIO'), ('CSIO', 'CSIO'), ('ADIS', 'ADIS'), ('DDIS', 'DDIS'), ('DIS', 'DIS'), ('ADG', 'ADG')], max_length=10)),
+                ('in_rank_since', models.DateField()),
+                ('eligible_since', models.DateField()),
+                ('position', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('personnel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='promotion_eligibility', to='personnel.personnel')),
+                ('section', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='personnel.section')),
+            ],
+            options={
+                'ordering': ['section_id', 'position'],
+                'indexes': [models.Index(fields=['section', 'position'], name='promotion_section_pos_idx')],
+            },
+        ),
+    ]
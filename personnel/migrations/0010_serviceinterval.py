@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0009_promotioneligibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valid_from', models.DateField()),
+                ('valid_to', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, choices=[('ACTIVE', 'Active'), ('ON_LEAVE', 'On Leave'), ('TRANSFERRED', 'Transferred'), ('SUSPENDED', 'Suspended')], max_length=20)),
+                ('rank', models.CharField(choices=[('DII', 'DII'), ('DI', 'DI'), ('CD', 'CD'), ('ASO', 'ASO'), ('SO', 'SO'), ('SIOII', 'SIOII'), ('SIOI', 'SIOI'), ('SSIO', 'SSIO'), ('PSIO', 'PSIO'), ('CSIO', 'CSIO'), ('ADIS', 'ADIS'), ('DDIS', 'DDIS'), ('DIS', 'DIS'), ('ADG', 'ADG')], max_length=10)),
+                ('designation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='personnel.designation')),
+                ('personnel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_intervals', to='personnel.personnel')),
+                ('section', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='personnel.section')),
+            ],
+            options={
+                'ordering': ['personnel_id', 'valid_from'],
+                'indexes': [models.Index(fields=['valid_from', 'valid_to'], name='interval_validity_idx'), models.Index(fields=['section', 'valid_from'], name='interval_section_idx')],
+            },
+        ),
+    ]
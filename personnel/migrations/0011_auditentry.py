@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:56
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0010_serviceinterval'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('month', models.PositiveIntegerField()),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('model', models.CharField(max_length=50)),
+                ('object_pk', models.CharField(max_length=64)),
+                ('action', models.CharField(choices=[('C', 'Created'), ('U', 'Updated'), ('D', 'Deleted')], max_length=1)),
+                ('changes', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'ordering': ['-timestamp', '-id'],
+                'indexes': [models.Index(fields=['model', 'object_pk', 'month'], name='audit_object_idx'), models.Index(fields=['user_id', 'month'], name='audit_user_idx'), models.Index(fields=['month', 'timestamp'], name='audit_month_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:05
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0011_auditentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReplicationCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site', models.CharField(max_length=20, unique=True)),
+                ('last_seq', models.PositiveBigIntegerField(default=0)),
+                ('applied_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='origin',
+            field=models.CharField(blank=True, editable=False, help_text='Site-prefixed key of a row replicated from another site', max_length=40, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='leave',
+            name='origin',
+            field=models.CharField(blank=True, editable=False, help_text='Site-prefixed key of a row replicated from another site', max_length=40, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='ReplicaState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=64)),
+                ('clocks', models.JSONField(default=dict)),
+            ],
+            options={
+                'unique_together': {('model', 'key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveBigIntegerField(unique=True)),
+                ('model', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=64)),
+                ('action', models.CharField(choices=[('C', 'Created'), ('U', 'Updated'), ('D', 'Deleted')], max_length=1)),
+                ('changes', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['model', 'key'], name='changelog_key_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0012_change_log_replication'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('ANNUAL', 'Annual Leave'), ('CASUAL', 'Casual Leave'), ('SICK', 'Sick Leave'), ('MATERNITY', 'Maternity Leave'), ('PATERNITY', 'Paternity Leave'), ('COMPASSIONATE', 'Compassionate Leave'), ('STUDY', 'Study Leave')], max_length=20)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('entitlement', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('taken', models.IntegerField(default=0, help_text='Working days of approved/completed leave')),
+                ('reserved', models.IntegerField(default=0, help_text='Working days of pending requests')),
+                ('personnel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to='personnel.personnel')),
+            ],
+            options={
+                'ordering': ['personnel_id', 'year', 'leave_type'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leavebalance',
+            constraint=models.UniqueConstraint(fields=('personnel', 'leave_type', 'year'), name='leave_balance_unique'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0013_leave_balance_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('leave_type', models.CharField(choices=[('ANNUAL', 'Annual Leave'), ('CASUAL', 'Casual Leave'), ('SICK', 'Sick Leave'), ('MATERNITY', 'Maternity Leave'), ('PATERNITY', 'Paternity Leave'), ('COMPASSIONATE', 'Compassionate Leave'), ('STUDY', 'Study Leave')], max_length=20)),
+                ('rank', models.CharField(choices=[('DII', 'DII'), ('DI', 'DI'), ('CD', 'CD'), ('ASO', 'ASO'), ('SO', 'SO'), ('SIOII', 'SIOII'), ('SIOI', 'SIOI'), ('SSIO', 'SSIO'), ('PSIO', 'PSIO'), ('CSIO', 'CSIO'), ('ADIS', 'ADIS'), ('DDIS', 'DDIS'), ('DIS', 'DIS'), ('ADG', 'ADG')], max_length=10)),
+                ('leaves', models.IntegerField(default=0, help_text='Leaves starting in the month')),
+                ('days', models.IntegerField(default=0, help_text='Working days of leave falling in the month')),
+                ('section', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='personnel.section')),
+            ],
+            options={
+                'ordering': ['month', 'leave_type'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaveusage',
+            constraint=models.UniqueConstraint(fields=('month', 'leave_type', 'section', 'rank'), name='leave_usage_unique'),
+        ),
+    ]
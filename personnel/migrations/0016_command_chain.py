@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0015_attachments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='head',
+            field=models.OneToOneField(blank=True, help_text="Director at the top of the department's chain of command", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='headed_department', to='personnel.personnel'),
+        ),
+        migrations.CreateModel(
+            name='CommandChain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('subordinate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='personnel.personnel')),
+                ('superior', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='personnel.personnel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subordinate', 'depth'], name='command_chain_up_idx'), models.Index(fields=['superior', 'depth'], name='command_chain_down_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='commandchain',
+            constraint=models.UniqueConstraint(fields=('superior', 'subordinate'), name='command_chain_unique'),
+        ),
+    ]
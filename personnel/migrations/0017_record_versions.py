@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personnel', '0016_command_chain'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped on every save (optimistic locking)'),
+        ),
+        migrations.AddField(
+            model_name='leave',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped on every save (optimistic locking)'),
+        ),
+        migrations.AddField(
+            model_name='personnel',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped on every save (optimistic locking)'),
+        ),
+    ]
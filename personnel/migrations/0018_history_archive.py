@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('personnel', '0017_record_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLeave',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('leave_type', models.CharField(choices=[('ANNUAL', 'Annual Leave'), ('CASUAL', 'Casual Leave'), ('SICK', 'Sick Leave'), ('MATERNITY', 'Maternity Leave'), ('PATERNITY', 'Paternity Leave'), ('COMPASSIONATE', 'Compassionate Leave'), ('STUDY', 'Study Leave')], max_length=20)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('resumption_date', models.DateField(blank=True, null=True)),
+                ('reason', models.TextField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('CANCELLED', 'Cancelled'), ('COMPLETED', 'Completed')], max_length=20)),
+                ('requested_date', models.DateTimeField()),
+                ('approved_date', models.DateTimeField(blank=True, null=True)),
+                ('rejection_reason', models.TextField(blank=True)),
+                ('days_count', models.IntegerField(default=0)),
+                ('origin', models.CharField(blank=True, max_length=40, null=True)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('archived_at', models.DateTimeField()),
+                ('approved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('personnel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='personnel.personnel')),
+            ],
+            options={
+                'ordering': ['-requested_date'],
+                'indexes': [models.Index(fields=['start_date'], name='archived_leave_start_idx'), models.Index(fields=['personnel', 'start_date'], name='archived_leave_person_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedGuardDuty',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('shift_type', models.CharField(choices=[('DAY', 'Day Shift'), ('NIGHT', 'Night Shift')], max_length=5)),
+                ('archived_at', models.DateTimeField()),
+                ('personnel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='personnel.personnel')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='archived_duty_date_idx'), models.Index(fields=['personnel', 'date'], name='archived_duty_person_idx')],
+            },
+        ),
+    ]
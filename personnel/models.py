@@ -1,9 +1,102 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
+import uuid
 
-class Department(models.Model):
+class TrackedFieldsMixin:
+    """
+    Keeps the field values as they were loaded (or last saved) in `_loaded_values`,
+    so signal handlers can tell what changed without re-reading the row.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if value is not models.DEFERRED
+        }
+        return instance
+
+    def tracked_values(self):
+        """Current values of the concrete fields that are loaded on this instance"""
+        return {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields if field.attname in self.__dict__
+        }
+
+    def mark_saved(self):
+        self._loaded_values = self.tracked_values()
+
+class VersionConflictError(Exception):
+    """The row was changed (or deleted) by someone else since it was loaded"""
+
+    def __init__(self, instance, expected):
+        super().__init__(f"{instance._meta.verbose_name} {instance.pk} is no longer at version {expected}")
+        self.instance = instance
+        self.expected = expected
+
+class VersionedMixin(TrackedFieldsMixin):
+    """
+    Optimistic concurrency for models with a `version` column. Saving a loaded
+    instance writes only the fields that changed, as
+    UPDATE ... SET ..., version = n + 1 WHERE pk = ... AND version = n,
+    and raises VersionConflictError if another save got there first. No row locks
+    are taken. expect_version() checks against a version the client saw instead
+    (e.g. from an If-Match header).
+    """
+
+    def expect_version(self, version):
+        self._expected_version = version
+
+    def changed_fields(self):
+        loaded = self._loaded_values
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and (
+                field.attname not in loaded or loaded[field.attname] != self.__dict__[field.attname]
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded is None or loaded.get(self._meta.pk.attname) != self.pk:
+            # New rows, instances not read from the database and primary key changes save as usual
+            return super().save(*args, **kwargs)
+        expected = self.__dict__.pop('_expected_version', loaded.get('version', self.version))
+        update_fields = kwargs.pop('update_fields', None)
+        if update_fields is None:
+            update_fields = self.changed_fields()
+            if not update_fields and expected == self.version:
+                return
+        self._conflict_check = expected
+        self.version = expected + 1
+        try:
+            super().save(*args, update_fields={*update_fields, 'version'}, **kwargs)
+        except BaseException:
+            self.version = loaded.get('version', expected)
+            raise
+        finally:
+            del self._conflict_check
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_conflict_check', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if not super()._do_update(base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update):
+            raise VersionConflictError(self, expected)
+        return True
+
+class Department(TrackedFieldsMixin, models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
+    head = models.OneToOneField(
+        'Personnel',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='headed_department',
+        help_text="Director at the top of the department's chain of command"
+    )
 
     def __str__(self):
         return self.name
@@ -11,7 +104,7 @@ class Department(models.Model):
     class Meta:
         ordering = ['name']
 
-class Section(models.Model):
+class Section(TrackedFieldsMixin, models.Model):
     name = models.CharField(max_length=100)
     department = models.ForeignKey(
         Department,
@@ -52,7 +145,7 @@ class Designation(models.Model):
         ordering = ['section__department__name', 'section__name', 'name']
         unique_together = ('name', 'section')
 
-class Personnel(models.Model):
+class Personnel(VersionedMixin, models.Model):
     RANK_CHOICES = [
         ('DII', 'DII'),
         ('DI', 'DI'),
@@ -95,11 +188,19 @@ class Personnel(models.Model):
     
     # Kept for backward compatibility/ease of access, though history is in CareerProgression
     rank = models.CharField(max_length=10, choices=RANK_CHOICES)
+    version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped on every save (optimistic locking)")
+
+    class Meta:
+        indexes = [
+            # Retirement forecasting filters on both dates
+            models.Index(fields=['dob'], name='personnel_dob_idx'),
+            models.Index(fields=['date_of_enlistment'], name='personnel_enlistment_idx'),
+        ]
     
     def __str__(self):
         return f"{self.rank} {self.last_name} {self.first_name} ({self.service_number})"
 
-class Assignment(models.Model):
+class Assignment(VersionedMixin, models.Model):
     STATUS_CHOICES = [
         ('ACTIVE', 'Active'),
         ('ON_LEAVE', 'On Leave'),
@@ -114,6 +215,11 @@ class Assignment(models.Model):
     sub_unit = models.CharField(max_length=100, blank=True, help_text="e.g., Transport, Govt House Unit")
     date_of_posting = models.DateField(default=timezone.now)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
+    origin = models.CharField(
+        max_length=40, unique=True, null=True, blank=True, editable=False,
+        help_text="Site-prefixed key of a row replicated from another site"
+    )
+    version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped on every save (optimistic locking)")
 
     def __str__(self):
         return f"{self.personnel} - {self.disposition} ({self.status})"
@@ -124,7 +230,6 @@ class CareerProgression(models.Model):
     date_of_last_promotion = models.DateField(null=True, blank=True)
     date_of_last_transfer = models.DateField(null=True, blank=True)
     command_last_served = models.CharField(max_length=100, help_text="Previous Command")
-    years_in_service = models.IntegerField(default=0)
 
     def __str__(self):
         return f"{self.personnel} - {self.current_rank}"
@@ -149,11 +254,14 @@ class GuardDutyRoster(models.Model):
     class Meta:
         unique_together = ('personnel', 'date', 'shift_type')
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'shift_type'], name='roster_date_shift_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.get_shift_type_display()}: {self.personnel}"
 
-class Leave(models.Model):
+class Leave(VersionedMixin, models.Model):
     LEAVE_TYPE_CHOICES = [
         ('ANNUAL', 'Annual Leave'),
         ('CASUAL', 'Casual Leave'),
@@ -190,6 +298,11 @@ class Leave(models.Model):
     approved_date = models.DateTimeField(null=True, blank=True)
     rejection_reason = models.TextField(blank=True)
     days_count = models.IntegerField(default=0)
+    origin = models.CharField(
+        max_length=40, unique=True, null=True, blank=True, editable=False,
+        help_text="Site-prefixed key of a row replicated from another site"
+    )
+    version = models.PositiveIntegerField(default=1, editable=False, help_text="Bumped on every save (optimistic locking)")
     
     class Meta:
         ordering = ['-requested_date']
@@ -198,36 +311,53 @@ class Leave(models.Model):
         return f"{self.personnel} - {self.get_leave_type_display()} ({self.start_date} to {self.end_date})"
     
     def calculate_days(self):
-        """Calculate the number of days for the leave"""
-        if self.start_date and self.end_date:
-            delta = self.end_date - self.start_date
-            return delta.days + 1  # Include both start and end dates
-        return 0
+        """Calculate the number of working days for the leave (weekends and holidays excluded)"""
+        from .leave_ledger import working_days
+        return working_days(self.start_date, self.end_date)
     
     def save(self, *args, **kwargs):
-        # Auto-calculate days if not set
-        if not self.days_count:
+        from django.db import transaction
+        from .leave_ledger import apply_leave_change, next_working_day
+        from . import leave_usage
+
+        # Calculate working days if not set, or if the dates were edited
+        previous = getattr(self, '_loaded_values', None)
+        dates_changed = previous is not None and (
+            previous.get('start_date') != self.start_date or previous.get('end_date') != self.end_date
+        )
+        if not self.days_count or dates_changed:
             self.days_count = self.calculate_days()
         
-        # Auto-set resumption date if not set (day after end_date)
+        # Auto-set resumption date if not set (first working day after end_date)
         if not self.resumption_date and self.end_date:
-            from datetime import timedelta
-            self.resumption_date = self.end_date + timedelta(days=1)
+            self.resumption_date = next_working_day(self.end_date)
         
-        super().save(*args, **kwargs)
-    
+        # Keep the leave balance ledger and the usage rollup in step with this request
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            apply_leave_change(self, previous)
+            leave_usage.apply_leave_change(self, previous)
+
     def approve(self, user):
         """Approve the leave request"""
-        self.status = 'APPROVED'
-        self.approved_by = user
-        self.approved_date = timezone.now()
-        self.save()
-        
-        # Update personnel assignment status to ON_LEAVE
-        active_assignment = self.personnel.assignments.filter(status='ACTIVE').first()
-        if active_assignment:
-            active_assignment.status = 'ON_LEAVE'
-            active_assignment.save()
+        from django.db import transaction
+        from .rostering import repair_roster
+
+        # All or nothing: any of these saves can lose an optimistic-locking race
+        with transaction.atomic():
+            self.status = 'APPROVED'
+            self.approved_by = user
+            self.approved_date = timezone.now()
+            self.save()
+
+            # Update personnel assignment status to ON_LEAVE
+            active_assignment = self.personnel.assignments.filter(status='ACTIVE').first()
+            if active_assignment:
+                active_assignment.status = 'ON_LEAVE'
+                active_assignment.save()
+
+            # Hand any published guard duties inside the leave window to someone else
+            repair_roster(self.personnel_id, self.start_date, self.end_date, reason='LEAVE', leave=self)
     
     def reject(self, user, reason):
         """Reject the leave request"""
@@ -239,12 +369,420 @@ class Leave(models.Model):
     
     def cancel(self):
         """Cancel the leave request"""
-        self.status = 'CANCELLED'
-        self.save()
-        
-        # If leave was approved, revert personnel status
-        if self.status == 'APPROVED':
-            active_assignment = self.personnel.assignments.filter(status='ON_LEAVE').first()
-            if active_assignment:
-                active_assignment.status = 'ACTIVE'
-                active_assignment.save()
+        from django.db import transaction
+
+        was_approved = self.status == 'APPROVED'
+        with transaction.atomic():
+            self.status = 'CANCELLED'
+            self.save()
+
+            # If leave was approved, revert personnel status
+            if was_approved:
+                self.end_on_leave_status()
+
+    def complete(self):
+        """Mark an approved leave as taken in full; the person resumes duty"""
+        from django.db import transaction
+
+        with transaction.atomic():
+            self.status = 'COMPLETED'
+            self.save()
+            self.end_on_leave_status()
+
+    def end_on_leave_status(self):
+        active_assignment = self.personnel.assignments.filter(status='ON_LEAVE').first()
+        if active_assignment:
+            active_assignment.status = 'ACTIVE'
+            active_assignment.save()
+
+class Holiday(models.Model):
+    """Public holiday; not counted as a working day of leave"""
+    date = models.DateField(unique=True)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date} {self.name}"
+
+class LeaveBalance(models.Model):
+    """
+    Leave ledger row per person, leave type and year, maintained by Leave.save()
+    (see personnel.leave_ledger). entitlement is None for types without a limit.
+    """
+    personnel = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.CharField(max_length=20, choices=Leave.LEAVE_TYPE_CHOICES)
+    year = models.PositiveSmallIntegerField()
+    entitlement = models.PositiveSmallIntegerField(null=True, blank=True)
+    taken = models.IntegerField(default=0, help_text="Working days of approved/completed leave")
+    reserved = models.IntegerField(default=0, help_text="Working days of pending requests")
+
+    class Meta:
+        ordering = ['personnel_id', 'year', 'leave_type']
+        constraints = [
+            models.UniqueConstraint(fields=['personnel', 'leave_type', 'year'], name='leave_balance_unique'),
+        ]
+
+    @property
+    def remaining(self):
+        if self.entitlement is None:
+            return None
+        return self.entitlement - self.taken - self.reserved
+
+    def __str__(self):
+        return f"{self.personnel_id} {self.leave_type} {self.year}: {self.remaining}"
+
+class LeaveUsage(models.Model):
+    """
+    Monthly rollup of leave taken (approved or completed) by leave type, and the
+    section and rank the person held when the leave began. Maintained by
+    Leave.save() (see personnel.leave_usage) and read by /api/reports/leave-usage/.
+    The section is kept without a constraint so history survives its removal.
+    """
+    month = models.DateField(help_text="First day of the month")
+    leave_type = models.CharField(max_length=20, choices=Leave.LEAVE_TYPE_CHOICES)
+    section = models.ForeignKey(
+        Section, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    rank = models.CharField(max_length=10, choices=Personnel.RANK_CHOICES)
+    leaves = models.IntegerField(default=0, help_text="Leaves starting in the month")
+    days = models.IntegerField(default=0, help_text="Working days of leave falling in the month")
+
+    class Meta:
+        ordering = ['month', 'leave_type']
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'leave_type', 'section', 'rank'], name='leave_usage_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.leave_type} {self.section_id} {self.rank}: {self.days}"
+
+class CommandChain(models.Model):
+    """
+    Closure table of the chain of command: one row for every (superior,
+    subordinate) pair at any distance, plus a depth-0 row per person. A person
+    reports to their section's principal officer; principal officers report to
+    their department's head. Maintained by personnel.command_chain.
+    """
+    superior = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='+')
+    subordinate = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='+')
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['superior', 'subordinate'], name='command_chain_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['subordinate', 'depth'], name='command_chain_up_idx'),
+            models.Index(fields=['superior', 'depth'], name='command_chain_down_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.superior_id} > {self.subordinate_id} ({self.depth})"
+
+class ServiceInterval(models.Model):
+    """
+    Derived history: one row per period in which a person's section, designation,
+    assignment status and rank were all unchanged. valid_to is exclusive and NULL
+    for the current period. Maintained from Assignment/CareerProgression changes
+    (see services.rebuild_service_intervals) and used for "as of date" queries.
+    Status is today's status of the latest posting, and blank for earlier postings.
+    """
+    personnel = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='service_intervals')
+    valid_from = models.DateField()
+    valid_to = models.DateField(null=True, blank=True)
+    section = models.ForeignKey(Section, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    designation = models.ForeignKey(Designation, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=Assignment.STATUS_CHOICES, blank=True)
+    rank = models.CharField(max_length=10, choices=Personnel.RANK_CHOICES)
+
+    class Meta:
+        ordering = ['personnel_id', 'valid_from']
+        indexes = [
+            models.Index(fields=['valid_from', 'valid_to'], name='interval_validity_idx'),
+            models.Index(fields=['section', 'valid_from'], name='interval_section_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.personnel_id} {self.rank} {self.valid_from} - {self.valid_to or 'now'}"
+
+class ArchivedGuardDuty(models.Model):
+    """
+    Cold copy of a GuardDutyRoster row older than the archive horizon, moved here
+    (same id and columns) by personnel.archive so the hot table stays small.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    personnel = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    shift_type = models.CharField(max_length=5, choices=GuardDutyRoster.SHIFT_CHOICES)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date'], name='archived_duty_date_idx'),
+            models.Index(fields=['personnel', 'date'], name='archived_duty_person_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.get_shift_type_display()}: {self.personnel_id} (archived)"
+
+class ArchivedLeave(models.Model):
+    """
+    Cold copy of a finished (completed, rejected or cancelled) Leave whose end date
+    is older than the archive horizon; same id and columns as Leave.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    personnel = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='+')
+    leave_type = models.CharField(max_length=20, choices=Leave.LEAVE_TYPE_CHOICES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    resumption_date = models.DateField(null=True, blank=True)
+    reason = models.TextField()
+    status = models.CharField(max_length=20, choices=Leave.STATUS_CHOICES)
+    requested_date = models.DateTimeField()
+    approved_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    approved_date = models.DateTimeField(null=True, blank=True)
+    rejection_reason = models.TextField(blank=True)
+    days_count = models.IntegerField(default=0)
+    origin = models.CharField(max_length=40, null=True, blank=True)
+    version = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-requested_date']
+        indexes = [
+            models.Index(fields=['start_date'], name='archived_leave_start_idx'),
+            models.Index(fields=['personnel', 'start_date'], name='archived_leave_person_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.personnel_id} - {self.get_leave_type_display()} ({self.start_date} to {self.end_date}, archived)"
+
+class RosterChange(models.Model):
+    """
+    One slot changed by an incremental roster repair: `removed` was taken off the
+    duty and `added` (if anyone could be found) put on it. Rows from the same
+    repair share a batch id.
+    """
+    REASON_CHOICES = [
+        ('LEAVE', 'Leave Approved'),
+        ('SUSPENDED', 'Suspended'),
+        ('TRANSFERRED', 'Transferred'),
+    ]
+
+    batch = models.UUIDField(default=uuid.uuid4, db_index=True)
+    roster_date = models.DateField()
+    shift_type = models.CharField(max_length=5, choices=GuardDutyRoster.SHIFT_CHOICES)
+    removed = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='roster_removals')
+    added = models.ForeignKey(
+        Personnel,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='roster_additions'
+    )
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    leave = models.ForeignKey(Leave, on_delete=models.SET_NULL, null=True, blank=True, related_name='roster_changes')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', 'roster_date']
+
+    def __str__(self):
+        replacement = self.added_id or 'unfilled'
+        return f"{self.roster_date} {self.shift_type}: {self.removed_id} -> {replacement} ({self.reason})"
+
+class PromotionEligibility(models.Model):
+    """
+    Precomputed promotion board entry, rebuilt nightly by `compute_promotion_eligibility`.
+    `position` is the seniority order within the section (1 = most senior in rank).
+    """
+    personnel = models.OneToOneField(Personnel, on_delete=models.CASCADE, related_name='promotion_eligibility')
+    section = models.ForeignKey(Section, on_delete=models.SET_NULL, null=True, blank=True)
+    current_rank = models.CharField(max_length=10, choices=Personnel.RANK_CHOICES)
+    next_rank = models.CharField(max_length=10, choices=Personnel.RANK_CHOICES)
+    in_rank_since = models.DateField()
+    eligible_since = models.DateField()
+    position = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['section_id', 'position']
+        indexes = [
+            models.Index(fields=['section', 'position'], name='promotion_section_pos_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.personnel_id}: {self.current_rank} -> {self.next_rank}"
+
+class AuditEntry(models.Model):
+    """
+    Append-only audit record: one create/update/delete of a tracked model with a
+    compact field-level diff {"field": [old, new]}. Written in batches by personnel.audit.
+    `month` (YYYYMM) is the partition key every query filters on.
+    """
+    ACTION_CHOICES = [
+        ('C', 'Created'),
+        ('U', 'Updated'),
+        ('D', 'Deleted'),
+    ]
+
+    timestamp = models.DateTimeField()
+    month = models.PositiveIntegerField()
+    user_id = models.IntegerField(null=True, blank=True)
+    model = models.CharField(max_length=50)
+    object_pk = models.CharField(max_length=64)
+    action = models.CharField(max_length=1, choices=ACTION_CHOICES)
+    changes = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            models.Index(fields=['model', 'object_pk', 'month'], name='audit_object_idx'),
+            models.Index(fields=['user_id', 'month'], name='audit_user_idx'),
+            models.Index(fields=['month', 'timestamp'], name='audit_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.timestamp:%Y-%m-%d %H:%M} {self.get_action_display()} {self.model} {self.object_pk}"
+
+class StoredFile(models.Model):
+    """
+    Content-addressed file on local disk (see personnel.attachments). Identical
+    uploads share one row and one file; thumbnails lists the sizes generated so far.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100)
+    thumbnails = models.JSONField(default=list, blank=True, help_text="Thumbnail sizes (px) available")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.content_type}, {self.size} bytes)"
+
+class Attachment(models.Model):
+    """A passport photo or scanned document on a personnel record"""
+    KIND_CHOICES = [
+        ('PHOTO', 'Passport Photo'),
+        ('DOCUMENT', 'Document'),
+    ]
+
+    personnel = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='attachments')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='DOCUMENT')
+    file = models.ForeignKey(StoredFile, on_delete=models.PROTECT, related_name='attachments')
+    file_name = models.CharField(max_length=255)
+    description = models.CharField(max_length=255, blank=True)
+    uploaded_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-uploaded_at', '-id']
+        indexes = [
+            models.Index(fields=['personnel', 'kind', '-uploaded_at'], name='attachment_person_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.personnel_id} {self.get_kind_display()}: {self.file_name}"
+
+class Job(models.Model):
+    """
+    Database-backed background job, picked up by the `run_worker` management command.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50, help_text="Registered handler name, e.g. roster.generate")
+    params = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete")
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    artifact = models.BinaryField(null=True, blank=True)
+    artifact_name = models.CharField(max_length=200, blank=True)
+    artifact_content_type = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.get_status_display()}) {self.id}"
+
+class ChangeLogEntry(models.Model):
+    """
+    Outbound change log of this site: one row per save/delete of a replicated model,
+    numbered by a gap-free sequence in commit order. `key` is the natural key
+    (service number for Personnel, site-prefixed id otherwise) and `changes` holds
+    the new value of each changed field, with foreign keys as natural keys.
+    """
+    ACTION_CHOICES = [
+        ('C', 'Created'),
+        ('U', 'Updated'),
+        ('D', 'Deleted'),
+    ]
+
+    seq = models.PositiveBigIntegerField(unique=True)
+    model = models.CharField(max_length=50)
+    key = models.CharField(max_length=64)
+    action = models.CharField(max_length=1, choices=ACTION_CHOICES)
+    changes = models.JSONField(encoder=DjangoJSONEncoder)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['model', 'key'], name='changelog_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.action} {self.model} {self.key}"
+
+class ChangeSequence(models.Model):
+    """Named counter; incrementing it locks the row until commit, so numbers follow commit order"""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+class ReplicaState(models.Model):
+    """
+    Field clocks of a record changed by another site: {field: [changed_at, site]} of
+    the change that last set each field, used to resolve conflicts on apply.
+    """
+    model = models.CharField(max_length=50)
+    key = models.CharField(max_length=64)
+    clocks = models.JSONField(default=dict)
+
+    class Meta:
+        unique_together = ('model', 'key')
+
+class ReplicationCursor(models.Model):
+    """Last change sequence applied from each remote site"""
+    site = models.CharField(max_length=20, unique=True)
+    last_seq = models.PositiveBigIntegerField(default=0)
+    applied_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.site} @ {self.last_seq}"
@@ -0,0 +1,269 @@
+"""
+On-demand request profiling for staff.
+
+A staff user adds `?_profile=1` (or the header `X-Profile: 1`) to any request and
+gets the profile back in place of the usual body. The profile is JSON. It holds
+the sampled call stacks in "folded" form (one `frame;frame;frame count` line per
+stack, which flamegraph.pl and speedscope read as-is) and a timeline of every SQL
+query: its start offset, duration, database and statement. With `?_profile=folded`
+the response is just the folded stacks, as text.
+
+Sampling runs on a separate thread that reads the request thread's stack every
+PROFILER_INTERVAL_MS. The view itself runs unchanged, so the numbers are close to
+what an ordinary request costs. A request without the switch pays for one
+dictionary lookup. The request still runs in full, including any writes it makes.
+
+With PROFILER_KEEP set, the last N profiles are also saved under
+MEDIA_ROOT/profiles and can be downloaded from /api/profiles/.
+"""
+import functools
+import json
+import os
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.utils import timezone
+
+PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+DEFAULT_INTERVAL_MS = 1
+MAX_SQL_LENGTH = 2000
+
+
+def requested(request):
+    """The requested output ('json' or 'folded'), or None when the switch is absent"""
+    value = request.GET.get(PARAM) or request.META.get(HEADER)
+    if not value or value in ('0', 'false'):
+        return None
+    return 'folded' if value == 'folded' else 'json'
+
+
+def is_staff(request):
+    """Staff check for the session user, falling back to DRF's other authenticators (e.g. Basic)"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    if 'HTTP_AUTHORIZATION' not in request.META:
+        return False
+    from rest_framework.authentication import SessionAuthentication
+    from rest_framework.exceptions import APIException
+    from rest_framework.request import Request
+    from rest_framework.settings import api_settings
+
+    drf_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        if issubclass(authentication_class, SessionAuthentication):
+            continue
+        try:
+            result = authentication_class().authenticate(drf_request)
+        except APIException:
+            return False
+        if result is not None:
+            return result[0].is_staff
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def _path_prefixes():
+    return (f'{settings.BASE_DIR}/', *(f"{sysconfig.get_paths()[name]}/" for name in ('purelib', 'stdlib')))
+
+
+@functools.lru_cache(maxsize=4096)
+def _code_label(code):
+    path = code.co_filename
+    for prefix in _path_prefixes():
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+            break
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+_switch_lock = threading.Lock()
+_switch_users = 0
+_switch_default = None
+
+
+def _shorten_switch_interval(interval):
+    """
+    Let the sampler thread get the GIL well within `interval` seconds; by default
+    Python switches threads only every 5 ms. The setting is process-wide, so the
+    default is restored only when the last profile running at the same time ends.
+    """
+    global _switch_users, _switch_default
+    with _switch_lock:
+        if _switch_users == 0:
+            _switch_default = sys.getswitchinterval()
+            sys.setswitchinterval(min(_switch_default, interval / 4))
+        _switch_users += 1
+
+
+def _restore_switch_interval():
+    global _switch_users
+    with _switch_lock:
+        _switch_users -= 1
+        if _switch_users == 0:
+            sys.setswitchinterval(_switch_default)
+
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled from another, below a given frame"""
+
+    def __init__(self, thread_id, root_frame, interval):
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def _run(self):
+        # time.sleep keeps to short intervals more closely than Event.wait
+        while not self._stop.is_set():
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and frame is not self.root_frame:
+                if frame.f_code is _EXIT_CODE:
+                    # The request is done and the thread is stopping the sampler
+                    return
+                labels.append(_code_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[tuple(reversed(labels))] += 1
+                self.samples += 1
+
+    def __enter__(self):
+        _shorten_switch_interval(self.interval)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        _restore_switch_interval()
+
+    def folded(self):
+        """Stacks in flamegraph.pl's collapsed format, busiest first"""
+        return '\n'.join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+
+_EXIT_CODE = StackSampler.__exit__.__code__
+
+
+class QueryTimeline:
+    """execute_wrapper recording when each query started and how long it took"""
+
+    def __init__(self, alias, started):
+        self.alias = alias
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            self.queries.append({
+                'startMs': round((start - self.started) * 1000, 3),
+                'durationMs': round((end - start) * 1000, 3),
+                'database': self.alias,
+                'sql': sql[:MAX_SQL_LENGTH],
+                'params': None if many or params is None else [str(param) for param in params],
+                'many': many,
+            })
+
+
+def profile_request(request, get_response):
+    """Run the request under the sampler and query timeline; returns (response, profile)"""
+    interval = getattr(settings, 'PROFILER_INTERVAL_MS', DEFAULT_INTERVAL_MS) / 1000
+    started = time.perf_counter()
+    timelines = [QueryTimeline(alias, started) for alias in settings.DATABASES]
+    with ExitStack() as stack:
+        for timeline in timelines:
+            stack.enter_context(connections[timeline.alias].execute_wrapper(timeline))
+        with StackSampler(threading.get_ident(), sys._getframe(), interval) as sampler:
+            response = get_response(request)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+    duration = time.perf_counter() - started
+
+    queries = sorted((query for timeline in timelines for query in timeline.queries), key=lambda q: q['startMs'])
+    profile = {
+        'id': f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}",
+        'createdAt': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': request.user.get_username() if getattr(request, 'user', None) else None,
+        'status': response.status_code,
+        'durationMs': round(duration * 1000, 3),
+        'intervalMs': interval * 1000,
+        'samples': sampler.samples,
+        'folded': sampler.folded(),
+        'queryCount': len(queries),
+        'queryTimeMs': round(sum(query['durationMs'] for query in queries), 3),
+        'queries': queries,
+    }
+    return response, profile
+
+
+# Keeping the last PROFILER_KEEP profiles
+
+def profile_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'profiles')
+
+
+def profile_path(profile_id):
+    return os.path.join(profile_dir(), f"{profile_id}.json")
+
+
+def keep(profile):
+    """Save a profile and drop the oldest beyond PROFILER_KEEP; no-op when that is 0"""
+    limit = getattr(settings, 'PROFILER_KEEP', 0)
+    if not limit:
+        return False
+    os.makedirs(profile_dir(), exist_ok=True)
+    temp = f"{profile_path(profile['id'])}.tmp"
+    with open(temp, 'w') as handle:
+        json.dump(profile, handle, cls=DjangoJSONEncoder)
+    os.replace(temp, profile_path(profile['id']))
+    # Ids start with a timestamp, so name order is age order
+    for name in sorted(name for name in os.listdir(profile_dir()) if name.endswith('.json'))[:-limit]:
+        try:
+            os.unlink(os.path.join(profile_dir(), name))
+        except FileNotFoundError:
+            pass
+    return True
+
+
+def kept_profiles():
+    """Summaries of the saved profiles, newest first"""
+    if not os.path.isdir(profile_dir()):
+        return []
+    summaries = []
+    for name in sorted((name for name in os.listdir(profile_dir()) if name.endswith('.json')), reverse=True):
+        profile = load(name[:-len('.json')])
+        if profile is not None:
+            summaries.append({
+                key: profile[key]
+                for key in ('id', 'createdAt', 'method', 'path', 'user', 'status', 'durationMs', 'queryCount')
+            })
+    return summaries
+
+
+def load(profile_id):
+    """A saved profile by id, or None"""
+    try:
+        with open(profile_path(os.path.basename(profile_id))) as handle:
+            return json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return None
@@ -0,0 +1,95 @@
+"""
+Development-time detector for N+1 and duplicate queries.
+
+Every query run inside detect_repeated_queries() is reduced to a fingerprint -
+its SQL with literals removed and IN lists collapsed - and counted. When a
+fingerprint repeats more than `threshold` times, the shape, count and the
+application stack that issued the repeat are logged, and in strict mode
+RepeatedQueryError is raised so a test run fails.
+
+QueryDetectorMiddleware wraps each request when QUERY_DETECTOR_ENABLED is set;
+tests and shell sessions can use the context manager directly.
+"""
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|\$\d+)\s*,?)+\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+# Frames from these paths are not "the code that triggered the query"
+_LIBRARY_MARKERS = ('site-packages', 'dist-packages', '/lib/python', 'query_detector.py')
+
+
+class RepeatedQueryError(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """The shape of a query: parameters, literals and IN list lengths stripped"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _application_stack(limit=8):
+    frames = [
+        frame for frame in traceback.extract_stack()[:-1]
+        if not any(marker in frame.filename for marker in _LIBRARY_MARKERS)
+    ]
+    return ''.join(traceback.format_list(frames[-limit:]))
+
+
+class QueryCounter:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = fingerprint(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] == self.threshold + 1:
+            self.stacks[shape] = _application_stack()
+        return execute(sql, params, many, context)
+
+    def repeated(self):
+        """[(shape, count, stack)] for every shape seen more than `threshold` times"""
+        return [(shape, self.counts[shape], stack) for shape, stack in self.stacks.items()]
+
+
+def report(repeated, label, strict):
+    for shape, count, stack in repeated:
+        logger.warning("%s: query repeated %d times: %s\n%s", label, count, shape, stack)
+    if repeated and strict:
+        shape, count, stack = repeated[0]
+        raise RepeatedQueryError(f"{label}: query repeated {count} times: {shape}\n{stack}")
+
+
+@contextmanager
+def detect_repeated_queries(threshold=None, label='block', strict=None):
+    """
+    Count query shapes on every database inside the block and report those seen
+    more than `threshold` times (QUERY_DETECTOR_THRESHOLD by default). With
+    `strict` (QUERY_DETECTOR_RAISE by default) a repeat raises RepeatedQueryError.
+    """
+    if threshold is None:
+        threshold = getattr(settings, 'QUERY_DETECTOR_THRESHOLD', 5)
+    if strict is None:
+        strict = getattr(settings, 'QUERY_DETECTOR_RAISE', False)
+    counter = QueryCounter(threshold)
+    with ExitStack() as stack:
+        for alias in settings.DATABASES:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        yield counter
+    report(counter.repeated(), label, strict)
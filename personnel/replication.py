@@ -0,0 +1,510 @@
+"""
+Multi-site replication through per-site change logs.
+
+Every save/delete of a replicated model appends a ChangeLogEntry with the next
+number of the site's change sequence. The entry carries the changed fields only,
+with foreign keys as natural keys (service number, section/department names,
+username), so rows can be matched across databases whose ids differ.
+`export_changes --since N` writes the entries after N to a file. At HQ,
+`apply_changes` replays such files.
+
+Conflicts are resolved by comparing (changed_at, site) against the clock of the
+last change to the same record. The local change log and the ReplicaState of
+changes applied earlier both count as clocks.
+- 'field' (default): each field keeps the most recent write, so edits to
+  different fields of one record at two sites both survive.
+- 'lww': a change is applied whole only if it is newer than every earlier
+  change to the record; otherwise it is dropped whole.
+
+Applying uses bulk writes, so model signals (and roster repair) do not run.
+Dossiers, service intervals and the audit trail are updated explicitly.
+"""
+import contextvars
+import datetime
+import gzip
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    Personnel, Assignment, Leave, Section, Designation, ChangeLogEntry, ChangeSequence,
+    ReplicaState, ReplicationCursor
+)
+
+CHANGES_FORMAT = 'pms-changes'
+CHANGES_VERSION = 1
+SEQUENCE_NAME = 'changelog'
+
+# In apply order: rows that others reference come first
+REPLICATED_MODELS = [Personnel, Assignment, Leave]
+
+STRATEGIES = ('field', 'lww')
+
+# Set while applying remote changes, so they are not logged again as local ones
+_applying = contextvars.ContextVar('replication_applying', default=False)
+
+
+class ReplicationError(Exception):
+    pass
+
+
+def site_code():
+    return getattr(settings, 'SITE_CODE', 'HQ')
+
+
+def replication_enabled():
+    return getattr(settings, 'REPLICATION_ENABLED', True)
+
+
+def record_key(instance):
+    """Natural key of a replicated row, stable across sites"""
+    if isinstance(instance, Personnel):
+        return instance.service_number
+    return instance.origin or f"{site_code()}:{instance.pk}"
+
+
+def _local_fields(model):
+    """Concrete fields that are replicated (everything but the surrogate id, origin and version)"""
+    return [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key and model is not Personnel) and field.name not in ('origin', 'version')
+    ]
+
+
+# Natural keys for foreign keys
+
+def _section_key(section):
+    return [section.name, section.department.name if section.department_id else None]
+
+
+def _natural_fk(field, value):
+    if value is None:
+        return None
+    related = field.related_model
+    if related is Personnel:
+        return value
+    if related is Section:
+        return _section_key(Section.objects.select_related('department').get(pk=value))
+    if related is Designation:
+        designation = Designation.objects.select_related('section__department').get(pk=value)
+        return [designation.name] + _section_key(designation.section)
+    if related is get_user_model():
+        return related.objects.filter(pk=value).values_list(related.USERNAME_FIELD, flat=True).first()
+    raise ReplicationError(f"No natural key for {related.__name__}")
+
+
+class NaturalKeyResolver:
+    """Maps natural foreign keys back to local ids, loading each table at most once"""
+
+    def __init__(self):
+        self._maps = {}
+
+    def _map(self, related):
+        if related not in self._maps:
+            if related is Section:
+                rows = Section.objects.values_list('pk', 'name', 'department__name')
+                self._maps[related] = {(name, department): pk for pk, name, department in rows}
+            elif related is Designation:
+                rows = Designation.objects.values_list(
+                    'pk', 'name', 'section__name', 'section__department__name'
+                )
+                self._maps[related] = {(name, section, department): pk for pk, name, section, department in rows}
+            else:
+                user_model = get_user_model()
+                rows = user_model.objects.values_list('pk', user_model.USERNAME_FIELD)
+                self._maps[related] = {username: pk for pk, username in rows}
+        return self._maps[related]
+
+    def resolve(self, field, value):
+        if value is None or field.related_model is Personnel:
+            return value
+        key = tuple(value) if isinstance(value, list) else value
+        # Unknown sections/users (not set up at this site) are left empty
+        return self._map(field.related_model).get(key)
+
+
+# Recording local changes
+
+def next_sequence(count=1):
+    """
+    Take the next `count` change numbers and return the last; the row lock is held
+    until the caller's transaction ends
+    """
+    if not ChangeSequence.objects.filter(pk=SEQUENCE_NAME).update(value=F('value') + count):
+        try:
+            with transaction.atomic():
+                ChangeSequence.objects.create(name=SEQUENCE_NAME, value=0)
+        except IntegrityError:
+            pass
+        ChangeSequence.objects.filter(pk=SEQUENCE_NAME).update(value=F('value') + count)
+    return ChangeSequence.objects.values_list('value', flat=True).get(pk=SEQUENCE_NAME)
+
+
+def record(instance, action, values):
+    """Append one change of `instance` to the outbound log"""
+    fields = {field.attname: field for field in _local_fields(type(instance))}
+    changes = {}
+    for name, value in values.items():
+        field = fields.get(name)
+        if field is None:
+            continue
+        changes[name] = _natural_fk(field, value) if field.is_relation else value
+    if action == 'U' and not changes:
+        return
+    with transaction.atomic():
+        ChangeLogEntry.objects.create(
+            seq=next_sequence(),
+            model=instance._meta.label_lower,
+            key=record_key(instance),
+            action=action,
+            changes=changes,
+            changed_at=timezone.now(),
+        )
+
+
+def record_many(items):
+    """
+    Append changes [(instance, action, values)] made by bulk writes, which send no
+    signals, with one sequence update and one insert. `values` of None logs every
+    replicated field (for creates).
+    """
+    if not replication_enabled() or _applying.get():
+        return 0
+    now = timezone.now()
+    natural = {}
+    entries = []
+    for instance, action, values in items:
+        fields = {field.attname: field for field in _local_fields(type(instance))}
+        if values is None:
+            values = {name: getattr(instance, name) for name in fields}
+        changes = {}
+        for name, value in values.items():
+            field = fields.get(name)
+            if field is None:
+                continue
+            if field.is_relation:
+                # Many rows share a section or user; look each one up once
+                if (field.related_model, value) not in natural:
+                    natural[field.related_model, value] = _natural_fk(field, value)
+                value = natural[field.related_model, value]
+            changes[name] = value
+        if action == 'U' and not changes:
+            continue
+        entries.append(ChangeLogEntry(
+            model=instance._meta.label_lower, key=record_key(instance), action=action,
+            changes=changes, changed_at=now,
+        ))
+    if not entries:
+        return 0
+    with transaction.atomic():
+        first = next_sequence(len(entries)) - len(entries) + 1
+        for offset, entry in enumerate(entries):
+            entry.seq = first + offset
+        ChangeLogEntry.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def capture_save(instance, created):
+    """Log the fields of a TrackedFieldsMixin instance changed by this save"""
+    if not replication_enabled() or _applying.get():
+        return
+    current = instance.tracked_values()
+    loaded = None if created else getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        changed = current
+    else:
+        changed = {name: value for name, value in current.items() if name not in loaded or loaded[name] != value}
+    record(instance, 'C' if created else 'U', changed)
+
+
+def capture_delete(instance):
+    if not replication_enabled() or _applying.get():
+        return
+    record(instance, 'D', {})
+
+
+# Export
+
+def export_changes(path, since=0):
+    """Write the log entries numbered after `since` to `path`; returns (count, last seq)"""
+    entries = ChangeLogEntry.objects.filter(seq__gt=since).order_by('seq')
+    count, last_seq = 0, since
+    with gzip.open(path, 'wt', encoding='utf-8') as out:
+        out.write(json.dumps({
+            'format': CHANGES_FORMAT,
+            'version': CHANGES_VERSION,
+            'site': site_code(),
+            'since': since,
+            'created': timezone.now().isoformat(),
+        }) + '\n')
+        rows = entries.values_list('seq', 'model', 'key', 'action', 'changes', 'changed_at')
+        for seq, model, key, action, changes, changed_at in rows.iterator(chunk_size=2000):
+            out.write(json.dumps([seq, model, key, action, changes, changed_at], cls=DjangoJSONEncoder) + '\n')
+            count, last_seq = count + 1, seq
+    return count, last_seq
+
+
+# Apply
+
+def _read_changes(path):
+    stream = gzip.open(path, 'rt', encoding='utf-8')
+    header = json.loads(stream.readline())
+    if header.get('format') != CHANGES_FORMAT or header.get('version') != CHANGES_VERSION:
+        stream.close()
+        raise ReplicationError(f"{path} is not a version {CHANGES_VERSION} change file")
+    return header, stream
+
+
+def _stamp(changed_at, site):
+    """Comparable clock value: normalised UTC timestamp, then site code as tie-breaker"""
+    if isinstance(changed_at, str):
+        changed_at = parse_datetime(changed_at)
+    return [changed_at.astimezone(datetime.timezone.utc).isoformat(timespec='microseconds'), site]
+
+
+def _newer(clock, incoming):
+    """True if the incoming (changed_at, site) is at least as recent as `clock`"""
+    return clock is None or tuple(incoming) >= tuple(clock)
+
+
+def _local_clocks(model_label, keys):
+    """Field clocks from this site's own log and from changes applied earlier"""
+    clocks = {key: {} for key in keys}
+    site = site_code()
+    local = ChangeLogEntry.objects.filter(model=model_label, key__in=keys).values_list(
+        'key', 'changes', 'changed_at'
+    )
+    for key, changes, changed_at in local.iterator(chunk_size=2000):
+        stamp = _stamp(changed_at, site)
+        for name in changes or {'*': None}:
+            if _newer(clocks[key].get(name), stamp):
+                clocks[key][name] = stamp
+    states = {}
+    for state in ReplicaState.objects.filter(model=model_label, key__in=keys):
+        states[state.key] = state
+        for name, stamp in state.clocks.items():
+            if _newer(clocks[state.key].get(name), stamp):
+                clocks[state.key][name] = stamp
+    return clocks, states
+
+
+def _find_rows(model, keys):
+    if model is Personnel:
+        return Personnel.objects.in_bulk(keys)
+    own_prefix = f"{site_code()}:"
+    own_ids = {int(key[len(own_prefix):]): key for key in keys if key.startswith(own_prefix)}
+    rows = {row.origin: row for row in model.objects.filter(origin__in=[k for k in keys if not k.startswith(own_prefix)])}
+    rows.update({own_ids[row.pk]: row for row in model.objects.filter(pk__in=own_ids)})
+    return rows
+
+
+def _apply_model(model, entries, site, strategy, resolver, stats):
+    """
+    Apply one model's entries (in sequence order). Returns the touched service numbers
+    and the changes actually applied, as (label, key, action, changes) tuples.
+    """
+    label = model._meta.label_lower
+    fields = {field.attname: field for field in _local_fields(model)}
+    keys = list({entry[2] for entry in entries})
+    clocks, states = _local_clocks(label, keys)
+    rows = _find_rows(model, keys)
+    known_personnel = None
+    if model is not Personnel:
+        referenced = {entry[4].get('personnel_id') for entry in entries} | {
+            row.personnel_id for row in rows.values()
+        }
+        known_personnel = set(Personnel.objects.filter(pk__in=referenced - {None}).values_list('pk', flat=True))
+
+    created, dirty, deleted, touched = {}, {}, set(), set()
+    applied = []
+    for seq, _, key, action, changes, changed_at in entries:
+        stamp = _stamp(changed_at, site)
+        record_clocks = clocks[key]
+        newest = max(record_clocks.values(), default=None)
+        if key in deleted or not _newer(record_clocks.get('*'), stamp):
+            # Deleted here, later than this change
+            stats['stale'] += 1
+            continue
+
+        if action == 'D':
+            if _newer(newest, stamp) and key in rows:
+                deleted.add(key)
+                touched.add(key if model is Personnel else rows[key].personnel_id)
+                record_clocks['*'] = stamp
+                applied.append((label, key, action, changes or {}))
+                stats['applied'] += 1
+            else:
+                stats['stale'] += 1
+            continue
+
+        if strategy == 'lww':
+            accepted = list(changes) if _newer(newest, stamp) else []
+        else:
+            accepted = [name for name in changes if _newer(record_clocks.get(name), stamp)]
+        stats['conflicts'] += len(changes) - len(accepted)
+        if not accepted:
+            stats['stale'] += 1
+            continue
+
+        values = {}
+        for name in accepted:
+            field = fields.get(name)
+            if field is None:
+                continue
+            value = changes[name]
+            values[name] = resolver.resolve(field, value) if field.is_relation else field.to_python(value)
+
+        row = rows.get(key)
+        if row is None:
+            if model is Personnel:
+                row = Personnel(service_number=key)
+            else:
+                row = model(origin=key)
+            missing = [
+                field.name for field in fields.values()
+                if not field.null and not field.blank and not field.has_default() and not field.primary_key
+                and field.attname not in values and getattr(row, field.attname) in (None, '')
+                and not getattr(field, 'auto_now_add', False)
+            ]
+            if missing:
+                stats['skipped'] += 1
+                continue
+            rows[key] = row
+            created[key] = row
+        for name, value in values.items():
+            setattr(row, name, value)
+        if known_personnel is not None and row.personnel_id not in known_personnel:
+            # The person was never replicated here (or was deleted); nothing to attach to
+            rows.pop(key)
+            created.pop(key, None)
+            stats['skipped'] += 1
+            continue
+        if key not in created:
+            dirty.setdefault(key, set()).update(values)
+        for name in values:
+            record_clocks[name] = stamp
+        touched.add(key if model is Personnel else row.personnel_id)
+        applied.append((label, key, action, {name: changes[name] for name in values}))
+        stats['applied'] += 1
+
+    token = _applying.set(True)
+    try:
+        if deleted:
+            model.objects.filter(pk__in=[rows[key].pk for key in deleted]).delete()
+        new_rows = list(created.values())
+        # bulk_create stamps auto_now_add fields with the current time; keep the replicated values
+        stamped = [field.attname for field in fields.values() if getattr(field, 'auto_now_add', False)]
+        replicated = [{name: getattr(row, name) for name in stamped} for row in new_rows]
+        model.objects.bulk_create(new_rows, batch_size=500)
+        if stamped and new_rows:
+            for row, values in zip(new_rows, replicated):
+                for name, value in values.items():
+                    if value is not None:
+                        setattr(row, name, value)
+            model.objects.bulk_update(new_rows, stamped, batch_size=500)
+        update_fields = set().union(*dirty.values()) if dirty else set()
+        if update_fields:
+            model.objects.bulk_update([rows[key] for key in dirty], sorted(update_fields), batch_size=500)
+            # Local edits of these rows started before this change must now conflict
+            model.objects.filter(pk__in=[rows[key].pk for key in dirty]).update(version=F('version') + 1)
+    finally:
+        _applying.reset(token)
+
+    ReplicaState.objects.bulk_create(
+        [ReplicaState(model=label, key=key, clocks=clocks[key]) for key in keys if clocks[key]],
+        update_conflicts=True,
+        unique_fields=['model', 'key'],
+        update_fields=['clocks'],
+        batch_size=500,
+    )
+    return touched, applied
+
+
+def apply_changes(path, strategy=None, batch_size=5000):
+    """
+    Apply a change file exported by another site. Entries already applied are
+    skipped, so a file can be applied twice; a gap since the last applied entry is
+    an error. Returns a stats dict.
+    """
+    from . import audit, autocomplete
+    from .services import invalidate_dossier, rebuild_service_intervals
+    from .leave_ledger import rebuild_leave_balances
+    from .leave_usage import months_between, refresh_leave_usage
+    from .command_chain import refresh_chain
+
+    strategy = strategy or getattr(settings, 'REPLICATION_STRATEGY', 'field')
+    if strategy not in STRATEGIES:
+        raise ReplicationError(f"Unknown strategy '{strategy}' (use one of: {', '.join(STRATEGIES)})")
+    header, stream = _read_changes(path)
+    site = header['site']
+    if site == site_code():
+        stream.close()
+        raise ReplicationError(f"{path} was exported by this site ({site})")
+
+    cursor, _ = ReplicationCursor.objects.get_or_create(site=site)
+    if header['since'] > cursor.last_seq:
+        stream.close()
+        raise ReplicationError(
+            f"Changes {cursor.last_seq + 1}-{header['since']} from {site} are missing; "
+            f"export again with --since {cursor.last_seq}"
+        )
+
+    stats = {'site': site, 'applied': 0, 'stale': 0, 'conflicts': 0, 'skipped': 0, 'lastSeq': cursor.last_seq}
+    by_label = {model._meta.label_lower: model for model in REPLICATED_MODELS}
+    resolver = NaturalKeyResolver()
+
+    def leave_months(batch):
+        keys = [entry[2] for entry in batch if by_label.get(entry[1]) is Leave]
+        return {
+            month for leave in _find_rows(Leave, keys).values()
+            for month in months_between(leave.start_date, leave.end_date)
+        } if keys else set()
+
+    def apply_batch(batch):
+        # The usage rollup is refreshed for the months replicated leaves covered before and after
+        months = leave_months(batch)
+        with transaction.atomic():
+            touched, applied = set(), []
+            for model in REPLICATED_MODELS:
+                entries = [entry for entry in batch if by_label.get(entry[1]) is model]
+                if entries:
+                    model_touched, model_applied = _apply_model(model, entries, site, strategy, resolver, stats)
+                    touched |= model_touched
+                    applied += model_applied
+            # Only what was applied: stale entries and fields lost to conflicts changed nothing
+            audit.record_many(
+                (label, key, action, {name: [None, value] for name, value in changes.items()})
+                for label, key, action, changes in applied
+            )
+            ReplicationCursor.objects.filter(pk=cursor.pk).update(last_seq=batch[-1][0])
+            stats['lastSeq'] = batch[-1][0]
+        for service_number in touched:
+            invalidate_dossier(service_number)
+        if touched:
+            rebuild_service_intervals(sorted(touched))
+            rebuild_leave_balances(touched)
+            refresh_chain(touched)
+            autocomplete.personnel_changed(touched)
+        months |= leave_months(batch)
+        if months:
+            refresh_leave_usage(months)
+
+    with stream:
+        batch = []
+        for line in stream:
+            entry = json.loads(line)
+            if entry[0] <= cursor.last_seq:
+                continue
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                apply_batch(batch)
+                batch = []
+        if batch:
+            apply_batch(batch)
+    return stats
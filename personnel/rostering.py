@@ -0,0 +1,603 @@
+"""
+Constraint-aware guard duty roster solver.
+
+Fills GuardDutyRoster for a horizon of days using a greedy pass over the slots in
+date order, taking candidates least-recently-tasked first from a heap, followed
+by a repair pass that tries to fill any slot left short by moving one conflicting
+duty to another candidate.
+
+Rules (see DEFAULT_ROSTER_RULES, overridable via settings.ROSTER_RULES or per call):
+- slots_per_shift: number of guards per DAY / NIGHT shift
+- min_rest_hours: minimum hours between the end of one duty and the start of the next
+- allow_consecutive_nights: whether NIGHT duty on two consecutive dates is allowed
+- max_section_share: cap on the share of a section's strength on duty on any one date
+- rank_mix: per shift, list of {'ranks': [...], 'min': n} requirements
+- exclude_ranks: ranks never rostered for guard duty
+
+RosterRepair handles the incremental case: when one person becomes unavailable
+(leave approved, suspended, transferred) only their future duties are moved to
+the least-recently-tasked feasible candidates, and each move is recorded as a
+RosterChange.
+"""
+import heapq
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Personnel, GuardDutyRoster, Leave, Assignment, RosterChange
+from .services import (
+    with_current_assignment, with_last_duty, exclude_current_status, invalidate_dossier, invalidate_dashboard
+)
+
+DEFAULT_ROSTER_RULES = {
+    'slots_per_shift': {'DAY': 4, 'NIGHT': 4},
+    'min_rest_hours': 12,
+    'allow_consecutive_nights': False,
+    'max_section_share': 0.25,
+    'rank_mix': {},
+    'exclude_ranks': [],
+}
+
+# Shift start/end as hours from midnight of the roster date
+SHIFT_HOURS = {
+    'DAY': (6, 18),
+    'NIGHT': (18, 30),
+}
+
+# Assignment statuses that take a person out of the guard pool entirely
+UNAVAILABLE_STATUSES = ('SUSPENDED', 'TRANSFERRED')
+
+REPAIR_CANDIDATE_LIMIT = 200
+
+# Candidates loaded per affected slot when repairing a roster incrementally
+REPAIR_POOL_PER_SLOT = 50
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _rank_list(value):
+    return isinstance(value, list) and all(isinstance(rank, str) for rank in value)
+
+
+def validate_roster_rules(rules):
+    """
+    Check user-supplied rule overrides (e.g. the API's "rules" object); raises
+    ValueError naming the first problem. Returns the overrides unchanged.
+    """
+    if not isinstance(rules, dict):
+        raise ValueError("'rules' must be an object")
+    unknown = sorted(set(rules) - set(DEFAULT_ROSTER_RULES))
+    if unknown:
+        raise ValueError(f"Unknown roster rules: {', '.join(unknown)}")
+    if 'slots_per_shift' in rules:
+        slots = rules['slots_per_shift']
+        if not isinstance(slots, dict) or set(slots) - set(SHIFT_HOURS):
+            raise ValueError(f"'slots_per_shift' must map {' / '.join(SHIFT_HOURS)} to a number of guards")
+        if not all(_is_count(count) and count <= 100 for count in slots.values()):
+            raise ValueError("'slots_per_shift' counts must be whole numbers from 0 to 100")
+    if 'min_rest_hours' in rules:
+        if not _is_number(rules['min_rest_hours']) or not 0 <= rules['min_rest_hours'] <= 168:
+            raise ValueError("'min_rest_hours' must be a number of hours from 0 to 168")
+    if 'allow_consecutive_nights' in rules and not isinstance(rules['allow_consecutive_nights'], bool):
+        raise ValueError("'allow_consecutive_nights' must be true or false")
+    if 'max_section_share' in rules and rules['max_section_share'] is not None:
+        if not _is_number(rules['max_section_share']) or not 0 <= rules['max_section_share'] <= 1:
+            raise ValueError("'max_section_share' must be a fraction from 0 to 1 (or null)")
+    if 'rank_mix' in rules:
+        rank_mix = rules['rank_mix']
+        if not isinstance(rank_mix, dict) or set(rank_mix) - set(SHIFT_HOURS):
+            raise ValueError(f"'rank_mix' must map {' / '.join(SHIFT_HOURS)} to a list of requirements")
+        for requirements in rank_mix.values():
+            if not isinstance(requirements, list) or not all(
+                isinstance(req, dict) and set(req) <= {'ranks', 'min'} and _rank_list(req.get('ranks'))
+                and (_is_count(req.get('min', 1)) and req.get('min', 1) > 0)
+                for req in requirements
+            ):
+                raise ValueError("'rank_mix' requirements must be {\"ranks\": [...], \"min\": n} with n >= 1")
+    if 'exclude_ranks' in rules and not _rank_list(rules['exclude_ranks']):
+        raise ValueError("'exclude_ranks' must be a list of ranks")
+    return rules
+
+
+def get_roster_rules(overrides=None):
+    """Merge defaults, settings.ROSTER_RULES and per-call overrides (see validate_roster_rules)"""
+    rules = {**DEFAULT_ROSTER_RULES, **getattr(settings, 'ROSTER_RULES', {})}
+    if overrides:
+        rules.update(validate_roster_rules(overrides))
+    rules['slots_per_shift'] = {
+        shift: int(rules['slots_per_shift'].get(shift, 0)) for shift in SHIFT_HOURS
+    }
+    return rules
+
+
+class RosterSolver:
+    """
+    Greedy-with-repair solver over one horizon.
+    Loads everything it needs up front in a fixed number of queries and works in memory.
+    """
+
+    def __init__(self, start_date, end_date, rules=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.rules = get_roster_rules(rules)
+        self.epoch = start_date
+
+    def _hours(self, date, shift):
+        start, end = SHIFT_HOURS[shift]
+        offset = (date - self.epoch).days * 24
+        return offset + start, offset + end
+
+    def _load(self):
+        rules = self.rules
+        # Rest rules look at duties just outside the horizon as well
+        margin = timedelta(days=max(2, rules['min_rest_hours'] // 24 + 2))
+        pool = (
+            with_last_duty(exclude_current_status(
+                with_current_assignment(Personnel.objects.exclude(rank__in=rules['exclude_ranks'])),
+                UNAVAILABLE_STATUSES,
+            ))
+            .values_list('service_number', 'rank', 'current_section_id', 'last_duty_date')
+        )
+        self.rank = {}
+        self.section = {}
+        last_duty = {}
+        for service_number, rank, section_id, last_duty_date in pool:
+            self.rank[service_number] = rank
+            self.section[service_number] = section_id
+            last_duty[service_number] = last_duty_date
+
+        strength = {}
+        for section_id in self.section.values():
+            if section_id is not None:
+                strength[section_id] = strength.get(section_id, 0) + 1
+        share = rules['max_section_share']
+        self.section_cap = {
+            section_id: max(1, int(count * share)) for section_id, count in strength.items()
+        } if share else {}
+
+        self.leaves = {}
+        # Filtered by date only and matched against the pool in Python, which keeps
+        # the queries free of huge IN lists
+        approved = Leave.objects.filter(
+            status='APPROVED', start_date__lte=self.end_date, end_date__gte=self.start_date,
+        ).values_list('personnel_id', 'start_date', 'end_date')
+        for personnel_id, start, end in approved:
+            if personnel_id in last_duty:
+                self.leaves.setdefault(personnel_id, []).append((start, end))
+
+        # Per-person sorted duties: (start_hour, end_hour, shift, date, slot index or None if pre-existing)
+        self.duties = {}
+        self.section_day = {}
+        existing = list(GuardDutyRoster.objects.filter(
+            date__range=[self.start_date - margin, self.end_date + margin],
+        ).values_list('personnel_id', 'date', 'shift_type'))
+        # People no longer in the pool (suspended, transferred, excluded rank) keep the
+        # duties they already hold, and those still fill their slots and count towards
+        # the rank mix and section share; only pool members need rest tracking
+        outside = {
+            personnel_id for personnel_id, date, _ in existing
+            if personnel_id not in last_duty and self.start_date <= date <= self.end_date
+        }
+        if outside:
+            holders = with_current_assignment(Personnel.objects.filter(pk__in=outside)).values_list(
+                'service_number', 'rank', 'current_section_id'
+            )
+            for service_number, rank, section_id in holders:
+                self.rank[service_number] = rank
+                self.section[service_number] = section_id
+        self.existing_slot_members = {}
+        for personnel_id, date, shift in existing:
+            if personnel_id in last_duty:
+                start, end = self._hours(date, shift)
+                insort(self.duties.setdefault(personnel_id, []), (start, end, shift, date, None))
+            if self.start_date <= date <= self.end_date:
+                self.existing_slot_members.setdefault((date, shift), []).append(personnel_id)
+                self._count_section(personnel_id, date, 1)
+
+        # Least recently tasked first; never tasked sorts before everyone
+        self.heap = []
+        for service_number, last_duty_date in last_duty.items():
+            person_duties = self.duties.get(service_number)
+            if person_duties:
+                key = person_duties[-1][1]
+            elif last_duty_date is not None:
+                key = (last_duty_date - self.epoch).days * 24
+            else:
+                key = float('-inf')
+            self.heap.append((key, service_number))
+        heapq.heapify(self.heap)
+
+    def _count_section(self, personnel_id, date, delta):
+        section_id = self.section.get(personnel_id)
+        if section_id is not None:
+            key = (section_id, date)
+            self.section_day[key] = self.section_day.get(key, 0) + delta
+
+    def _on_leave(self, personnel_id, date):
+        return any(start <= date <= end for start, end in self.leaves.get(personnel_id, ()))
+
+    def _feasible(self, personnel_id, slot, ignore=None):
+        """Check every per-person rule for placing `personnel_id` in `slot`, optionally ignoring one duty"""
+        date, shift = slot['date'], slot['shift']
+        if self._on_leave(personnel_id, date):
+            return False
+
+        section_id = self.section.get(personnel_id)
+        if section_id is not None and section_id in self.section_cap:
+            used = self.section_day.get((section_id, date), 0)
+            if ignore is not None and ignore[3] == date:
+                used -= 1
+            if used >= self.section_cap[section_id]:
+                return False
+
+        duties = [d for d in self.duties.get(personnel_id, ()) if d is not ignore]
+        start, end = slot['start'], slot['end']
+        rest = self.rules['min_rest_hours']
+        position = bisect_left(duties, (start,))
+        if position > 0 and start - duties[position - 1][1] < rest:
+            return False
+        if position < len(duties) and duties[position][0] - end < rest:
+            return False
+        if shift == 'NIGHT' and not self.rules['allow_consecutive_nights']:
+            for other in duties:
+                if other[2] == 'NIGHT' and abs((other[3] - date).days) == 1:
+                    return False
+        return True
+
+    def _role_for(self, personnel_id, slot):
+        """Index of the first unmet rank requirement this person satisfies, or None"""
+        rank = self.rank[personnel_id]
+        for index, requirement in enumerate(slot['requirements']):
+            if requirement['remaining'] > 0 and rank in requirement['ranks']:
+                return index
+        return None
+
+    def _assign(self, personnel_id, slot_index, role):
+        slot = self.slots[slot_index]
+        slot['assigned'].append(personnel_id)
+        slot['roles'].append(role)
+        if role is not None:
+            slot['requirements'][role]['remaining'] -= 1
+        duty = (slot['start'], slot['end'], slot['shift'], slot['date'], slot_index)
+        insort(self.duties.setdefault(personnel_id, []), duty)
+        self._count_section(personnel_id, slot['date'], 1)
+
+    def _unassign(self, personnel_id, slot_index):
+        slot = self.slots[slot_index]
+        position = slot['assigned'].index(personnel_id)
+        slot['assigned'].pop(position)
+        role = slot['roles'].pop(position)
+        if role is not None:
+            slot['requirements'][role]['remaining'] += 1
+        self.duties[personnel_id] = [d for d in self.duties[personnel_id] if d[4] != slot_index]
+        self._count_section(personnel_id, slot['date'], -1)
+        return role
+
+    def _build_slots(self):
+        self.slots = []
+        date = self.start_date
+        shifts = sorted(SHIFT_HOURS, key=lambda shift: SHIFT_HOURS[shift][0])
+        while date <= self.end_date:
+            for shift in shifts:
+                capacity = self.rules['slots_per_shift'][shift]
+                existing = self.existing_slot_members.get((date, shift), [])
+                requirements = [
+                    {'ranks': set(req['ranks']), 'remaining': int(req.get('min', 1))}
+                    for req in self.rules['rank_mix'].get(shift, [])
+                ]
+                for personnel_id in existing:
+                    for requirement in requirements:
+                        if requirement['remaining'] > 0 and self.rank[personnel_id] in requirement['ranks']:
+                            requirement['remaining'] -= 1
+                            break
+                start, end = self._hours(date, shift)
+                self.slots.append({
+                    'date': date, 'shift': shift, 'start': start, 'end': end,
+                    'open': max(capacity - len(existing), 0),
+                    'requirements': requirements,
+                    'assigned': [], 'roles': [],
+                })
+            date += timedelta(days=1)
+
+    def _fill(self, slot_index):
+        """Greedy fill of one slot from the least-recently-tasked heap"""
+        slot = self.slots[slot_index]
+        skipped = []
+        while self.heap and len(slot['assigned']) < slot['open']:
+            key, personnel_id = heapq.heappop(self.heap)
+            if not self._feasible(personnel_id, slot):
+                skipped.append((key, personnel_id))
+                continue
+            role = self._role_for(personnel_id, slot)
+            unmet = sum(req['remaining'] for req in slot['requirements'])
+            if role is None and slot['open'] - len(slot['assigned']) <= unmet:
+                # Remaining positions are reserved for the rank mix
+                skipped.append((key, personnel_id))
+                continue
+            self._assign(personnel_id, slot_index, role)
+            heapq.heappush(self.heap, (slot['end'], personnel_id))
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+
+    def _repair(self, slot_index):
+        """
+        Try to fill a short slot by moving one of a candidate's generated duties
+        (the one blocking them) to someone else.
+        """
+        slot = self.slots[slot_index]
+        candidates = sorted(self.heap)[:REPAIR_CANDIDATE_LIMIT]
+        for _, personnel_id in candidates:
+            if len(slot['assigned']) >= slot['open']:
+                return
+            if personnel_id in slot['assigned']:
+                continue
+            role = self._role_for(personnel_id, slot)
+            unmet = sum(req['remaining'] for req in slot['requirements'])
+            if role is None and slot['open'] - len(slot['assigned']) <= unmet:
+                continue
+            for blocker in list(self.duties.get(personnel_id, ())):
+                if blocker[4] is None or blocker[4] == slot_index:
+                    continue
+                if not self._feasible(personnel_id, slot, ignore=blocker):
+                    continue
+                other_index = blocker[4]
+                other_role = self._unassign(personnel_id, other_index)
+                replacement = self._find_replacement(other_index, other_role, exclude=personnel_id)
+                if replacement is None:
+                    self._assign(personnel_id, other_index, other_role)
+                    continue
+                self._assign(replacement, other_index, other_role)
+                self._assign(personnel_id, slot_index, self._role_for(personnel_id, slot))
+                break
+
+    def _find_replacement(self, slot_index, role, exclude):
+        slot = self.slots[slot_index]
+        required = slot['requirements'][role]['ranks'] if role is not None else None
+        for _, personnel_id in sorted(self.heap)[:REPAIR_CANDIDATE_LIMIT]:
+            if personnel_id == exclude or personnel_id in slot['assigned']:
+                continue
+            if required is not None and self.rank[personnel_id] not in required:
+                continue
+            if self._feasible(personnel_id, slot):
+                return personnel_id
+        return None
+
+    def solve(self):
+        """Build the plan in memory; returns (entries, unfilled)"""
+        self._load()
+        self._build_slots()
+        for slot_index in range(len(self.slots)):
+            self._fill(slot_index)
+        for slot_index, slot in enumerate(self.slots):
+            if len(slot['assigned']) < slot['open']:
+                self._repair(slot_index)
+
+        entries = []
+        unfilled = []
+        for slot in self.slots:
+            for personnel_id in slot['assigned']:
+                entries.append((personnel_id, slot['date'], slot['shift']))
+            missing = slot['open'] - len(slot['assigned'])
+            if missing > 0:
+                unmet = [
+                    {'ranks': sorted(req['ranks']), 'missing': req['remaining']}
+                    for req in slot['requirements'] if req['remaining'] > 0
+                ]
+                unfilled.append({
+                    'date': slot['date'], 'shift': slot['shift'],
+                    'missing': missing, 'unmetRankMix': unmet,
+                })
+        return entries, unfilled
+
+
+def solve_roster(start_date, end_date, rules=None, commit=True):
+    """
+    Fill GuardDutyRoster for [start_date, end_date] under the configured rules.
+    Existing entries in the horizon are kept and count towards each slot.
+
+    Returns a summary dict with the number of duties planned and any slots
+    that could not be filled.
+    """
+    solver = RosterSolver(start_date, end_date, rules)
+    entries, unfilled = solver.solve()
+    if commit and entries:
+        with transaction.atomic():
+            GuardDutyRoster.objects.bulk_create(
+                [
+                    GuardDutyRoster(personnel_id=personnel_id, date=date, shift_type=shift)
+                    for personnel_id, date, shift in entries
+                ],
+                batch_size=500,
+            )
+        # bulk_create bypasses post_save, so drop cached dossiers explicitly
+        for personnel_id in {entry[0] for entry in entries}:
+            invalidate_dossier(personnel_id, ['guardDuties'])
+        invalidate_dashboard()
+    return {
+        'from': start_date,
+        'to': end_date,
+        'rules': solver.rules,
+        'committed': bool(commit),
+        'planned': len(entries),
+        'duties': [
+            {'personnelId': personnel_id, 'date': date, 'shiftType': shift}
+            for personnel_id, date, shift in entries
+        ],
+        'unfilled': unfilled,
+    }
+
+
+class RosterRepair(RosterSolver):
+    """
+    Moves one person's future duties to other candidates without re-solving the roster.
+
+    Only the top least-recently-tasked candidates are loaded (REPAIR_POOL_PER_SLOT per
+    affected slot) together with their leave and nearby duties, so the cost depends on
+    the number of affected slots, not the size of the force. Feasibility uses the same
+    rules as the full solver.
+    """
+
+    def __init__(self, personnel_id, start_date, end_date=None, rules=None):
+        today = timezone.now().date()
+        super().__init__(max(start_date, today), end_date, rules)
+        self.personnel_id = personnel_id
+
+    def _base_pool(self):
+        return exclude_current_status(
+            with_current_assignment(Personnel.objects.exclude(rank__in=self.rules['exclude_ranks'])),
+            UNAVAILABLE_STATUSES,
+        )
+
+    def _load_candidates(self, dates, slot_count):
+        rules = self.rules
+        margin = timedelta(days=max(2, rules['min_rest_hours'] // 24 + 2))
+        low, high = dates[0] - margin, dates[-1] + margin
+
+        pool = (
+            with_last_duty(self._base_pool().exclude(service_number=self.personnel_id))
+            .order_by(F('last_duty_date').asc(nulls_first=True), 'service_number')
+            .values_list('service_number', 'rank', 'current_section_id', 'last_duty_date')
+            [:REPAIR_POOL_PER_SLOT * slot_count]
+        )
+        self.rank, self.section, last_duty = {}, {}, {}
+        for service_number, rank, section_id, last_duty_date in pool:
+            self.rank[service_number] = rank
+            self.section[service_number] = section_id
+            last_duty[service_number] = last_duty_date
+        candidates = list(self.rank)
+
+        self.leaves = {}
+        approved = Leave.objects.filter(
+            status='APPROVED', start_date__lte=dates[-1], end_date__gte=dates[0],
+            personnel_id__in=candidates,
+        ).values_list('personnel_id', 'start_date', 'end_date')
+        for personnel_id, start, end in approved:
+            self.leaves.setdefault(personnel_id, []).append((start, end))
+
+        self.duties = {}
+        nearby = GuardDutyRoster.objects.filter(
+            date__range=[low, high], personnel_id__in=candidates,
+        ).values_list('personnel_id', 'date', 'shift_type')
+        for personnel_id, date, shift in nearby:
+            start, end = self._hours(date, shift)
+            insort(self.duties.setdefault(personnel_id, []), (start, end, shift, date, None))
+
+        # Section caps need everyone on duty on the affected dates, not just the candidates
+        latest_section = Assignment.objects.filter(
+            personnel=OuterRef('personnel_id')
+        ).order_by('-date_of_posting', '-id').values('section_id')[:1]
+        on_duty = (
+            GuardDutyRoster.objects.filter(date__in=dates)
+            .exclude(personnel_id=self.personnel_id)
+            .annotate(section_id=Subquery(latest_section))
+            .values('section_id', 'date')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        self.section_day = {
+            (row['section_id'], row['date']): row['count']
+            for row in on_duty if row['section_id'] is not None
+        }
+        share = rules['max_section_share']
+        strength = (
+            self._base_pool().values('current_section_id').annotate(count=Count('pk')).order_by()
+        ) if share else []
+        self.section_cap = {
+            row['current_section_id']: max(1, int(row['count'] * share))
+            for row in strength if row['current_section_id'] is not None
+        }
+
+        self.order = sorted(
+            candidates,
+            key=lambda pid: (
+                (last_duty[pid] - self.epoch).days * 24 if last_duty[pid] else float('-inf'), pid
+            ),
+        )
+
+    def _required_ranks(self, shift, removed_rank):
+        """Rank group the removed person counted towards in this shift's rank mix, if any"""
+        for requirement in self.rules['rank_mix'].get(shift, []):
+            if removed_rank in requirement['ranks']:
+                return set(requirement['ranks'])
+        return None
+
+    def _pick(self, slot, required):
+        fallback = None
+        for personnel_id in self.order:
+            if not self._feasible(personnel_id, slot):
+                continue
+            if required is None or self.rank[personnel_id] in required:
+                return personnel_id
+            if fallback is None:
+                fallback = personnel_id
+        return fallback
+
+    def run(self, reason, leave=None):
+        """Apply the repair; returns the RosterChange rows created (empty if nothing was affected)"""
+        affected = GuardDutyRoster.objects.filter(
+            personnel_id=self.personnel_id, date__gte=self.start_date
+        )
+        if self.end_date is not None:
+            affected = affected.filter(date__lte=self.end_date)
+        affected = list(
+            affected.order_by('date', 'shift_type').values_list('id', 'date', 'shift_type', 'personnel__rank')
+        )
+        if not affected:
+            return []
+
+        dates = sorted({row[1] for row in affected})
+        self.epoch = dates[0]
+        self._load_candidates(dates, len(affected))
+
+        changes, replaced, removed = [], [], []
+        for roster_id, date, shift, removed_rank in affected:
+            start, end = self._hours(date, shift)
+            slot = {'date': date, 'shift': shift, 'start': start, 'end': end}
+            chosen = self._pick(slot, self._required_ranks(shift, removed_rank))
+            if chosen is None:
+                removed.append(roster_id)
+            else:
+                replaced.append((roster_id, chosen))
+                insort(self.duties.setdefault(chosen, []), (start, end, shift, date, None))
+                self._count_section(chosen, date, 1)
+                # Just tasked - move to the back of the queue
+                self.order.remove(chosen)
+                self.order.append(chosen)
+            changes.append(RosterChange(
+                roster_date=date, shift_type=shift, removed_id=self.personnel_id,
+                added_id=chosen, reason=reason, leave=leave,
+            ))
+
+        batch = changes[0].batch
+        for change in changes:
+            change.batch = batch
+        with transaction.atomic():
+            for roster_id, chosen in replaced:
+                GuardDutyRoster.objects.filter(pk=roster_id).update(personnel_id=chosen)
+            if removed:
+                GuardDutyRoster.objects.filter(pk__in=removed).delete()
+            RosterChange.objects.bulk_create(changes)
+
+        # update() bypasses post_save, so drop cached dossiers explicitly
+        for personnel_id in {self.personnel_id, *(chosen for _, chosen in replaced)}:
+            invalidate_dossier(personnel_id, ['guardDuties'])
+        invalidate_dashboard()
+        return changes
+
+
+def repair_roster(personnel_id, start_date, end_date=None, reason='LEAVE', leave=None, rules=None):
+    """
+    Reassign `personnel_id`'s duties from max(start_date, today) to end_date
+    (open-ended if None). Returns the RosterChange rows recorded.
+    """
+    return RosterRepair(personnel_id, start_date, end_date, rules).run(reason, leave)
@@ -1,7 +1,28 @@
 from rest_framework import serializers
-from .models import Personnel, Assignment, Section, Leave, Department, Designation
+from .models import (
+    Personnel, Assignment, Section, Leave, Department, Designation,
+    CareerProgression, Qualification, GuardDutyRoster, Job, RosterChange,
+    PromotionEligibility, AuditEntry, LeaveBalance, Attachment
+)
+from .leave_ledger import working_days, remaining_days
+from django.urls import reverse
 from django.utils import timezone
 
+
+def file_url(request, sha256, size=None):
+    """URL of a stored file, or of one of its thumbnails"""
+    if size is None:
+        url = reverse('files-detail', args=[sha256])
+    else:
+        url = reverse('files-thumbnail', kwargs={'pk': sha256, 'size': size})
+    return request.build_absolute_uri(url) if request else url
+
+def thumbnail_urls(request, sha256, sizes):
+    """{size: url} for the thumbnails generated so far (None until there are some)"""
+    if not sha256 or not sizes:
+        return None
+    return {str(size): file_url(request, sha256, size) for size in sizes}
+
 class DepartmentSerializer(serializers.ModelSerializer):
     """Serializer for Department model - used in dropdowns"""
     class Meta:
@@ -37,31 +58,76 @@ class PersonnelSerializer(serializers.ModelSerializer):
     section = serializers.SerializerMethodField()
     status = serializers.SerializerMethodField()
     joinedDate = serializers.DateField(source='date_of_enlistment', read_only=True)
+    photo = serializers.SerializerMethodField()
+
+    # Assignment status -> frontend status label
+    STATUS_MAP = {
+        'ACTIVE': 'Active',
+        'TRANSFERRED': 'Active',
+        'ON_LEAVE': 'On Leave',
+        'SUSPENDED': 'Suspended',
+    }
 
     class Meta:
         model = Personnel
-        fields = ['id', 'serviceId', 'firstName', 'lastName', 'rank', 'section', 'status', 'joinedDate']
+        fields = [
+            'id', 'serviceId', 'firstName', 'lastName', 'rank', 'section', 'status', 'joinedDate', 'photo', 'version'
+        ]
+
+    def _latest_assignments(self, obj):
+        """Assignments newest first, from the list view's prefetch when present"""
+        if 'assignments' in getattr(obj, '_prefetched_objects_cache', {}):
+            return list(obj.assignments.all())
+        return None
 
     def get_section(self, obj):
         """Get section from latest active assignment"""
-        latest_assignment = obj.assignments.filter(status='ACTIVE').order_by('-date_of_posting').first()
+        assignments = self._latest_assignments(obj)
+        if assignments is None:
+            latest_assignment = obj.assignments.filter(status='ACTIVE').order_by('-date_of_posting').first()
+        else:
+            latest_assignment = next((a for a in assignments if a.status == 'ACTIVE'), None)
         if latest_assignment and latest_assignment.section:
             return latest_assignment.section.name
         return "Unassigned"
 
+    def get_photo(self, obj):
+        """Thumbnail URLs of the latest passport photo (never the full-size image)"""
+        if hasattr(obj, 'photo_sha256'):
+            sha256, sizes = obj.photo_sha256, obj.photo_thumbnails
+        else:
+            latest = obj.attachments.filter(kind='PHOTO').select_related('file').first()
+            sha256, sizes = (latest.file_id, latest.file.thumbnails) if latest else (None, None)
+        return thumbnail_urls(self.context.get('request'), sha256, sizes)
+
     def get_status(self, obj):
         """Get status from latest assignment"""
-        status_map = {
-            'ACTIVE': 'Active',
-            'TRANSFERRED': 'Active',
-            'ON_LEAVE': 'On Leave',
-            'SUSPENDED': 'Suspended',
-        }
-        latest_assignment = obj.assignments.order_by('-date_of_posting').first()
+        assignments = self._latest_assignments(obj)
+        if assignments is None:
+            latest_assignment = obj.assignments.order_by('-date_of_posting').first()
+        else:
+            latest_assignment = assignments[0] if assignments else None
         if latest_assignment:
-            return status_map.get(latest_assignment.status, 'Active')
+            return self.STATUS_MAP.get(latest_assignment.status, 'Active')
         return 'Active'
 
+class PersonnelAsOfSerializer(PersonnelSerializer):
+    """Personnel listing as of a past date - reads the services.personnel_as_of annotations"""
+    rank = serializers.CharField(source='as_of_rank', read_only=True)
+    asOf = serializers.SerializerMethodField()
+
+    class Meta(PersonnelSerializer.Meta):
+        fields = PersonnelSerializer.Meta.fields + ['asOf']
+
+    def get_section(self, obj):
+        return obj.as_of_section or "Unassigned"
+
+    def get_status(self, obj):
+        return self.STATUS_MAP.get(obj.as_of_status, 'Active')
+
+    def get_asOf(self, obj):
+        return self.context.get('as_of')
+
 class PersonnelCreateUpdateSerializer(serializers.ModelSerializer):
     """Write serializer for creating/updating personnel"""
     # Map frontend field names to backend
@@ -87,7 +153,7 @@ class PersonnelCreateUpdateSerializer(serializers.ModelSerializer):
         fields = [
             'serviceNumber', 'firstName', 'lastName', 'rank', 'gender',
             'dateOfBirth', 'maritalStatus', 'stateOfOrigin', 'lgaOfOrigin',
-            'dateOfEnlistment', 'sectionId', 'disposition'
+            'dateOfEnlistment', 'sectionId', 'disposition', 'version'
         ]
 
     def validate_rank(self, value):
@@ -109,8 +175,9 @@ class PersonnelCreateUpdateSerializer(serializers.ModelSerializer):
         if not value or len(value.strip()) == 0:
             raise serializers.ValidationError("Service number is required")
         
-        # Check uniqueness on create
-        if not self.instance and Personnel.objects.filter(service_number=value).exists():
+        # Check uniqueness on create (bulk writes check the whole batch with one IN query instead)
+        if (not self.instance and not self.context.get('bulk')
+                and Personnel.objects.filter(service_number=value).exists()):
             raise serializers.ValidationError("Personnel with this service number already exists")
         
         return value.strip()
@@ -185,7 +252,7 @@ class LeaveSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'personnelId', 'personnelName', 'leaveType', 'startDate', 
             'endDate', 'resumptionDate', 'reason', 'status', 'daysCount',
-            'requestedDate', 'approvedBy', 'approvedDate', 'rejectionReason'
+            'requestedDate', 'approvedBy', 'approvedDate', 'rejectionReason', 'version'
         ]
     
     def get_personnelName(self, obj):
@@ -208,7 +275,7 @@ class LeaveCreateUpdateSerializer(serializers.ModelSerializer):
         model = Leave
         fields = [
             'personnelId', 'leaveType', 'startDate', 'endDate', 
-            'resumptionDate', 'reason'
+            'resumptionDate', 'reason', 'version'
         ]
     
     def validate(self, data):
@@ -243,8 +310,34 @@ class LeaveCreateUpdateSerializer(serializers.ModelSerializer):
                     )
             except Personnel.DoesNotExist:
                 raise serializers.ValidationError(f"Personnel with service number {personnel_id} not found")
+
+            self.validate_balance(personnel, data)
         
         return data
+
+    def validate_balance(self, personnel, data):
+        """Reject requests for more working days than the person has left (one ledger read)"""
+        start_date, end_date = data.get('start_date'), data.get('end_date')
+        leave_type = data.get('leave_type')
+        if not start_date or not end_date or not leave_type:
+            return
+        days = working_days(start_date, end_date)
+        if days == 0:
+            raise serializers.ValidationError("The requested period contains no working days")
+        remaining = remaining_days(personnel, leave_type, start_date.year)
+        if remaining is None:
+            return
+        if (
+            self.instance and self.instance.status == 'PENDING' and self.instance.leave_type == leave_type
+            and self.instance.start_date.year == start_date.year
+            and self.instance.personnel_id == personnel.pk
+        ):
+            remaining += self.instance.days_count  # this request's own reservation
+        if days > remaining:
+            raise serializers.ValidationError(
+                f"Only {max(remaining, 0)} working days of {dict(Leave.LEAVE_TYPE_CHOICES)[leave_type]} "
+                f"left for {start_date.year}; {days} requested"
+            )
     
     def create(self, validated_data):
         """Create new leave request"""
@@ -261,3 +354,184 @@ class LeaveCreateUpdateSerializer(serializers.ModelSerializer):
         )
         
         return leave
+
+
+class AssignmentSerializer(serializers.ModelSerializer):
+    """Read-only serializer for Assignment - expects section/designation to be select_related"""
+    sectionId = serializers.IntegerField(source='section_id', read_only=True)
+    sectionName = serializers.CharField(source='section.name', read_only=True, default=None)
+    departmentName = serializers.CharField(source='section.department.name', read_only=True, default=None)
+    designationId = serializers.IntegerField(source='designation_id', read_only=True)
+    designationName = serializers.CharField(source='designation.name', read_only=True, default=None)
+    subUnit = serializers.CharField(source='sub_unit', read_only=True)
+    dateOfPosting = serializers.DateField(source='date_of_posting', read_only=True)
+
+    class Meta:
+        model = Assignment
+        fields = [
+            'id', 'disposition', 'sectionId', 'sectionName', 'departmentName',
+            'designationId', 'designationName', 'subUnit', 'dateOfPosting', 'status'
+        ]
+
+class CareerProgressionSerializer(serializers.ModelSerializer):
+    """Read-only serializer for CareerProgression"""
+    currentRank = serializers.CharField(source='current_rank', read_only=True)
+    dateOfLastPromotion = serializers.DateField(source='date_of_last_promotion', read_only=True)
+    dateOfLastTransfer = serializers.DateField(source='date_of_last_transfer', read_only=True)
+    commandLastServed = serializers.CharField(source='command_last_served', read_only=True)
+
+    class Meta:
+        model = CareerProgression
+        fields = [
+            'id', 'currentRank', 'dateOfLastPromotion', 'dateOfLastTransfer',
+            'commandLastServed'
+        ]
+
+class QualificationSerializer(serializers.ModelSerializer):
+    """Read-only serializer for Qualification"""
+    educationalQualification = serializers.CharField(source='educational_qualification', read_only=True)
+
+    class Meta:
+        model = Qualification
+        fields = ['id', 'educationalQualification']
+
+class GuardDutySerializer(serializers.ModelSerializer):
+    """Read-only serializer for a person's GuardDutyRoster entries"""
+    shiftType = serializers.CharField(source='shift_type', read_only=True)
+
+    class Meta:
+        model = GuardDutyRoster
+        fields = ['id', 'date', 'shiftType']
+
+class GuardDutyRosterSerializer(serializers.ModelSerializer):
+    """Read-only serializer for roster listings - expects personnel to be select_related"""
+    personnelId = serializers.CharField(source='personnel_id', read_only=True)
+    personnelName = serializers.SerializerMethodField()
+    rank = serializers.CharField(source='personnel.rank', read_only=True)
+    shiftType = serializers.CharField(source='shift_type', read_only=True)
+
+    class Meta:
+        model = GuardDutyRoster
+        fields = ['id', 'date', 'shiftType', 'personnelId', 'personnelName', 'rank']
+
+    def get_personnelName(self, obj):
+        return f"{obj.personnel.first_name} {obj.personnel.last_name}"
+
+class RosterChangeSerializer(serializers.ModelSerializer):
+    """Read-only serializer for incremental roster repair changes"""
+    date = serializers.DateField(source='roster_date', read_only=True)
+    shiftType = serializers.CharField(source='shift_type', read_only=True)
+    removedId = serializers.CharField(source='removed_id', read_only=True)
+    addedId = serializers.CharField(source='added_id', read_only=True)
+    leaveId = serializers.IntegerField(source='leave_id', read_only=True)
+    createdAt = serializers.DateTimeField(source='created_at', read_only=True)
+
+    class Meta:
+        model = RosterChange
+        fields = ['id', 'batch', 'date', 'shiftType', 'removedId', 'addedId', 'reason', 'leaveId', 'createdAt']
+
+class PersonnelDetailSerializer(serializers.ModelSerializer):
+    """Read-only serializer for the full personnel record (used by the dossier)"""
+    id = serializers.CharField(source='service_number', read_only=True)
+    serviceId = serializers.CharField(source='service_number', read_only=True)
+    firstName = serializers.CharField(source='first_name', read_only=True)
+    lastName = serializers.CharField(source='last_name', read_only=True)
+    dateOfBirth = serializers.DateField(source='dob', read_only=True)
+    maritalStatus = serializers.CharField(source='marital_status', read_only=True)
+    stateOfOrigin = serializers.CharField(source='state_of_origin', read_only=True)
+    lgaOfOrigin = serializers.CharField(source='lga_of_origin', read_only=True)
+    dateOfEnlistment = serializers.DateField(source='date_of_enlistment', read_only=True)
+    # Annotated by services.with_service_tenure
+    age = serializers.IntegerField(read_only=True)
+    yearsInService = serializers.IntegerField(source='service_years', read_only=True)
+
+    class Meta:
+        model = Personnel
+        fields = [
+            'id', 'serviceId', 'firstName', 'lastName', 'rank', 'gender',
+            'dateOfBirth', 'maritalStatus', 'stateOfOrigin', 'lgaOfOrigin',
+            'dateOfEnlistment', 'age', 'yearsInService'
+        ]
+
+class JobSerializer(serializers.ModelSerializer):
+    """Read-only serializer for background job status polling"""
+    createdAt = serializers.DateTimeField(source='created_at', read_only=True)
+    startedAt = serializers.DateTimeField(source='started_at', read_only=True)
+    finishedAt = serializers.DateTimeField(source='finished_at', read_only=True)
+    hasArtifact = serializers.SerializerMethodField()
+    artifactName = serializers.CharField(source='artifact_name', read_only=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'params', 'status', 'progress', 'message', 'result', 'error',
+            'attempts', 'createdAt', 'startedAt', 'finishedAt', 'hasArtifact', 'artifactName'
+        ]
+
+    def get_hasArtifact(self, obj):
+        return bool(obj.artifact_name)
+
+class PromotionEligibilitySerializer(serializers.ModelSerializer):
+    """Read-only serializer for the precomputed promotion board - expects personnel/section select_related"""
+    personnelId = serializers.CharField(source='personnel_id', read_only=True)
+    personnelName = serializers.SerializerMethodField()
+    sectionId = serializers.IntegerField(source='section_id', read_only=True)
+    sectionName = serializers.CharField(source='section.name', read_only=True, default=None)
+    currentRank = serializers.CharField(source='current_rank', read_only=True)
+    nextRank = serializers.CharField(source='next_rank', read_only=True)
+    inRankSince = serializers.DateField(source='in_rank_since', read_only=True)
+    eligibleSince = serializers.DateField(source='eligible_since', read_only=True)
+    computedAt = serializers.DateTimeField(source='computed_at', read_only=True)
+
+    class Meta:
+        model = PromotionEligibility
+        fields = [
+            'position', 'personnelId', 'personnelName', 'sectionId', 'sectionName',
+            'currentRank', 'nextRank', 'inRankSince', 'eligibleSince', 'computedAt'
+        ]
+
+    def get_personnelName(self, obj):
+        return f"{obj.personnel.first_name} {obj.personnel.last_name}"
+
+class AuditEntrySerializer(serializers.ModelSerializer):
+    """Read-only serializer for audit trail entries"""
+    userId = serializers.IntegerField(source='user_id', read_only=True)
+    objectId = serializers.CharField(source='object_pk', read_only=True)
+
+    class Meta:
+        model = AuditEntry
+        fields = ['id', 'timestamp', 'userId', 'model', 'objectId', 'action', 'changes']
+
+class LeaveBalanceSerializer(serializers.ModelSerializer):
+    """Read-only serializer for a leave ledger row"""
+    leaveType = serializers.CharField(source='leave_type', read_only=True)
+    leaveTypeName = serializers.CharField(source='get_leave_type_display', read_only=True)
+    remaining = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = LeaveBalance
+        fields = ['leaveType', 'leaveTypeName', 'year', 'entitlement', 'taken', 'reserved', 'remaining']
+
+class AttachmentSerializer(serializers.ModelSerializer):
+    """Read-only serializer for a personnel attachment - expects file select_related"""
+    personnelId = serializers.CharField(source='personnel_id', read_only=True)
+    fileName = serializers.CharField(source='file_name', read_only=True)
+    contentType = serializers.CharField(source='file.content_type', read_only=True)
+    size = serializers.IntegerField(source='file.size', read_only=True)
+    sha256 = serializers.CharField(source='file_id', read_only=True)
+    url = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
+    uploadedAt = serializers.DateTimeField(source='uploaded_at', read_only=True)
+
+    class Meta:
+        model = Attachment
+        fields = [
+            'id', 'personnelId', 'kind', 'fileName', 'description', 'contentType', 'size',
+            'sha256', 'url', 'thumbnails', 'uploadedAt'
+        ]
+
+    def get_url(self, obj):
+        return file_url(self.context.get('request'), obj.file_id)
+
+    def get_thumbnails(self, obj):
+        return thumbnail_urls(self.context.get('request'), obj.file_id, obj.file.thumbnails)
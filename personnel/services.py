@@ -1,34 +1,86 @@
-from .models import Personnel, GuardDutyRoster
-from django.db.models import Max
+from .models import (
+    Personnel, GuardDutyRoster, Assignment, Leave, Section, CareerProgression,
+    PromotionEligibility, ServiceInterval, ArchivedGuardDuty, ArchivedLeave
+)
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Case, Count, F, FilteredRelation, IntegerField, Max, Min, OuterRef, Prefetch, Q,
+    Subquery, Value, When
+)
+from django.db.models.functions import Coalesce, ExtractYear, Greatest
 from django.utils import timezone
 from datetime import timedelta
+from . import audit, autocomplete, replication
+
+
+def with_current_assignment(queryset):
+    """
+    Annotate a Personnel queryset with the status and section of each person's
+    latest assignment (by posting date) as correlated subqueries.
+    """
+    latest = Assignment.objects.filter(personnel=OuterRef('pk')).order_by('-date_of_posting', '-id')
+    return queryset.annotate(
+        current_status=Subquery(latest.values('status')[:1]),
+        current_section_id=Subquery(latest.values('section_id')[:1]),
+    )
+
+def with_last_duty(queryset):
+    """
+    Annotate a Personnel queryset with last_duty_date, the date of each person's
+    latest guard duty in either the hot or the archived table (NULL if never tasked).
+    """
+    hot = Subquery(GuardDutyRoster.objects.filter(personnel=OuterRef('pk')).order_by('-date').values('date')[:1])
+    cold = Subquery(ArchivedGuardDuty.objects.filter(personnel=OuterRef('pk')).order_by('-date').values('date')[:1])
+    # Greatest() is NULL if either side is on some backends, so fill each side with the other
+    return queryset.annotate(last_duty_date=Greatest(Coalesce(hot, cold), Coalesce(cold, hot)))
+
+def exclude_current_status(queryset, statuses):
+    """
+    Drop personnel whose latest assignment has one of `statuses`. People with no
+    assignment are kept - a plain exclude() on the subquery annotation would drop
+    them too, because NULL NOT IN (...) is not true in SQL.
+    """
+    return queryset.filter(Q(current_status__isnull=True) | ~Q(current_status__in=statuses))
+
+def completed_years(field, on_date=None):
+    """
+    SQL expression for the number of whole years between a date field and
+    `on_date` (today by default) - i.e. age or tenure, computed at query time.
+    """
+    on_date = on_date or timezone.now().date()
+    had_anniversary = (
+        Q(**{f'{field}__month__lt': on_date.month})
+        | Q(**{f'{field}__month': on_date.month, f'{field}__day__lte': on_date.day})
+    )
+    return Value(on_date.year) - ExtractYear(field) - Case(
+        When(had_anniversary, then=Value(0)),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+
+def with_service_tenure(queryset, on_date=None):
+    """Annotate a Personnel queryset with `age` and `service_years` as of `on_date`"""
+    return queryset.annotate(
+        age=completed_years('dob', on_date),
+        service_years=completed_years('date_of_enlistment', on_date),
+    )
 
 def get_eligible_guards():
     """
     Finds personnel not currently on leave/sick/deployed and sorts them 
     by the date of their most recent guard duty (Least Recently Tasked).
     """
-    # Filter active personnel
-    active_personnel = Personnel.objects.filter(status='ACTIVE')
-    
-    # Annotate with last guard duty date
-    # We use 'guard_duties' related name from the model
-    personnel_with_last_duty = active_personnel.annotate(
-        last_duty_date=Max('guard_duties__date')
-    )
+    # Filter active personnel - status lives on the latest assignment
+    active_personnel = with_current_assignment(Personnel.objects.all()).filter(current_status='ACTIVE')
     
-    # Sort: 
-    # 1. Those who verify never done duty (last_duty_date is None) should come first.
-    # 2. Then those with oldest duty dates.
-    # Order by last_duty_date ascending. None values are treated as lowest/first in some DBs, 
-    # but strictly in Python we might want to handle it. 
-    # Django 'order_by' handles nulls: usually nulls first or last.
-    # We want nulls (never did duty) to be first (most eligible).
-    # In Postgres, NULLS FIRST is default for ASC, but let's be explicit if needed.
-    # checking Django docs: default is database dependent.
-    # We can use F expression with nulls_first=True if needed, but simple order_by usually works.
+    # Annotate with last guard duty date, archived duties included
+    personnel_with_last_duty = with_last_duty(active_personnel)
     
-    return personnel_with_last_duty.order_by('last_duty_date')
+    # Sort: personnel who have never done duty (last_duty_date is NULL) come first,
+    # then those with the oldest duty dates.
+    return personnel_with_last_duty.order_by(F('last_duty_date').asc(nulls_first=True))
 
 def generate_roster_pdf(start_date, end_date):
     """
@@ -40,3 +92,834 @@ def generate_roster_pdf(start_date, end_date):
     
     # Placeholder response
     return f"PDF Generated for {start_date} to {end_date}. Roster count: {roster.count()}"
+
+
+# Dossier sections: response key -> related name on Personnel
+DOSSIER_SECTIONS = {
+    'assignments': 'assignments',
+    'careerHistory': 'career_history',
+    'qualifications': 'qualifications',
+    'leaves': 'leaves',
+    'guardDuties': 'guard_duties',
+}
+
+DOSSIER_GENERATION_KEY = 'dossier:generation'
+
+
+def _dossier_generation():
+    """Global generation counter - bumped when shared reference data (sections etc.) changes"""
+    generation = cache.get(DOSSIER_GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        cache.add(DOSSIER_GENERATION_KEY, generation, None)
+    return generation
+
+
+def _dossier_key(generation, service_number, part):
+    return f"dossier:{generation}:{service_number}:{part}"
+
+
+def invalidate_dossier(service_number, parts=None):
+    """
+    Drop cached dossier parts for one person.
+    Without `parts`, the whole dossier (personnel record and every section) is dropped.
+    """
+    generation = _dossier_generation()
+    if parts is None:
+        parts = ['personnel', *DOSSIER_SECTIONS]
+    cache.delete_many([_dossier_key(generation, service_number, part) for part in parts])
+
+
+def invalidate_all_dossiers():
+    """Invalidate every cached dossier (used when sections/designations/departments change)"""
+    try:
+        cache.incr(DOSSIER_GENERATION_KEY)
+    except ValueError:
+        cache.add(DOSSIER_GENERATION_KEY, 1, None)
+
+
+def _dossier_prefetch(section):
+    """One Prefetch per relation, with the FKs each serializer touches joined in"""
+    if section == 'assignments':
+        return Prefetch(
+            'assignments',
+            queryset=Assignment.objects.select_related(
+                'section__department', 'designation'
+            ).order_by('-date_of_posting', '-id'),
+        )
+    if section == 'leaves':
+        return Prefetch(
+            'leaves',
+            queryset=Leave.objects.select_related('approved_by').order_by('-start_date', '-id'),
+        )
+    if section == 'guardDuties':
+        return Prefetch(
+            'guard_duties',
+            queryset=GuardDutyRoster.objects.order_by('-date', 'shift_type'),
+        )
+    return DOSSIER_SECTIONS[section]
+
+
+def _dossier_rows(section, personnel):
+    """Prefetched rows of one section, plus the person's archived leave or guard duties"""
+    from .archive import merge_ordered
+    rows = getattr(personnel, DOSSIER_SECTIONS[section]).all()
+    if section == 'leaves':
+        archived = ArchivedLeave.objects.filter(personnel=personnel).select_related('approved_by')
+        ordering = ['-start_date', '-id']
+    elif section == 'guardDuties':
+        archived = ArchivedGuardDuty.objects.filter(personnel=personnel)
+        ordering = ['-date', 'shift_type']
+    else:
+        return rows
+    archived = list(archived)
+    for row in archived:
+        row.personnel = personnel
+    return merge_ordered(rows, archived, ordering)
+
+
+def get_personnel_dossier(service_number, include=None):
+    """
+    Return the full profile for one person as a dict of serialized sections.
+
+    Cached parts are served from the cache; missing parts are loaded with one
+    query for the person plus one prefetch query per missing relation (and one
+    for the archived rows of leaves and guard duties).
+    Raises Personnel.DoesNotExist if the service number is unknown.
+    """
+    from .serializers import (
+        PersonnelDetailSerializer, AssignmentSerializer, CareerProgressionSerializer,
+        QualificationSerializer, LeaveSerializer, GuardDutySerializer
+    )
+    serializers_by_section = {
+        'assignments': AssignmentSerializer,
+        'careerHistory': CareerProgressionSerializer,
+        'qualifications': QualificationSerializer,
+        'leaves': LeaveSerializer,
+        'guardDuties': GuardDutySerializer,
+    }
+
+    sections = [s for s in DOSSIER_SECTIONS if include is None or s in include]
+    parts = ['personnel', *sections]
+    generation = _dossier_generation()
+    keys = {part: _dossier_key(generation, service_number, part) for part in parts}
+    cached = cache.get_many(keys.values())
+    dossier = {part: cached[key] for part, key in keys.items() if key in cached}
+
+    missing = [part for part in parts if part not in dossier]
+    if missing:
+        prefetches = [_dossier_prefetch(s) for s in missing if s != 'personnel']
+        personnel = with_service_tenure(Personnel.objects.prefetch_related(*prefetches)).get(
+            service_number=service_number
+        )
+        fresh = {}
+        for part in missing:
+            if part == 'personnel':
+                fresh[part] = PersonnelDetailSerializer(personnel).data
+            else:
+                fresh[part] = serializers_by_section[part](_dossier_rows(part, personnel), many=True).data
+        timeout = getattr(settings, 'DOSSIER_CACHE_TIMEOUT', 300)
+        cache.set_many({keys[part]: data for part, data in fresh.items()}, timeout)
+        dossier.update(fresh)
+
+    return {part: dossier[part] for part in parts}
+
+
+PERSONNEL_UPSERT_FIELDS = [
+    'first_name', 'last_name', 'gender', 'dob', 'marital_status',
+    'state_of_origin', 'lga_of_origin', 'date_of_enlistment', 'rank',
+]
+
+
+def bulk_upsert_personnel(records):
+    """
+    Validate and insert-or-update a list of personnel records in a handful of queries.
+
+    Each record uses the PersonnelCreateUpdateSerializer format. Service number
+    uniqueness is checked for the whole batch with one IN query and sections are
+    resolved with one lookup. Valid rows are written with one upsert per set of
+    supplied fields; existing personnel keep the stored value of any field their
+    record omits. New personnel get their initial assignment in one bulk insert.
+
+    Returns a dict with created/updated/unchanged service numbers and errors keyed by index.
+    """
+    from .serializers import PersonnelCreateUpdateSerializer
+    from .command_chain import refresh_chain
+
+    errors = []
+    valid = []  # (index, validated_data)
+    seen = {}
+    sent = {}  # service number -> model fields the record actually supplied
+    for index, record in enumerate(records):
+        serializer = PersonnelCreateUpdateSerializer(data=record, context={'bulk': True})
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+            continue
+        data = serializer.validated_data
+        service_number = data['service_number']
+        if service_number in seen:
+            errors.append({'index': index, 'errors': {
+                'serviceNumber': [f"Duplicate of record at index {seen[service_number]}"]
+            }})
+            continue
+        sent[service_number] = {serializer.fields[name].source for name in record if name in serializer.fields}
+        seen[service_number] = index
+        valid.append((index, data))
+
+    section_ids = {data['sectionId'] for _, data in valid if data.get('sectionId')}
+    sections = Section.objects.in_bulk(section_ids) if section_ids else {}
+    rows = []
+    for index, data in valid:
+        section_id = data.get('sectionId')
+        if section_id and section_id not in sections:
+            errors.append({'index': index, 'errors': {'sectionId': [f"Section {section_id} not found"]}})
+            continue
+        rows.append(data)
+    errors.sort(key=lambda error: error['index'])
+
+    service_numbers = [data['service_number'] for data in rows]
+    # Stored values of existing rows, for the audit diff and to skip rows that do not change
+    stored = {
+        row['service_number']: row
+        for row in Personnel.objects.filter(service_number__in=service_numbers).values(
+            'service_number', *PERSONNEL_UPSERT_FIELDS
+        )
+    } if service_numbers else {}
+    existing = set(stored)
+
+    # Existing rows update only the supplied fields whose value differs, so an omitted
+    # field keeps its stored value instead of taking the default; one upsert per field set
+    written = {
+        data['service_number']: [
+            field for field in PERSONNEL_UPSERT_FIELDS
+            if field in data and (
+                data['service_number'] not in existing
+                or (field in sent[data['service_number']] and data[field] != stored[data['service_number']][field])
+            )
+        ]
+        for data in rows
+    }
+    # An update that changes nothing is not written, versioned, logged or audited
+    unchanged = [sn for sn in service_numbers if sn in existing and not written[sn]]
+    rows = [data for data in rows if data['service_number'] not in existing or written[data['service_number']]]
+    service_numbers = [data['service_number'] for data in rows]
+    groups = {}
+    for data in rows:
+        groups.setdefault(tuple(written[data['service_number']]), []).append(data)
+
+    with transaction.atomic():
+        people = {}
+        for fields, group in groups.items():
+            conflicts = (
+                {'update_conflicts': True, 'unique_fields': ['service_number'], 'update_fields': list(fields)}
+                if fields else {'ignore_conflicts': True}
+            )
+            people.update({
+                person.service_number: person
+                for person in Personnel.objects.bulk_create(
+                    [
+                        Personnel(
+                            service_number=data['service_number'],
+                            **{field: data[field] for field in PERSONNEL_UPSERT_FIELDS if field in data},
+                        )
+                        for data in group
+                    ],
+                    batch_size=500,
+                    **conflicts,
+                )
+            })
+        updated = [sn for sn in service_numbers if sn in existing]
+        if updated:
+            Personnel.objects.filter(service_number__in=updated).update(version=F('version') + 1)
+        # As with single creates, the initial assignment is only made for new personnel
+        today = timezone.now().date()
+        assignments = Assignment.objects.bulk_create(
+            [
+                Assignment(
+                    personnel_id=data['service_number'],
+                    section=sections[data['sectionId']],
+                    disposition=data.get('disposition') or 'General Duty',
+                    status='ACTIVE',
+                    date_of_posting=today,
+                )
+                for data in rows
+                if data.get('sectionId') and data['service_number'] not in existing
+            ],
+            batch_size=500,
+        )
+        # bulk_create bypasses post_save, so log the changes for other sites explicitly,
+        # in the same transaction as the writes
+        replication.record_many([
+            *(
+                (people[sn], 'U', {field: getattr(people[sn], field) for field in written[sn]})
+                if sn in existing else (people[sn], 'C', None)
+                for sn in service_numbers
+            ),
+            *((assignment, 'C', None) for assignment in assignments),
+        ])
+
+    # Likewise refresh derived data and audit explicitly
+    for service_number in service_numbers:
+        invalidate_dossier(service_number)
+    audit.record_many([
+        *(
+            (
+                'personnel.personnel', data['service_number'], 'U' if data['service_number'] in existing else 'C',
+                {
+                    field: [stored.get(data['service_number'], {}).get(field), data[field]]
+                    for field in written[data['service_number']]
+                },
+            )
+            for data in rows
+        ),
+        *(
+            ('personnel.assignment', assignment.pk, 'C', {
+                name: [None, value] for name, value in assignment.tracked_values().items()
+            })
+            for assignment in assignments
+        ),
+    ])
+    rebuild_service_intervals(service_numbers)
+    refresh_chain(service_numbers)
+    autocomplete.personnel_changed(service_numbers)
+
+    return {
+        'created': [sn for sn in service_numbers if sn not in existing],
+        'updated': [sn for sn in service_numbers if sn in existing],
+        'unchanged': unchanged,
+        'errors': errors,
+    }
+
+
+def gini_coefficient(values):
+    """Gini coefficient of non-negative values (0 = perfectly even, ~1 = one person does everything)"""
+    n = len(values)
+    total = sum(values)
+    if n == 0 or total == 0:
+        return 0.0
+    ordered = sorted(values)
+    # G = (2 * sum(i * x_i) / (n * sum(x))) - (n + 1) / n, with 1-based ranks over sorted values
+    weighted = sum(rank * value for rank, value in enumerate(ordered, start=1))
+    return (2 * weighted) / (n * total) - (n + 1) / n
+
+
+def compute_roster_fairness(start_date, end_date):
+    """
+    Guard-duty fairness statistics for the period [start_date, end_date].
+
+    Per person: duty count, night-shift share and mean gap (in days) between
+    consecutive duties. Force-wide: spread of duty counts (Gini, min/max ratio).
+    Everything per person comes from one grouped query - the mean gap between
+    n sorted dates is (last - first) / (n - 1), so individual dates are never loaded.
+    Personnel with no duties in the period count as zero towards the spread.
+    """
+    from .archive import guard_duties_reach_archive
+
+    models_to_read = [GuardDutyRoster]
+    if guard_duties_reach_archive(start_date, end_date):
+        models_to_read.append(ArchivedGuardDuty)
+    rows = {}
+    for model in models_to_read:
+        grouped = (
+            model.objects
+            .filter(date__range=[start_date, end_date])
+            .values('personnel_id')
+            .annotate(
+                duties=Count('id'),
+                nights=Count('id', filter=Q(shift_type='NIGHT')),
+                first_duty=Min('date'),
+                last_duty=Max('date'),
+            )
+            .order_by()
+        )
+        for row in grouped:
+            # A person's duties can straddle the hot and archived tables
+            merged = rows.setdefault(row['personnel_id'], row)
+            if merged is not row:
+                merged['duties'] += row['duties']
+                merged['nights'] += row['nights']
+                merged['first_duty'] = min(merged['first_duty'], row['first_duty'])
+                merged['last_duty'] = max(merged['last_duty'], row['last_duty'])
+
+    personnel = []
+    for row in rows.values():
+        duties = row['duties']
+        span = (row['last_duty'] - row['first_duty']).days
+        personnel.append({
+            'personnelId': row['personnel_id'],
+            'duties': duties,
+            'nights': row['nights'],
+            'nightShare': round(row['nights'] / duties, 4),
+            'averageGapDays': round(span / (duties - 1), 2) if duties > 1 else None,
+            'firstDuty': row['first_duty'],
+            'lastDuty': row['last_duty'],
+        })
+    personnel.sort(key=lambda entry: (-entry['duties'], entry['personnelId']))
+
+    force_size = Personnel.objects.count()
+    counts = [entry['duties'] for entry in personnel]
+    counts.extend([0] * max(force_size - len(counts), 0))
+    total = sum(counts)
+    highest = max(counts, default=0)
+    lowest = min(counts, default=0)
+    mean = total / len(counts) if counts else 0.0
+    variance = sum((count - mean) ** 2 for count in counts) / len(counts) if counts else 0.0
+
+    return {
+        'from': start_date,
+        'to': end_date,
+        'summary': {
+            'forceSize': force_size,
+            'personnelTasked': len(personnel),
+            'totalDuties': total,
+            'totalNights': sum(entry['nights'] for entry in personnel),
+            'meanDuties': round(mean, 4),
+            'stdDevDuties': round(variance ** 0.5, 4),
+            'maxDuties': highest,
+            'minDuties': lowest,
+            'maxMinRatio': round(highest / lowest, 4) if lowest else None,
+            'gini': round(gini_coefficient(counts), 4),
+        },
+        'personnel': personnel,
+    }
+
+
+def add_years(value, years):
+    """Same calendar day `years` later; 29 February falls back to 28 February"""
+    try:
+        return value.replace(year=value.year + years)
+    except ValueError:
+        return value.replace(year=value.year + years, day=28)
+
+
+def retirement_forecast(years, on_date=None):
+    """
+    Upcoming retirements over the next `years` years, bucketed by quarter, rank and section.
+
+    A person retires on reaching RETIREMENT_AGE or RETIREMENT_SERVICE_YEARS of service,
+    whichever comes first. The database only returns people whose threshold date falls
+    inside the horizon (two indexed date comparisons); the exact date and bucket are
+    computed in one pass over those rows.
+    """
+    on_date = on_date or timezone.now().date()
+    retirement_age = getattr(settings, 'RETIREMENT_AGE', 60)
+    service_limit = getattr(settings, 'RETIREMENT_SERVICE_YEARS', 35)
+    horizon_end = add_years(on_date, years)
+
+    # Born on/before this date => reaches retirement age by horizon_end (same for enlistment)
+    born_by = add_years(horizon_end, -retirement_age)
+    enlisted_by = add_years(horizon_end, -service_limit)
+    retiring = with_current_assignment(
+        Personnel.objects.filter(Q(dob__lte=born_by) | Q(date_of_enlistment__lte=enlisted_by))
+    )
+    rows = exclude_current_status(retiring, ['TRANSFERRED']).values_list(
+        'rank', 'current_section_id', 'dob', 'date_of_enlistment'
+    )
+
+    buckets = {}
+    by_quarter, by_rank, by_section = {}, {}, {}
+    total = 0
+    for rank, section_id, dob, enlisted in rows:
+        retires_on = min(add_years(dob, retirement_age), add_years(enlisted, service_limit))
+        if retires_on > horizon_end:
+            continue
+        if retires_on < on_date:
+            quarter = 'OVERDUE'
+        else:
+            quarter = f"{retires_on.year}-Q{(retires_on.month - 1) // 3 + 1}"
+        key = (quarter, rank, section_id)
+        buckets[key] = buckets.get(key, 0) + 1
+        by_quarter[quarter] = by_quarter.get(quarter, 0) + 1
+        by_rank[rank] = by_rank.get(rank, 0) + 1
+        by_section[section_id] = by_section.get(section_id, 0) + 1
+        total += 1
+
+    section_names = {
+        section.pk: section.name
+        for section in Section.objects.filter(pk__in=[pk for pk in by_section if pk is not None]).only('name')
+    }
+    rank_order = {code: index for index, (code, _) in enumerate(Personnel.RANK_CHOICES)}
+
+    def quarter_order(quarter):
+        # Overdue first, then quarters in date order
+        return '' if quarter == 'OVERDUE' else quarter
+
+    return {
+        'asOf': on_date,
+        'horizonEnd': horizon_end,
+        'rules': {'retirementAge': retirement_age, 'serviceYears': service_limit},
+        'total': total,
+        'byQuarter': [
+            {'quarter': quarter, 'count': by_quarter[quarter]}
+            for quarter in sorted(by_quarter, key=quarter_order)
+        ],
+        'byRank': [
+            {'rank': rank, 'count': by_rank[rank]}
+            for rank in sorted(by_rank, key=lambda rank: rank_order.get(rank, len(rank_order)), reverse=True)
+        ],
+        'bySection': [
+            {'sectionId': section_id, 'section': section_names.get(section_id, 'Unassigned'), 'count': count}
+            for section_id, count in sorted(by_section.items(), key=lambda item: -item[1])
+        ],
+        'buckets': [
+            {
+                'quarter': quarter, 'rank': rank, 'sectionId': section_id,
+                'section': section_names.get(section_id, 'Unassigned'), 'count': count,
+            }
+            for (quarter, rank, section_id), count in sorted(
+                buckets.items(), key=lambda item: (quarter_order(item[0][0]), -rank_order.get(item[0][1], 0))
+            )
+        ],
+    }
+
+
+# Minimum whole years in a rank before promotion to the next one
+DEFAULT_PROMOTION_MIN_YEARS = {
+    'DII': 2, 'DI': 3, 'CD': 3, 'ASO': 3, 'SO': 3, 'SIOII': 3, 'SIOI': 3,
+    'SSIO': 3, 'PSIO': 3, 'CSIO': 3, 'ADIS': 3, 'DDIS': 3, 'DIS': 3,
+}
+
+
+def promotion_ladder():
+    """rank -> next rank, following the order of Personnel.RANK_CHOICES"""
+    codes = [code for code, _ in Personnel.RANK_CHOICES]
+    return dict(zip(codes, codes[1:]))
+
+
+def promotion_min_years():
+    """rank -> minimum whole years in rank, settings.PROMOTION_MIN_YEARS over the defaults"""
+    return {**DEFAULT_PROMOTION_MIN_YEARS, **getattr(settings, 'PROMOTION_MIN_YEARS', {})}
+
+
+def eligible_for_promotion(on_date=None):
+    """
+    Personnel due for promotion as of `on_date`, as one query.
+
+    Time in rank runs from the latest CareerProgression.date_of_last_promotion,
+    falling back to the enlistment date. Each rank's minimum comes from
+    settings.PROMOTION_MIN_YEARS (merged over DEFAULT_PROMOTION_MIN_YEARS) and
+    becomes a single `rank = X AND in_rank_since <= cutoff` condition, so the whole
+    force is checked in one pass. Suspended and transferred personnel are left out.
+    Rows are ordered by section, then seniority in rank.
+    """
+    on_date = on_date or timezone.now().date()
+    min_years = promotion_min_years()
+
+    due = Q(pk__in=[])
+    for rank in promotion_ladder():
+        if rank in min_years:
+            due |= Q(rank=rank, in_rank_since__lte=add_years(on_date, -min_years[rank]))
+
+    latest_promotion = CareerProgression.objects.filter(
+        personnel=OuterRef('pk'), date_of_last_promotion__isnull=False
+    ).order_by('-date_of_last_promotion').values('date_of_last_promotion')[:1]
+    queryset = with_current_assignment(Personnel.objects.all()).annotate(
+        in_rank_since=Coalesce(Subquery(latest_promotion), F('date_of_enlistment')),
+    )
+    return (
+        exclude_current_status(queryset, ['SUSPENDED', 'TRANSFERRED'])
+        .filter(due)
+        .order_by(F('current_section_id').asc(nulls_last=True), 'in_rank_since', 'date_of_enlistment', 'service_number')
+        .values_list('service_number', 'rank', 'current_section_id', 'in_rank_since')
+    )
+
+
+def rebuild_promotion_eligibility(on_date=None):
+    """Recompute the promotion board table from scratch; returns the number of eligible personnel"""
+    on_date = on_date or timezone.now().date()
+    rows = eligible_for_promotion(on_date)
+    min_years, ladder = promotion_min_years(), promotion_ladder()
+    computed_at = timezone.now()
+    entries = []
+    position = 0
+    previous_section = object()
+    for service_number, rank, section_id, in_rank_since in rows.iterator(chunk_size=2000):
+        position = position + 1 if section_id == previous_section else 1
+        previous_section = section_id
+        entries.append(PromotionEligibility(
+            personnel_id=service_number,
+            section_id=section_id,
+            current_rank=rank,
+            next_rank=ladder[rank],
+            in_rank_since=in_rank_since,
+            eligible_since=add_years(in_rank_since, min_years[rank]),
+            position=position,
+            computed_at=computed_at,
+        ))
+    with transaction.atomic():
+        PromotionEligibility.objects.all().delete()
+        PromotionEligibility.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def schedule_promotion_rebuild():
+    """Queue today's promotion board rebuild unless it is already queued or done"""
+    from .jobs import enqueue
+    if getattr(settings, 'PROMOTIONS_DAILY', True):
+        return enqueue('promotions.rebuild', idempotency_key=f"promotions:{timezone.now().date()}")
+    return None
+
+
+
+def _person_intervals(service_number, enlisted, current_rank, postings, promotions, ladder_down):
+    """
+    Intervals for one person. `postings` are (date, section, designation, status) in
+    posting order; `promotions` are (date, rank) in date order.
+
+    Assignment.status is not dated: it says how the person stands in their latest
+    posting now. It is therefore only recorded for the latest posting's intervals, and
+    earlier postings get a blank status rather than one they may never have had.
+    """
+    # Rank before the first recorded promotion is the one below it on the ladder
+    if promotions:
+        initial_rank = ladder_down.get(promotions[0][1], promotions[0][1])
+    else:
+        initial_rank = current_rank
+    changes = sorted(
+        {enlisted}
+        | {max(posted, enlisted) for posted, *_ in postings}
+        | {max(promoted, enlisted) for promoted, _ in promotions}
+    )
+
+    intervals = []
+    posting_index = promotion_index = -1
+    for point_index, point in enumerate(changes):
+        while posting_index + 1 < len(postings) and max(postings[posting_index + 1][0], enlisted) <= point:
+            posting_index += 1
+        while promotion_index + 1 < len(promotions) and max(promotions[promotion_index + 1][0], enlisted) <= point:
+            promotion_index += 1
+        if posting_index >= 0:
+            _, section_id, designation_id, status = postings[posting_index]
+            if posting_index < len(postings) - 1:
+                status = ''
+        else:
+            section_id = designation_id = None
+            status = ''
+        rank = promotions[promotion_index][1] if promotion_index >= 0 else initial_rank
+        if point_index == len(changes) - 1:
+            # Personnel.rank is the maintained current rank
+            rank = current_rank
+        state = (section_id, designation_id, status, rank)
+        if intervals and intervals[-1][1] == state:
+            continue
+        intervals.append((point, state))
+
+    return [
+        ServiceInterval(
+            personnel_id=service_number,
+            valid_from=start,
+            valid_to=intervals[index + 1][0] if index + 1 < len(intervals) else None,
+            section_id=state[0], designation_id=state[1], status=state[2], rank=state[3],
+        )
+        for index, (start, state) in enumerate(intervals)
+    ]
+
+
+def rebuild_service_intervals(service_numbers=None, chunk_size=500):
+    """
+    Re-derive ServiceInterval rows from assignments and career history, for the given
+    service numbers or (None) the whole force. Work is done per chunk of personnel with
+    three reads and one bulk insert per chunk. Returns the number of rows written.
+    """
+    codes = [code for code, _ in Personnel.RANK_CHOICES]
+    ladder_down = dict(zip(codes[1:], codes))
+    if service_numbers is None:
+        service_numbers = list(Personnel.objects.order_by('pk').values_list('pk', flat=True))
+    else:
+        service_numbers = list(service_numbers)
+
+    written = 0
+    for offset in range(0, len(service_numbers), chunk_size):
+        chunk = service_numbers[offset:offset + chunk_size]
+        people = Personnel.objects.filter(pk__in=chunk).values_list('pk', 'date_of_enlistment', 'rank')
+        postings, promotions = {}, {}
+        for row in (
+            Assignment.objects.filter(personnel_id__in=chunk)
+            .order_by('personnel_id', 'date_of_posting', 'id')
+            .values_list('personnel_id', 'date_of_posting', 'section_id', 'designation_id', 'status')
+        ):
+            postings.setdefault(row[0], []).append(row[1:])
+        for row in (
+            CareerProgression.objects.filter(personnel_id__in=chunk, date_of_last_promotion__isnull=False)
+            .order_by('personnel_id', 'date_of_last_promotion', 'id')
+            .values_list('personnel_id', 'date_of_last_promotion', 'current_rank')
+        ):
+            promotions.setdefault(row[0], []).append(row[1:])
+
+        rows = []
+        for service_number, enlisted, rank in people:
+            rows.extend(_person_intervals(
+                service_number, enlisted, rank,
+                postings.get(service_number, []), promotions.get(service_number, []), ladder_down,
+            ))
+        with transaction.atomic():
+            ServiceInterval.objects.filter(personnel_id__in=chunk).delete()
+            ServiceInterval.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+    invalidate_dashboard()
+    return written
+
+
+def valid_on(on_date, prefix=''):
+    """Q for ServiceInterval rows (optionally through a relation `prefix`) valid on `on_date`"""
+    return (
+        Q(**{f'{prefix}valid_from__lte': on_date})
+        & (Q(**{f'{prefix}valid_to__gt': on_date}) | Q(**{f'{prefix}valid_to__isnull': True}))
+    )
+
+
+def personnel_as_of(queryset, on_date):
+    """
+    Restrict a Personnel queryset to people on the roll on `on_date` and annotate the
+    rank, status, section and designation they held then - one join on the indexed
+    interval table.
+    """
+    return queryset.annotate(
+        as_of=FilteredRelation('service_intervals', condition=valid_on(on_date, 'service_intervals__')),
+    ).filter(as_of__isnull=False).annotate(
+        as_of_rank=F('as_of__rank'),
+        as_of_status=F('as_of__status'),
+        as_of_section_id=F('as_of__section_id'),
+        as_of_section=F('as_of__section__name'),
+        as_of_designation=F('as_of__designation__name'),
+    )
+
+
+def org_tree(on_date=None, include_members=False):
+    """
+    Departments -> sections -> designations with the strength of each section on
+    `on_date` (today by default). Strength comes from one grouped query over
+    ServiceInterval; members, when requested, from one more.
+
+    People whose latest posting is TRANSFERRED are left out. Status history is not
+    kept, so for a past date inside someone's latest posting this uses today's status.
+    """
+    on_date = on_date or timezone.now().date()
+    current = ServiceInterval.objects.filter(valid_on(on_date)).exclude(status='TRANSFERRED')
+    strength = dict(
+        current.values('section_id').annotate(count=Count('id')).order_by().values_list('section_id', 'count')
+    )
+    members = {}
+    if include_members:
+        for row in current.filter(section__isnull=False).select_related('personnel', 'designation').order_by(
+            'section_id', 'personnel__last_name'
+        ):
+            members.setdefault(row.section_id, []).append({
+                'id': row.personnel_id,
+                'name': f"{row.personnel.first_name} {row.personnel.last_name}",
+                'rank': row.rank,
+                'status': row.status,
+                'designation': row.designation.name if row.designation else None,
+            })
+
+    departments = {}
+    sections = Section.objects.select_related('department').prefetch_related('designations')
+    for section in sections:
+        department_key = section.department_id
+        department = departments.setdefault(department_key, {
+            'id': department_key,
+            'name': section.department.name if section.department else 'Unassigned',
+            'strength': 0,
+            'sections': [],
+        })
+        entry = {
+            'id': section.id,
+            'name': section.name,
+            'principalOfficer': section.principal_officer_id,
+            'strength': strength.get(section.id, 0),
+            'designations': [{'id': d.id, 'name': d.name} for d in section.designations.all()],
+        }
+        if include_members:
+            entry['members'] = members.get(section.id, [])
+        department['strength'] += entry['strength']
+        department['sections'].append(entry)
+
+    return {
+        'asOf': on_date,
+        'unassigned': strength.get(None, 0),
+        'departments': list(departments.values()),
+    }
+
+
+DASHBOARD_CACHE_KEY = 'dashboard:summary'
+
+
+def invalidate_dashboard():
+    cache.delete(DASHBOARD_CACHE_KEY)
+
+
+def _compute_dashboard(today):
+    from .rostering import get_roster_rules
+
+    # Headcount by status and section strength: one grouped query over today's intervals
+    headcount, strength = {}, {}
+    current = (
+        ServiceInterval.objects.filter(valid_on(today))
+        .values('status', 'section_id').annotate(count=Count('id')).order_by()
+    )
+    for row in current:
+        status = row['status'] or 'UNASSIGNED'
+        headcount[status] = headcount.get(status, 0) + row['count']
+        if row['status'] != 'TRANSFERRED':
+            strength[row['section_id']] = strength.get(row['section_id'], 0) + row['count']
+
+    leaves = Leave.objects.aggregate(
+        pending=Count('id', filter=Q(status='PENDING')),
+        approved=Count('id', filter=Q(status='APPROVED')),
+        on_leave_today=Count(
+            'personnel_id', distinct=True,
+            filter=Q(status='APPROVED', start_date__lte=today, end_date__gte=today),
+        ),
+    )
+
+    required = get_roster_rules()['slots_per_shift']
+    assigned = dict(
+        GuardDutyRoster.objects.filter(date=today)
+        .values('shift_type').annotate(count=Count('id')).order_by()
+        .values_list('shift_type', 'count')
+    )
+    shifts = [
+        {'shift': shift, 'required': slots, 'assigned': assigned.get(shift, 0)}
+        for shift, slots in required.items()
+    ]
+    total_required = sum(required.values())
+    covered = sum(min(entry['assigned'], entry['required']) for entry in shifts)
+
+    sections = [
+        {'id': pk, 'name': name, 'department': department, 'strength': strength.get(pk, 0)}
+        for pk, name, department in Section.objects.order_by('name').values_list('pk', 'name', 'department__name')
+    ]
+
+    return {
+        'date': today,
+        'headcount': {
+            'total': sum(headcount.values()),
+            'byStatus': headcount,
+        },
+        'leaves': {
+            'pending': leaves['pending'],
+            'approved': leaves['approved'],
+            'onLeaveToday': leaves['on_leave_today'],
+        },
+        'guardDuty': {
+            'shifts': shifts,
+            'coverage': round(covered * 100 / total_required, 1) if total_required else None,
+        },
+        'sectionStrength': sections,
+        'unassigned': strength.get(None, 0),
+        'generatedAt': timezone.now(),
+    }
+
+
+def dashboard_summary():
+    """
+    Figures for the dashboard: headcount by status, leave counts, today's guard
+    coverage and section strength. Four grouped queries, cached for
+    DASHBOARD_CACHE_TIMEOUT seconds and dropped whenever the underlying rows change.
+    """
+    today = timezone.now().date()
+    summary = cache.get(DASHBOARD_CACHE_KEY)
+    if summary is None or summary['date'] != today:
+        summary = _compute_dashboard(today)
+        cache.set(DASHBOARD_CACHE_KEY, summary, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60))
+    return summary
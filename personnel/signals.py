@@ -0,0 +1,182 @@
+"""
+Model signal handlers that keep cached, derived data in step with the database.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import (
+    Personnel, Assignment, CareerProgression, Qualification, Leave,
+    GuardDutyRoster, Section, Designation, Department, CommandChain
+)
+from .services import (
+    invalidate_dossier, invalidate_all_dossiers, invalidate_dashboard, rebuild_service_intervals
+)
+from .rostering import repair_roster
+from . import audit, autocomplete, command_chain, leave_ledger, leave_usage, replication
+
+# Related model -> dossier part it feeds
+DOSSIER_PARTS = {
+    Assignment: 'assignments',
+    CareerProgression: 'careerHistory',
+    Qualification: 'qualifications',
+    Leave: 'leaves',
+    GuardDutyRoster: 'guardDuties',
+}
+
+
+@receiver([post_save, post_delete], sender=Personnel)
+def personnel_changed(sender, instance, **kwargs):
+    invalidate_dossier(instance.service_number)
+
+
+@receiver([post_save, post_delete], sender=Assignment)
+@receiver([post_save, post_delete], sender=CareerProgression)
+@receiver([post_save, post_delete], sender=Qualification)
+@receiver([post_save, post_delete], sender=Leave)
+@receiver([post_save, post_delete], sender=GuardDutyRoster)
+def dossier_relation_changed(sender, instance, **kwargs):
+    invalidate_dossier(instance.personnel_id, [DOSSIER_PARTS[sender]])
+
+
+@receiver([post_save, post_delete], sender=Section)
+@receiver([post_save, post_delete], sender=Designation)
+@receiver([post_save, post_delete], sender=Department)
+def org_structure_changed(sender, instance, **kwargs):
+    # Section/department names are denormalised into every cached assignment list
+    invalidate_all_dossiers()
+
+
+@receiver(post_save, sender=Assignment)
+def assignment_status_changed(sender, instance, raw=False, **kwargs):
+    """Suspension or transfer takes the person off all their future guard duties"""
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_values', {}).get('status')
+    if instance.status in ('SUSPENDED', 'TRANSFERRED') and instance.status != previous:
+        repair_roster(instance.personnel_id, timezone.now().date(), None, reason=instance.status)
+
+
+@receiver(post_save, sender=Personnel)
+@receiver([post_save, post_delete], sender=Assignment)
+@receiver([post_save, post_delete], sender=CareerProgression)
+def service_history_changed(sender, instance, raw=False, **kwargs):
+    """Re-derive the person's ServiceInterval rows (a handful) for as-of queries"""
+    if raw:
+        return
+    service_number = instance.service_number if sender is Personnel else instance.personnel_id
+    # After commit, so a cascading Personnel delete is complete before we look again
+    transaction.on_commit(lambda: rebuild_service_intervals([service_number]))
+
+
+@receiver(post_delete, sender=Personnel)
+@receiver([post_save, post_delete], sender=Leave)
+@receiver([post_save, post_delete], sender=GuardDutyRoster)
+@receiver([post_save, post_delete], sender=Section)
+def dashboard_changed(sender, instance, raw=False, **kwargs):
+    """Drop the cached dashboard figures (posting changes do so via rebuild_service_intervals)"""
+    if not raw:
+        transaction.on_commit(invalidate_dashboard)
+
+
+@receiver([post_save, post_delete], sender=Assignment)
+def posting_changed(sender, instance, raw=False, **kwargs):
+    """A posting can change who the person reports to"""
+    if raw:
+        return
+    service_number = instance.personnel_id
+    transaction.on_commit(lambda: command_chain.refresh_chain([service_number]))
+
+
+@receiver(post_save, sender=Section)
+def section_command_changed(sender, instance, created, raw=False, **kwargs):
+    """A new principal officer or department moves the section's members in the chain"""
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    previous_officer = loaded.get('principal_officer_id')
+    if created or previous_officer != instance.principal_officer_id or loaded.get('department_id') != instance.department_id:
+        section_id = instance.pk
+        affected = {previous_officer} - {None}
+        transaction.on_commit(
+            lambda: command_chain.refresh_chain(command_chain.section_people([section_id]) | affected)
+        )
+    instance.mark_saved()
+
+
+@receiver(post_save, sender=Department)
+def department_head_changed(sender, instance, created, raw=False, **kwargs):
+    """A new head moves the department's principal officers (and anyone without one) in the chain"""
+    if raw:
+        return
+    previous_head = getattr(instance, '_loaded_values', {}).get('head_id')
+    if created or previous_head != instance.head_id:
+        department_id = instance.pk
+        affected = {previous_head, instance.head_id} - {None}
+        transaction.on_commit(lambda: command_chain.refresh_chain(
+            command_chain.section_people(Section.objects.filter(department_id=department_id).values_list('pk', flat=True))
+            | affected
+        ))
+    instance.mark_saved()
+
+
+@receiver(pre_delete, sender=Personnel)
+def superior_deleted(sender, instance, **kwargs):
+    """Re-attach the direct reports of someone being deleted (their chain rows cascade away)"""
+    reports = set(
+        CommandChain.objects.filter(superior_id=instance.pk, depth=1).values_list('subordinate_id', flat=True)
+    )
+    if reports:
+        transaction.on_commit(lambda: command_chain.refresh_chain(reports))
+
+
+@receiver(pre_delete, sender=Leave)
+def leave_deleted(sender, instance, **kwargs):
+    """
+    Take a leave out of the balance ledger and the usage rollup. A receiver rather
+    than Leave.delete(), so QuerySet.delete() and cascades from Personnel count too;
+    pre_delete, so the person's postings are still there to attribute it.
+    """
+    previous = getattr(instance, '_loaded_values', None)
+    leave_ledger.remove_leave(instance, previous)
+    leave_usage.remove_leave(instance, previous)
+
+
+AUTOCOMPLETE_FIELDS = ('first_name', 'last_name', 'rank')
+
+
+@receiver(post_save, sender=Personnel)
+def personnel_autocomplete_changed(sender, instance, created, raw=False, **kwargs):
+    """Keep the in-memory picker index current (only names and rank are indexed)"""
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    if created or any(loaded.get(name) != getattr(instance, name) for name in AUTOCOMPLETE_FIELDS):
+        service_number = instance.service_number
+        transaction.on_commit(lambda: autocomplete.personnel_changed([service_number]))
+
+
+@receiver(post_delete, sender=Personnel)
+def personnel_autocomplete_deleted(sender, instance, **kwargs):
+    service_number = instance.service_number
+    transaction.on_commit(lambda: autocomplete.personnel_changed([service_number]))
+
+
+# Registered last so the handlers above still see the pre-save snapshot
+@receiver(post_save, sender=Personnel)
+@receiver(post_save, sender=Assignment)
+@receiver(post_save, sender=Leave)
+def record_change(sender, instance, created, raw=False, **kwargs):
+    """Audit and replicate the saved fields, then take a new snapshot"""
+    if not raw:
+        audit.capture_save(instance, created)
+        replication.capture_save(instance, created)
+    instance.mark_saved()
+
+
+@receiver(post_delete, sender=Personnel)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_delete, sender=Leave)
+def record_delete(sender, instance, **kwargs):
+    audit.capture_delete(instance)
+    replication.capture_delete(instance)
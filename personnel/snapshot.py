@@ -0,0 +1,251 @@
+"""
+Compact offline snapshots of the nominal roll, org structure and current rosters.
+
+A snapshot is one gzip stream of JSON lines:
+
+    {"format": "pms-snapshot", "version": 1, "created": ..., "migration": ..., "tables": [...]}
+    {"table": "personnel.personnel", "columns": [...], "count": N, "interned": [...]}
+    <one line per column>
+    ... next table ...
+
+Data is stored column by column, which compresses far better than rows. Dates are
+day ordinals. Repetitive string columns (rank, state, LGA, section names, statuses)
+are interned as {"values": [distinct strings], "codes": [index per row]}. Export
+streams each table with .iterator(). Import inserts everything with executemany
+in one transaction, so a snapshot also works as a fast test fixture via load_snapshot().
+"""
+import datetime
+import gzip
+import json
+
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.utils import timezone
+
+from .models import (
+    Department, Section, Designation, Personnel, Assignment, CareerProgression,
+    Qualification, GuardDutyRoster, ServiceInterval
+)
+from . import autocomplete
+from .replication import site_code
+
+SNAPSHOT_FORMAT = 'pms-snapshot'
+SNAPSHOT_VERSION = 1
+
+# In dependency order (foreign keys are checked at commit, so Section -> principal officer is fine)
+SNAPSHOT_MODELS = [
+    Department, Section, Designation, Personnel, Assignment, CareerProgression,
+    Qualification, GuardDutyRoster, ServiceInterval,
+]
+
+# Intern a string column when it has at most this share of distinct values
+INTERN_MAX_DISTINCT_RATIO = 0.5
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _columns(model):
+    return [field for field in model._meta.concrete_fields]
+
+
+def _encode(field, value):
+    if value is None:
+        return None
+    if isinstance(field, models.DateTimeField):
+        return value.isoformat()
+    if isinstance(field, models.DateField):
+        return value.toordinal()
+    return value
+
+
+def _db_value(field, value):
+    """Turn a snapshot value back into a query parameter for the column"""
+    if value is None:
+        return None
+    if isinstance(field, models.DateTimeField):
+        return field.get_db_prep_save(datetime.datetime.fromisoformat(value), connection)
+    if isinstance(field, models.DateField):
+        return datetime.date.fromordinal(value).isoformat()
+    return value
+
+
+def _intern(values):
+    """Return the interned form of a string column, or None if interning would not pay off"""
+    distinct = {}
+    codes = []
+    for value in values:
+        if value is not None and not isinstance(value, str):
+            return None
+        codes.append(distinct.setdefault(value, len(distinct)))
+    if len(distinct) > max(1, len(values) * INTERN_MAX_DISTINCT_RATIO):
+        return None
+    return {'values': list(distinct), 'codes': codes}
+
+
+def _queryset(model, roster_days):
+    queryset = model._default_manager.order_by('pk')
+    if model is GuardDutyRoster and roster_days is not None:
+        since = timezone.now().date() - datetime.timedelta(days=roster_days)
+        queryset = queryset.filter(date__gte=since)
+    return queryset
+
+
+def _latest_migration():
+    return (
+        MigrationRecorder.Migration.objects.filter(app='personnel')
+        .order_by('-applied', '-id').values_list('name', flat=True).first()
+    )
+
+
+def export_snapshot(path, roster_days=31):
+    """
+    Write a snapshot to `path`. Rosters are limited to duties from the last
+    `roster_days` days onward (None exports all). Returns row counts per table.
+    """
+    counts = {}
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=9) as out:
+        header = {
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'created': timezone.now().isoformat(),
+            'migration': _latest_migration(),
+            'site': site_code(),
+            'tables': [model._meta.label_lower for model in SNAPSHOT_MODELS],
+        }
+        out.write(json.dumps(header) + '\n')
+
+        for model in SNAPSHOT_MODELS:
+            fields = _columns(model)
+            columns = [[] for _ in fields]
+            rows = _queryset(model, roster_days).values_list(*[field.attname for field in fields])
+            for row in rows.iterator(chunk_size=2000):
+                for column, value in zip(columns, row):
+                    column.append(value)
+            for index, field in enumerate(fields):
+                if isinstance(field, models.DateField):
+                    columns[index] = [_encode(field, value) for value in columns[index]]
+
+            encoded, interned = [], []
+            for field, column in zip(fields, columns):
+                packed = _intern(column) if isinstance(field, models.CharField) and not field.unique else None
+                if packed is not None:
+                    interned.append(field.attname)
+                encoded.append(packed if packed is not None else column)
+
+            label = model._meta.label_lower
+            counts[label] = len(columns[0]) if columns else 0
+            out.write(json.dumps({
+                'table': label,
+                'columns': [field.attname for field in fields],
+                'count': counts[label],
+                'interned': interned,
+            }) + '\n')
+            for column in encoded:
+                out.write(json.dumps(column, separators=(',', ':')) + '\n')
+    return counts
+
+
+def read_header(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as stream:
+        header = json.loads(stream.readline())
+    if header.get('format') != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"{path} is not a personnel snapshot")
+    if header.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(
+            f"Snapshot version {header.get('version')} is not supported (expected {SNAPSHOT_VERSION})"
+        )
+    return header
+
+
+def load_snapshot(path, replace=False, batch_size=2000):
+    """
+    Load a snapshot into the database in one transaction. The snapshot must come
+    from the same migration as this database. The snapshot tables must be empty
+    unless `replace` is set, in which case they (and rows referencing them) are
+    emptied first.
+    Returns row counts per table.
+    """
+    from .services import invalidate_all_dossiers, invalidate_dashboard
+    from .leave_usage import refresh_leave_usage
+    from .command_chain import rebuild_chain
+
+    header = read_header(path)
+    local = _latest_migration()
+    if header.get('migration') != local:
+        # Columns differ between schema versions; fail before touching any table
+        raise SnapshotError(
+            f"Snapshot was taken at migration {header.get('migration') or 'unknown'} but this database "
+            f"is at {local or 'none'}; migrate both sites to the same version first"
+        )
+    by_label = {model._meta.label_lower: model for model in SNAPSHOT_MODELS}
+    counts = {}
+    with transaction.atomic(), gzip.open(path, 'rt', encoding='utf-8') as stream:
+        stream.readline()
+        if replace:
+            # Also clears rows that reference these tables (leaves, roster changes, ...)
+            tables = [model._meta.db_table for model in SNAPSHOT_MODELS]
+            connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables, allow_cascade=True))
+        else:
+            populated = [model._meta.label_lower for model in SNAPSHOT_MODELS if model._default_manager.exists()]
+            if populated:
+                raise SnapshotError(f"Tables already contain data: {', '.join(populated)} (use --replace)")
+
+        for label in header['tables']:
+            table = json.loads(stream.readline())
+            model = by_label.get(table['table'])
+            if model is None:
+                raise SnapshotError(f"Unknown table in snapshot: {table['table']}")
+            fields = {field.attname: field for field in _columns(model)}
+            missing = [name for name in table['columns'] if name not in fields]
+            if missing:
+                raise SnapshotError(f"{label}: columns not in this schema: {', '.join(missing)}")
+
+            columns = []
+            for name in table['columns']:
+                column = json.loads(stream.readline())
+                if name in table['interned']:
+                    values = column['values']
+                    column = [values[code] for code in column['codes']]
+                field = fields[name]
+                if isinstance(field, models.DateField):
+                    column = [_db_value(field, value) for value in column]
+                columns.append(column)
+
+            if 'origin' in table['columns'] and header.get('site') and header['site'] != site_code():
+                # Rows keep the exporting site's replication key (see personnel.replication)
+                names = table['columns']
+                ids, origins = columns[names.index('id')], columns[names.index('origin')]
+                columns[names.index('origin')] = [
+                    origin or f"{header['site']}:{pk}" for pk, origin in zip(ids, origins)
+                ]
+
+            # Plain executemany: model instances and the ORM insert compiler would
+            # cost more than the database work for large tables
+            quote = connection.ops.quote_name
+            sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+                quote(model._meta.db_table),
+                ', '.join(quote(fields[name].column) for name in table['columns']),
+                ', '.join(['%s'] * len(table['columns'])),
+            )
+            rows = list(zip(*columns))
+            with connection.cursor() as cursor:
+                for start in range(0, len(rows), batch_size):
+                    cursor.executemany(sql, rows[start:start + batch_size])
+            counts[label] = table['count']
+
+        # Explicit primary keys were inserted; move sequences past them (Postgres)
+        for sql in connection.ops.sequence_reset_sql(no_style(), SNAPSHOT_MODELS):
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+
+    if replace:
+        # Flushing the snapshot tables cascades to leave history
+        refresh_leave_usage()
+    rebuild_chain()
+    invalidate_all_dossiers()
+    invalidate_dashboard()
+    autocomplete.rebuild_everywhere()
+    return counts
@@ -0,0 +1,953 @@
+import base64
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import audit, autocomplete
+from .api_views import LeaveViewSet
+from .archive import archive_history
+from .attachments import THUMBNAIL_JOB, file_path, storage_root
+from .command_chain import chain_of, rebuild_chain
+from .db_router import ReplicaRouter, query_load, reset_query_load, use_replicas, wrote_to_primary
+from .jobs import JOB_HANDLERS, claim_next_job, enqueue, run_job
+from .leave_ledger import rebuild_leave_balances, recount_leave_days, working_days
+from .models import (
+    ArchivedGuardDuty, ArchivedLeave, Assignment, Attachment, AuditEntry, CommandChain, Department, GuardDutyRoster,
+    Holiday, Job, Leave, LeaveBalance, LeaveUsage, Personnel, RosterChange, Section, ServiceInterval, StoredFile,
+    VersionConflictError,
+)
+from .query_detector import RepeatedQueryError, detect_repeated_queries
+from .replication import apply_changes
+from .rostering import repair_roster, solve_roster
+from .services import (
+    compute_roster_fairness, dashboard_summary, get_personnel_dossier, personnel_as_of, rebuild_service_intervals,
+    retirement_forecast, with_last_duty,
+)
+from .snapshot import SnapshotError, export_snapshot, load_snapshot
+from .warmup import WARM_UP_STEPS, warm_up
+
+
+class LeaveTestCase(TestCase):
+    def setUp(self):
+        self.make_leave()
+        # Read from the primary even with SQLITE_REPLICA set: a replica connection
+        # cannot see the test's uncommitted rows
+        self.client.cookies['pms_primary'] = '1'
+
+    def make_leave(self):
+        self.person = Personnel.objects.create(
+            service_number='NA/11/0001', first_name='Ada', last_name='Obi', dob=date(1990, 1, 1),
+            state_of_origin='Lagos', lga_of_origin='Ikeja', date_of_enlistment=date(2012, 1, 1), rank='CPL',
+        )
+        self.leave = Leave.objects.create(
+            personnel=self.person, leave_type='ANNUAL', start_date=date(2030, 3, 4),
+            end_date=date(2030, 3, 8), reason='Rest',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+
+    def url(self):
+        return f'/api/leaves/{self.leave.pk}/'
+
+
+@override_settings(AUDIT_ASYNC=False)
+class VersioningTests(LeaveTestCase):
+    def test_second_writer_gets_a_conflict(self):
+        first = Leave.objects.get(pk=self.leave.pk)
+        second = Leave.objects.get(pk=self.leave.pk)
+        first.reason = 'Family'
+        first.save()
+        second.reason = 'Travel'
+        with self.assertRaises(VersionConflictError):
+            second.save()
+        self.leave.refresh_from_db()
+        self.assertEqual((self.leave.reason, self.leave.version), ('Family', 2))
+
+    def test_save_without_changes_is_skipped(self):
+        leave = Leave.objects.get(pk=self.leave.pk)
+        with CaptureQueriesContext(connection) as queries:
+            leave.save()
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+        leave.refresh_from_db()
+        self.assertEqual(leave.version, 1)
+
+    def test_stale_if_match_on_patch(self):
+        response = self.client.patch(self.url(), {'reason': 'Travel'}, format='json', HTTP_IF_MATCH='"0"')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.data['current']['version'], 1)
+        response = self.client.patch(self.url(), {'reason': 'Travel'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"2"')
+
+    def test_stale_if_match_on_delete(self):
+        response = self.client.delete(self.url(), HTTP_IF_MATCH='"0"')
+        self.assertEqual(response.status_code, 412)
+        self.assertTrue(Leave.objects.filter(pk=self.leave.pk).exists())
+        response = self.client.delete(self.url(), HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Leave.objects.filter(pk=self.leave.pk).exists())
+
+
+@override_settings(AUDIT_ASYNC=False)
+class AuditTests(LeaveTestCase):
+    def edit_leave(self, reason):
+        leave = Leave.objects.get(pk=self.leave.pk)
+        leave.reason = reason
+        with self.captureOnCommitCallbacks(execute=True):
+            leave.save()
+
+    def test_update_records_the_changed_fields(self):
+        AuditEntry.objects.all().delete()
+        self.edit_leave('Travel')
+        entry = AuditEntry.objects.get()
+        self.assertEqual(
+            (entry.model, entry.object_pk, entry.action), ('personnel.leave', str(self.leave.pk), 'U')
+        )
+        # The version bump is bookkeeping, not a change
+        self.assertEqual(entry.changes, {'reason': ['Rest', 'Travel']})
+
+    @override_settings(AUDIT_ASYNC=True)
+    def test_async_entries_wait_for_the_flush(self):
+        AuditEntry.objects.all().delete()
+        with mock.patch.object(audit, '_ensure_flusher'):
+            self.edit_leave('Travel')
+            self.assertFalse(AuditEntry.objects.exists())
+            self.assertEqual(audit.flush(), 1)
+        self.assertEqual(AuditEntry.objects.get().changes, {'reason': ['Rest', 'Travel']})
+
+    def test_filters_by_object_user_and_period(self):
+        self.edit_leave('Family')  # no acting user
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.url(), {'reason': 'Travel'}, format='json')
+        admin = User.objects.get(username='admin')
+        params = {'model': 'leave', 'object': self.leave.pk}
+        self.assertEqual(
+            [entry['userId'] for entry in self.client.get('/api/audit/', params).data['results']], [admin.pk, None]
+        )
+        results = self.client.get('/api/audit/', {**params, 'user': admin.pk}).data['results']
+        self.assertEqual([(entry['action'], entry['userId']) for entry in results], [('U', admin.pk)])
+        self.assertEqual(self.client.get('/api/audit/', {**params, 'from': '2999-01-01'}).data['results'], [])
+
+    def test_non_numeric_user_filter_is_a_bad_request(self):
+        response = self.client.get('/api/audit/', {'user': 'admin'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PromotionBoardTests(LeaveTestCase):
+    def test_non_numeric_section_is_a_bad_request(self):
+        self.assertEqual(self.client.get('/api/promotions/', {'section': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/promotions/', {'section': '1'}).status_code, 200)
+
+
+@override_settings(AUDIT_ASYNC=False)
+class BatchTests(LeaveTestCase):
+    def test_crashing_call_fails_on_its_own(self):
+        def crash(view, request, *args, **kwargs):
+            Leave.objects.filter(pk=self.leave.pk).update(reason='Half-written')
+            raise RuntimeError('boom')
+
+        requests = [
+            {'method': 'PATCH', 'url': self.url(), 'body': {'reason': 'Travel'}},
+            {'method': 'DELETE', 'url': self.url()},
+            {'method': 'GET', 'url': self.url()},
+        ]
+        with mock.patch.object(LeaveViewSet, 'destroy', crash), self.assertLogs('personnel.batch', 'ERROR'):
+            response = self.client.post('/api/batch/', requests, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data], [200, 500, 200])
+        self.assertEqual(response.data[2]['body']['reason'], 'Travel')
+
+
+@override_settings(AUDIT_ASYNC=False)
+class DossierTests(LeaveTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def dossier(self):
+        return get_personnel_dossier(self.person.service_number)
+
+    def test_saves_invalidate_the_cached_dossier(self):
+        self.assertEqual(self.dossier()['personnel']['firstName'], 'Ada')
+        with self.assertNumQueries(0):
+            self.dossier()
+
+        self.person.first_name = 'Adaeze'
+        self.person.save()
+        leave = Leave.objects.get(pk=self.leave.pk)
+        leave.reason = 'Travel'
+        leave.save()
+        section = Section.objects.create(name='Guards', department=Department.objects.create(name='Operations'))
+        Assignment.objects.create(personnel=self.person, section=section, disposition='General Duty')
+
+        dossier = self.dossier()
+        self.assertEqual(dossier['personnel']['firstName'], 'Adaeze')
+        self.assertEqual([leave['reason'] for leave in dossier['leaves']], ['Travel'])
+        self.assertEqual([posting['sectionName'] for posting in dossier['assignments']], ['Guards'])
+
+
+@override_settings(AUDIT_ASYNC=False, AUTOCOMPLETE_VERSION_CHECK_SECONDS=0)
+class AutocompleteTests(LeaveTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # The module index outlives the test database
+        autocomplete.rebuild_everywhere()
+        self.addCleanup(autocomplete.rebuild_everywhere)
+
+    def found(self, index, query):
+        return [person['serviceNumber'] for person in index.search(query)]
+
+    def test_other_processes_catch_up_after_the_version_bumps(self):
+        # A second index stands in for another process, which no signal reaches
+        other = autocomplete.PrefixIndex()
+        self.assertEqual(self.found(other, 'ada'), [self.person.pk])
+        version = autocomplete.current_version()
+
+        self.person.first_name = 'Adaeze'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.person.save()
+            Personnel.objects.create(
+                service_number='NA/11/0002', first_name='Bola', last_name='Obiora', dob=date(1990, 1, 1),
+                state_of_origin='Lagos', lga_of_origin='Ikeja', date_of_enlistment=date(2012, 1, 1), rank='DII',
+            )
+        self.assertEqual(autocomplete.current_version(), version + 2)
+
+        self.assertEqual(self.found(other, 'adae'), [self.person.pk])
+        self.assertEqual(self.found(other, 'obi'), [self.person.pk, 'NA/11/0002'])
+        self.assertEqual(self.found(other, 'obi bo'), ['NA/11/0002'])
+        response = self.client.get('/api/personnel/autocomplete/', {'q': 'bola'})
+        self.assertEqual([person['serviceNumber'] for person in response.data], ['NA/11/0002'])
+
+
+@override_settings(AUDIT_ASYNC=False)
+class DashboardTests(LeaveTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_changes_invalidate_the_cached_summary(self):
+        summary = dashboard_summary()
+        self.assertEqual((summary['leaves']['pending'], summary['headcount']['total']), (1, 0))
+        with self.assertNumQueries(0):
+            dashboard_summary()
+
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            Leave.objects.create(
+                personnel=self.person, leave_type='CASUAL', start_date=date(2030, 5, 6),
+                end_date=date(2030, 5, 7), reason='Errand',
+            )
+        self.assertEqual(dashboard_summary()['leaves']['pending'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GuardDutyRoster.objects.create(personnel=self.person, date=today, shift_type='DAY')
+        shifts = {entry['shift']: entry['assigned'] for entry in dashboard_summary()['guardDuty']['shifts']}
+        self.assertEqual(shifts['DAY'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            section = Section.objects.create(name='Guards', department=Department.objects.create(name='Operations'))
+        self.assertEqual([entry['name'] for entry in dashboard_summary()['sectionStrength']], ['Guards'])
+
+        # Postings reach the dashboard through the rebuilt service intervals
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.create(
+                personnel=self.person, section=section, disposition='General Duty', date_of_posting=today
+            )
+        response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['headcount']['byStatus'], {'ACTIVE': 1})
+        self.assertEqual([entry['strength'] for entry in response.data['sectionStrength']], [1])
+
+
+@override_settings(AUDIT_ASYNC=False)
+class BulkUpsertTests(LeaveTestCase):
+    def record(self, **fields):
+        return {
+            'serviceNumber': self.person.service_number, 'firstName': 'Ada', 'lastName': 'Obi',
+            'rank': 'DII', 'dateOfBirth': '1990-01-01', 'stateOfOrigin': 'Lagos', 'lgaOfOrigin': 'Ikeja',
+            'dateOfEnlistment': '2012-01-01', **fields,
+        }
+
+    def test_duplicate_does_not_change_the_fields_written(self):
+        Personnel.objects.filter(pk=self.person.pk).update(marital_status='MARRIED')
+        records = [self.record(gender='F', rank='DI'), self.record(firstName='Adaeze')]
+        response = self.client.post('/api/personnel/bulk/', records, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['updated'], [self.person.service_number])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.person.refresh_from_db()
+        self.assertEqual(
+            (self.person.first_name, self.person.gender, self.person.rank, self.person.marital_status),
+            ('Ada', 'F', 'DI', 'MARRIED'),
+        )
+
+    def test_update_audits_old_values(self):
+        Personnel.objects.filter(pk=self.person.pk).update(rank='DII')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/personnel/bulk/', [self.record(lastName='Obi-Ade')], format='json')
+        self.assertEqual(response.data['updated'], [self.person.service_number])
+        entry = AuditEntry.objects.filter(model='personnel.personnel', action='U').get()
+        self.assertEqual(entry.changes, {'last_name': ['Obi', 'Obi-Ade']})
+        self.assertEqual(Personnel.objects.get(pk=self.person.pk).version, 2)
+
+    def test_unchanged_record_is_not_written(self):
+        Personnel.objects.filter(pk=self.person.pk).update(rank='DII')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/personnel/bulk/', [self.record()], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            (response.data['updated'], response.data['unchanged']), ([], [self.person.service_number])
+        )
+        self.assertEqual(Personnel.objects.get(pk=self.person.pk).version, 1)
+        self.assertFalse(AuditEntry.objects.filter(model='personnel.personnel', action='U').exists())
+
+
+
+@override_settings(AUDIT_ASYNC=False, ATTACHMENT_THUMBNAIL_SIZES=[64])
+class AttachmentTests(LeaveTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def png(self, name='photo.png', content_type='image/png'):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (300, 200), 'navy').save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type=content_type)
+
+    def upload(self, upload, kind='DOCUMENT'):
+        url = f'/api/personnel/{self.person.pk}/attachments/'
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, {'file': upload, 'kind': kind}, format='multipart')
+
+    def test_duplicate_upload_reuses_the_stored_file(self):
+        first = self.upload(self.png(), kind='PHOTO')
+        second = self.upload(self.png('copy.png'))
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        self.assertEqual(first.data['sha256'], second.data['sha256'])
+        self.assertEqual(Attachment.objects.count(), 2)
+        stored = StoredFile.objects.get()
+        self.assertEqual((stored.content_type, stored.size), ('image/png', self.png().size))
+        self.assertTrue(os.path.exists(file_path(stored.sha256)))
+        # One thumbnail job however often the image is uploaded
+        self.assertEqual(
+            list(Job.objects.values_list('kind', 'params')), [(THUMBNAIL_JOB, {'sha256': stored.sha256})]
+        )
+
+    def test_content_is_sniffed_not_trusted(self):
+        text = SimpleUploadedFile('photo.png', b'not an image at all', content_type='image/png')
+        pdf = SimpleUploadedFile('scan.pdf', b'%PDF-1.4 minimal', content_type='application/pdf')
+        self.assertEqual(self.upload(text).status_code, 400)
+        self.assertEqual(self.upload(pdf, kind='PHOTO').status_code, 400)
+        self.assertFalse(StoredFile.objects.exists())
+        # The rejected uploads leave nothing behind
+        self.assertEqual(os.listdir(storage_root()), [])
+
+        response = self.upload(SimpleUploadedFile('scan.pdf', b'%PDF-1.4 minimal', content_type='application/pdf'))
+        self.assertEqual((response.status_code, response.data['contentType']), (201, 'application/pdf'))
+        self.assertFalse(Job.objects.exists())
+
+    def test_files_are_served_immutable_with_the_hash_as_etag(self):
+        sha256 = self.upload(self.png()).data['sha256']
+        response = self.client.get(f'/api/files/{sha256}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.png().read())
+        response.close()
+        self.assertEqual(response['ETag'], f'"{sha256}"')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        response = self.client.get(f'/api/files/{sha256}/', HTTP_IF_NONE_MATCH=f'"{sha256}"')
+        self.assertEqual(response.status_code, 304)
+
+        thumbnail = f'/api/files/{sha256}/thumbnail/64/'
+        self.assertEqual(self.client.get(thumbnail).status_code, 404)
+        self.assertTrue(run_job(claim_next_job('test:1')))
+        response = self.client.get(thumbnail)
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'image/jpeg'))
+        response.close()
+        self.assertEqual(response['ETag'], f'"{sha256}.64"')
+
+
+@override_settings(AUDIT_ASYNC=False)
+class ReplicationTests(LeaveTestCase):
+    def write_changes(self, entries):
+        handle, path = tempfile.mkstemp(suffix='.jsonl.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with gzip.open(path, 'wt', encoding='utf-8') as out:
+            out.write(json.dumps({'format': 'pms-changes', 'version': 1, 'site': 'FOB1', 'since': 0}) + '\n')
+            for entry in entries:
+                out.write(json.dumps(entry) + '\n')
+        return path
+
+    def test_only_applied_changes_are_audited(self):
+        key = self.person.service_number
+        path = self.write_changes([
+            [1, 'personnel.personnel', key, 'U', {'first_name': 'Old'}, '2000-01-01T00:00:00+00:00'],
+            [2, 'personnel.personnel', key, 'U', {'last_name': 'New'}, '2100-01-01T00:00:00+00:00'],
+        ])
+        AuditEntry.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = apply_changes(path)
+        self.assertEqual((stats['applied'], stats['stale']), (1, 1))
+        self.person.refresh_from_db()
+        self.assertEqual((self.person.first_name, self.person.last_name), ('Ada', 'New'))
+        self.assertEqual(
+            list(AuditEntry.objects.filter(object_pk=key).values_list('changes', flat=True)),
+            [{'last_name': [None, 'New']}],
+        )
+
+
+@override_settings(AUDIT_ASYNC=False)
+class RosterSolverTests(LeaveTestCase):
+    def test_duties_of_people_outside_the_pool_fill_their_slots(self):
+        suspended = Personnel.objects.create(
+            service_number='NA/11/0002', first_name='Bola', last_name='Ade', dob=date(1990, 1, 1),
+            state_of_origin='Oyo', lga_of_origin='Ibadan', date_of_enlistment=date(2012, 1, 1), rank='DII',
+        )
+        Assignment.objects.create(personnel=suspended, disposition='General Duty', status='SUSPENDED')
+        GuardDutyRoster.objects.create(personnel=suspended, date=date(2030, 1, 1), shift_type='DAY')
+        rules = {'slots_per_shift': {'DAY': 1, 'NIGHT': 0}, 'max_section_share': None}
+        result = solve_roster(date(2030, 1, 1), date(2030, 1, 2), rules, commit=False)
+        self.assertEqual(
+            [(duty['personnelId'], duty['date']) for duty in result['duties']],
+            [(self.person.service_number, date(2030, 1, 2))],
+        )
+        self.assertEqual(result['unfilled'], [])
+
+
+@override_settings(AUDIT_ASYNC=False)
+class RosterRepairTests(LeaveTestCase):
+    rules = {'max_section_share': None}
+
+    def setUp(self):
+        super().setUp()
+
+        def person(service_number):
+            return Personnel.objects.create(
+                service_number=service_number, first_name='A', last_name=service_number, dob=date(1990, 1, 1),
+                state_of_origin='Lagos', lga_of_origin='Ikeja', date_of_enlistment=date(2012, 1, 1), rank='DII',
+            )
+
+        self.recent, self.never = person('NA/11/0002'), person('NA/11/0003')
+        GuardDutyRoster.objects.create(personnel=self.recent, date=date(2029, 12, 1), shift_type='DAY')
+        self.duty = GuardDutyRoster.objects.create(personnel=self.person, date=date(2030, 1, 10), shift_type='DAY')
+
+    @mock.patch('personnel.rostering.REPAIR_POOL_PER_SLOT', 1)
+    def test_replacement_comes_from_the_least_recently_tasked(self):
+        changes = repair_roster(self.person.pk, date(2030, 1, 1), reason='LEAVE', leave=self.leave, rules=self.rules)
+        self.assertEqual(GuardDutyRoster.objects.get(pk=self.duty.pk).personnel_id, self.never.pk)
+        self.assertEqual(
+            list(RosterChange.objects.values_list(
+                'batch', 'roster_date', 'shift_type', 'removed_id', 'added_id', 'reason', 'leave_id'
+            )),
+            [(changes[0].batch, date(2030, 1, 10), 'DAY', self.person.pk, self.never.pk, 'LEAVE', self.leave.pk)],
+        )
+
+    @mock.patch('personnel.rostering.REPAIR_POOL_PER_SLOT', 1)
+    def test_only_the_top_of_the_pool_is_considered(self):
+        # The one candidate loaded is on leave; the next in line is never looked at
+        Leave.objects.create(
+            personnel=self.never, leave_type='ANNUAL', start_date=date(2030, 1, 8),
+            end_date=date(2030, 1, 12), reason='Rest', status='APPROVED',
+        )
+        repair_roster(self.person.pk, date(2030, 1, 1), reason='SUSPENDED', rules=self.rules)
+        self.assertFalse(GuardDutyRoster.objects.filter(pk=self.duty.pk).exists())
+        self.assertEqual(
+            list(RosterChange.objects.values_list('removed_id', 'added_id', 'reason')),
+            [(self.person.pk, None, 'SUSPENDED')],
+        )
+
+        GuardDutyRoster.objects.create(personnel=self.person, date=date(2030, 1, 10), shift_type='DAY')
+        with mock.patch('personnel.rostering.REPAIR_POOL_PER_SLOT', 2):
+            repair_roster(self.person.pk, date(2030, 1, 1), reason='SUSPENDED', rules=self.rules)
+        self.assertEqual(
+            list(GuardDutyRoster.objects.filter(date=date(2030, 1, 10)).values_list('personnel_id', flat=True)),
+            [self.recent.pk],
+        )
+
+
+@override_settings(AUDIT_ASYNC=False)
+class RosterFairnessTests(LeaveTestCase):
+    def test_mean_gap_and_untasked_personnel(self):
+        def person(service_number):
+            return Personnel.objects.create(
+                service_number=service_number, first_name='A', last_name=service_number, dob=date(1990, 1, 1),
+                state_of_origin='Lagos', lga_of_origin='Ikeja', date_of_enlistment=date(2012, 1, 1), rank='DII',
+            )
+
+        once, never = person('NA/11/0002'), person('NA/11/0003')
+        for day, shift in ((date(2030, 1, 1), 'DAY'), (date(2030, 1, 5), 'NIGHT'), (date(2030, 1, 11), 'DAY')):
+            GuardDutyRoster.objects.create(personnel=self.person, date=day, shift_type=shift)
+        GuardDutyRoster.objects.create(personnel=once, date=date(2030, 1, 3), shift_type='DAY')
+        # Outside the period
+        GuardDutyRoster.objects.create(personnel=never, date=date(2030, 2, 1), shift_type='DAY')
+
+        report = compute_roster_fairness(date(2030, 1, 1), date(2030, 1, 31))
+        self.assertEqual(
+            [(entry['personnelId'], entry['duties'], entry['nights'], entry['averageGapDays'])
+             for entry in report['personnel']],
+            [(self.person.pk, 3, 1, 5.0), (once.pk, 1, 0, None)],
+        )
+        self.assertEqual(report['personnel'][0]['nightShare'], round(1 / 3, 4))
+        summary = report['summary']
+        self.assertEqual(
+            (summary['forceSize'], summary['personnelTasked'], summary['totalDuties'], summary['totalNights']),
+            (3, 2, 4, 1),
+        )
+        # The untasked person counts as zero duties
+        self.assertEqual((summary['minDuties'], summary['maxMinRatio']), (0, None))
+        self.assertEqual(summary['meanDuties'], round(4 / 3, 4))
+
+
+@override_settings(AUDIT_ASYNC=False, RETIREMENT_AGE=60, RETIREMENT_SERVICE_YEARS=35)
+class RetirementForecastTests(LeaveTestCase):
+    def test_bucket_boundaries_and_order(self):
+        people = [
+            # (date of birth, date of enlistment)
+            (date(1971, 1, 2), date(2000, 1, 1)),   # retires a day after the horizon
+            (date(1971, 1, 1), date(2000, 1, 1)),   # on the horizon end: 2031-Q1
+            (date(1980, 1, 1), date(1995, 12, 31)),  # 35 years of service first: 2030-Q4
+            (date(1970, 4, 1), date(2000, 1, 1)),   # 2030-Q2
+            (date(1970, 3, 31), date(2000, 1, 1)),  # last day of 2030-Q1
+            (date(1970, 1, 1), date(2000, 1, 1)),   # on the forecast date itself: 2030-Q1
+            (date(1960, 6, 1), date(2000, 1, 1)),   # past retirement age already: OVERDUE
+        ]
+        for index, (dob, enlisted) in enumerate(people, start=2):
+            Personnel.objects.create(
+                service_number=f'NA/11/{index:04d}', first_name='A', last_name='B', dob=dob,
+                state_of_origin='Lagos', lga_of_origin='Ikeja', date_of_enlistment=enlisted, rank='DII',
+            )
+
+        forecast = retirement_forecast(1, on_date=date(2030, 1, 1))
+        self.assertEqual(forecast['horizonEnd'], date(2031, 1, 1))
+        self.assertEqual(forecast['total'], 6)
+        self.assertEqual(
+            [(row['quarter'], row['count']) for row in forecast['byQuarter']],
+            [('OVERDUE', 1), ('2030-Q1', 2), ('2030-Q2', 1), ('2030-Q4', 1), ('2031-Q1', 1)],
+        )
+        self.assertEqual(
+            [row['quarter'] for row in forecast['buckets']], ['OVERDUE', '2030-Q1', '2030-Q2', '2030-Q4', '2031-Q1']
+        )
+
+
+@override_settings(AUDIT_ASYNC=False)
+class ServiceIntervalTests(LeaveTestCase):
+    def section_on(self, on_date):
+        return dict(
+            personnel_as_of(Personnel.objects.all(), on_date).values_list('pk', 'as_of_section')
+        ).get(self.person.pk, 'off roll')
+
+    def test_as_of_answers_follow_posting_changes(self):
+        department = Department.objects.create(name='Operations')
+        guards = Section.objects.create(name='Guards', department=department)
+        signals = Section.objects.create(name='Signals', department=department)
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.create(
+                personnel=self.person, section=guards, disposition='General Duty', date_of_posting=date(2015, 1, 1)
+            )
+            posting = Assignment.objects.create(
+                personnel=self.person, section=signals, disposition='Operator', date_of_posting=date(2028, 1, 1)
+            )
+        self.assertEqual(
+            [self.section_on(day) for day in (date(2011, 1, 1), date(2013, 1, 1), date(2027, 1, 1), date(2029, 1, 1))],
+            ['off roll', None, 'Guards', 'Signals'],
+        )
+
+        # Back-dating the later posting moves the boundary
+        posting.date_of_posting = date(2026, 1, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            posting.save()
+        self.assertEqual(
+            [self.section_on(day) for day in (date(2025, 12, 31), date(2026, 1, 1), date(2027, 1, 1))],
+            ['Guards', 'Signals', 'Signals'],
+        )
+
+        # A rebuild from scratch gives the same history
+        ServiceInterval.objects.all().delete()
+        self.assertEqual(rebuild_service_intervals([self.person.pk]), 3)
+        self.assertEqual(self.section_on(date(2025, 12, 31)), 'Guards')
+        response = self.client.get('/api/personnel/', {'as_of': '2027-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([person['section'] for person in response.data], ['Signals'])
+
+
+@override_settings(AUDIT_ASYNC=False)
+class LeaveLedgerTests(LeaveTestCase):
+    def balance(self):
+        return LeaveBalance.objects.filter(
+            personnel=self.person, leave_type='ANNUAL', year=2030
+        ).values_list('taken', 'reserved').get()
+
+    def update(self, **fields):
+        leave = Leave.objects.get(pk=self.leave.pk)
+        for name, value in fields.items():
+            setattr(leave, name, value)
+        leave.save()
+        return leave
+
+    def test_working_days_skip_weekends_and_holidays(self):
+        # Friday to the Monday after next
+        self.assertEqual(working_days(date(2030, 3, 1), date(2030, 3, 11)), 7)
+        Holiday.objects.create(date=date(2030, 3, 6), name='Midweek')
+        Holiday.objects.create(date=date(2030, 3, 9), name='On a Saturday')
+        self.assertEqual(working_days(date(2030, 3, 1), date(2030, 3, 11)), 6)
+        self.assertEqual(working_days(date(2030, 3, 9), date(2030, 3, 10)), 0)
+
+    def test_transitions_move_days_between_columns(self):
+        self.assertEqual(self.balance(), (0, 5))
+        self.update(status='APPROVED')
+        self.assertEqual(self.balance(), (5, 0))
+        # Monday to the Tuesday after: seven working days
+        self.update(end_date=date(2030, 3, 12))
+        self.assertEqual(self.balance(), (7, 0))
+        self.update(status='CANCELLED')
+        self.assertEqual(self.balance(), (0, 0))
+
+    def test_recount_loads_holidays_once(self):
+        Holiday.objects.create(date=date(2030, 3, 6), name='Midweek')
+        Leave.objects.create(
+            personnel=self.person, leave_type='CASUAL', start_date=date(2030, 4, 1),
+            end_date=date(2030, 4, 2), reason='Errand',
+        )
+        Leave.objects.update(days_count=9)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(recount_leave_days(), 2)
+        # Once for the recount and once for the usage rollup refresh, however many leaves
+        self.assertEqual(len([query for query in queries if 'personnel_holiday' in query['sql']]), 2)
+        self.assertEqual(Leave.objects.get(pk=self.leave.pk).days_count, 4)
+
+    def test_delete_removes_the_leave(self):
+        self.update(status='APPROVED').delete()
+        self.assertEqual(self.balance(), (0, 0))
+
+
+@override_settings(AUDIT_ASYNC=False)
+class ArchiveTests(LeaveTestCase):
+    def setUp(self):
+        super().setUp()
+        for start in (date(2021, 2, 1), date(2020, 1, 6)):
+            Leave.objects.create(
+                personnel=self.person, leave_type='ANNUAL', start_date=start,
+                end_date=start + timedelta(days=4), reason='Rest', status='COMPLETED',
+            )
+        for day in (date(2020, 1, 1), date(2030, 1, 1)):
+            GuardDutyRoster.objects.create(personnel=self.person, date=day, shift_type='DAY')
+
+    def test_old_history_moves_to_the_archive(self):
+        self.assertEqual(archive_history(today=date(2026, 10, 19)), {'guardDuties': 1, 'leaves': 2})
+        self.assertEqual(list(Leave.objects.values_list('pk', flat=True)), [self.leave.pk])
+        self.assertEqual(list(GuardDutyRoster.objects.values_list('date', flat=True)), [date(2030, 1, 1)])
+        self.assertEqual(list(ArchivedGuardDuty.objects.values_list('date', flat=True)), [date(2020, 1, 1)])
+        # Archived leave still counts towards its year
+        rebuild_leave_balances()
+        self.assertEqual(
+            LeaveBalance.objects.get(personnel=self.person, leave_type='ANNUAL', year=2020).taken, 5
+        )
+
+    def test_archived_duties_still_count_as_last_duty(self):
+        def person(service_number):
+            return Personnel.objects.create(
+                service_number=service_number, first_name='A', last_name=service_number, dob=date(1990, 1, 1),
+                state_of_origin='Lagos', lga_of_origin='Ikeja', date_of_enlistment=date(2012, 1, 1), rank='DII',
+            )
+
+        tasked, never = person('NA/11/0000'), person('NA/11/0009')
+        GuardDutyRoster.objects.create(personnel=tasked, date=date(2020, 6, 1), shift_type='DAY')
+        archive_history(today=date(2026, 10, 19))
+        last_duty = dict(with_last_duty(Personnel.objects.all()).values_list('pk', 'last_duty_date'))
+        self.assertEqual(
+            last_duty, {self.person.pk: date(2030, 1, 1), tasked.pk: date(2020, 6, 1), never.pk: None}
+        )
+        rules = {'slots_per_shift': {'DAY': 1, 'NIGHT': 0}, 'max_section_share': None}
+        result = solve_roster(date(2027, 1, 4), date(2027, 1, 4), rules, commit=False)
+        self.assertEqual([duty['personnelId'] for duty in result['duties']], [never.pk])
+
+    def test_listing_merges_both_tiers_in_order(self):
+        archive_history(today=date(2026, 10, 19))
+        self.assertEqual(ArchivedLeave.objects.count(), 2)
+        response = self.client.get('/api/leaves/', {'start_date': '2019-01-01', 'ordering': 'start_date'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [leave['startDate'] for leave in response.data], ['2020-01-06', '2021-02-01', '2030-03-04']
+        )
+        response = self.client.get('/api/leaves/', {'start_date': '2021-01-01', 'ordering': '-start_date'})
+        self.assertEqual([leave['startDate'] for leave in response.data], ['2030-03-04', '2021-02-01'])
+
+
+@override_settings(AUDIT_ASYNC=False)
+class LeaveUsageReportTests(LeaveTestCase):
+    def test_recount_refreshes_the_rollup(self):
+        # Recorded before the ledger counted working days, and never rolled up
+        Leave.objects.filter(pk=self.leave.pk).update(status='APPROVED', days_count=7)
+        LeaveUsage.objects.all().delete()
+        self.assertEqual(recount_leave_days(), 1)
+        self.assertEqual(
+            list(LeaveUsage.objects.values_list('month', 'leaves', 'days')), [(date(2030, 3, 1), 1, 5)]
+        )
+
+    def test_non_numeric_section_or_department_is_a_bad_request(self):
+        for name in ('section', 'department'):
+            response = self.client.get('/api/reports/leave-usage/', {name: 'abc'})
+            self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/reports/leave-usage/', {'section': '1', 'department': '2'})
+        self.assertEqual(response.status_code, 200)
+
+
+@mock.patch('personnel.db_router.replica_aliases', return_value=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_safe_reads_go_to_a_replica_until_the_first_write(self, aliases):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Personnel), 'default')
+        with use_replicas():
+            self.assertEqual(router.db_for_read(Personnel), 'replica1')
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_write(Personnel), 'default')
+            self.assertTrue(wrote_to_primary())
+            self.assertEqual(router.db_for_read(Personnel), 'default')
+
+
+@override_settings(AUDIT_ASYNC=False)
+class ReplicaPinTests(LeaveTestCase):
+    @mock.patch('personnel.middleware.replica_aliases', return_value=['replica1'])
+    def test_writer_is_pinned_to_the_primary(self, aliases):
+        response = self.client.patch(self.url(), {'reason': 'Travel'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pms_primary', response.cookies)
+
+
+@skipUnless('replica1' in settings.DATABASES, 'needs a second database alias (SQLITE_REPLICA=1)')
+@override_settings(AUDIT_ASYNC=False)
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        LeaveTestCase.make_leave(self)
+
+    def test_reads_use_the_replica_until_the_client_writes(self):
+        url = f'/api/leaves/{self.leave.pk}/'
+        reset_query_load()
+        self.assertEqual(self.client.get(url).status_code, 200)
+        replica_reads = query_load()['queries'].get('replica1', 0)
+        self.assertGreater(replica_reads, 0)
+
+        response = self.client.patch(url, {'reason': 'Travel'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pms_primary', response.cookies)
+        self.assertEqual(self.client.get(url).data['reason'], 'Travel')
+        self.assertEqual(query_load()['queries'].get('replica1', 0), replica_reads)
+
+
+@override_settings(AUDIT_ASYNC=False)
+class SnapshotTests(LeaveTestCase):
+    def setUp(self):
+        super().setUp()
+        section = Section.objects.create(name='Guards', department=Department.objects.create(name='Operations'))
+        Assignment.objects.create(personnel=self.person, section=section, disposition='General Duty')
+        GuardDutyRoster.objects.create(personnel=self.person, date=date.today(), shift_type='NIGHT')
+        handle, self.path = tempfile.mkstemp(suffix='.snap.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_round_trip(self):
+        def contents():
+            return [
+                list(Personnel.objects.values()),
+                list(Assignment.objects.values('personnel_id', 'section__name', 'section__department__name')),
+                list(GuardDutyRoster.objects.values('personnel_id', 'date', 'shift_type')),
+            ]
+
+        before = contents()
+        counts = export_snapshot(self.path)
+        self.assertEqual(counts['personnel.personnel'], 1)
+        # Loading with replace empties the tables first, so the snapshot is the whole fixture
+        self.assertEqual(load_snapshot(self.path, replace=True), counts)
+        self.assertEqual(contents(), before)
+
+    def test_refuses_populated_tables(self):
+        export_snapshot(self.path)
+        with self.assertRaisesMessage(SnapshotError, 'use --replace'):
+            load_snapshot(self.path)
+
+
+class QueryDetectorTests(LeaveTestCase):
+    def test_repeated_query_raises_in_strict_mode(self):
+        with self.assertRaises(RepeatedQueryError), self.assertLogs('personnel.query_detector', 'WARNING'):
+            with detect_repeated_queries(threshold=2, strict=True):
+                for pk in range(3):
+                    Leave.objects.filter(pk=pk).exists()
+
+    def test_queries_within_the_threshold_pass(self):
+        with detect_repeated_queries(threshold=2, strict=True) as counter:
+            for pk in range(2):
+                Leave.objects.filter(pk=pk).exists()
+        self.assertEqual(counter.repeated(), [])
+
+
+@override_settings(AUDIT_ASYNC=False)
+class StartupTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(autocomplete.rebuild_everywhere)
+
+    def test_warm_up_runs_on_an_empty_database(self):
+        # A transaction test, since warm-up closes the database connections
+        with self.assertNoLogs('personnel.warmup', level='ERROR'):
+            timings = warm_up()
+        self.assertEqual(list(timings), [name for name, _ in WARM_UP_STEPS])
+        self.assertEqual(Personnel.objects.count(), 0)
+
+    def test_startup_profile_reports_imports_and_requests(self):
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.dict(os.environ, {'CACHE_LOCATION': cache_dir}):
+            call_command('startup_profile', '--url', '/api/', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertGreater(report['modules'], 0)
+        self.assertTrue(report['packages'])
+        self.assertEqual(report['warmUp'], {})
+        self.assertEqual([(entry['url'], entry['status']) for entry in report['requests']], [('/api/', 200)])
+
+
+@override_settings(PROFILER_KEEP=0)
+class ProfilerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def login(self, is_staff):
+        user = User.objects.create_user('clerk', password='x', is_staff=is_staff)
+        self.client.force_login(user)
+
+    def test_non_staff_get_the_normal_response(self):
+        # Anonymous first, then a logged-in user without staff status
+        for login in (lambda: None, lambda: self.login(is_staff=False)):
+            login()
+            response = self.client.get('/api/dashboard/', {'_profile': '1'}, HTTP_X_PROFILE='1')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('headcount', response.json())
+            self.assertNotIn('folded', response.json())
+
+    def test_staff_get_the_profile(self):
+        self.login(is_staff=True)
+        profile = self.client.get('/api/dashboard/', {'_profile': '1'}).json()
+        self.assertEqual(
+            (profile['method'], profile['path'], profile['status'], profile['user']),
+            ('GET', '/api/dashboard/?_profile=1', 200, 'clerk'),
+        )
+        self.assertEqual(profile['queryCount'], len(profile['queries']))
+        self.assertGreater(profile['queryCount'], 0)
+        self.assertIn('folded', profile)
+        self.assertFalse(profile['kept'])
+
+        response = self.client.get('/api/dashboard/', HTTP_X_PROFILE='folded')
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertNotIn(b'headcount', response.content)
+
+    def test_basic_auth_staff_are_recognised(self):
+        User.objects.create_user('clerk', password='x', is_staff=True)
+        credentials = base64.b64encode(b'clerk:x').decode()
+        response = self.client.get('/api/dashboard/', {'_profile': '1'}, HTTP_AUTHORIZATION=f'Basic {credentials}')
+        self.assertEqual(response.json()['status'], 200)
+        self.assertIn('queries', response.json())
+
+
+class CommandChainTests(TestCase):
+    def person(self, service_number):
+        return Personnel.objects.create(
+            service_number=service_number, first_name='A', last_name=service_number, dob=date(1980, 1, 1),
+            state_of_origin='Lagos', lga_of_origin='Ikeja', date_of_enlistment=date(2000, 1, 1), rank='DI',
+        )
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ops = Department.objects.create(name='Operations', head=self.person('H1'))
+            self.admin = Department.objects.create(name='Admin', head=self.person('H2'))
+            self.guards = Section.objects.create(name='Guards', department=self.ops, principal_officer=self.person('P1'))
+            self.clerks = Section.objects.create(name='Clerks', department=self.admin, principal_officer=self.person('P2'))
+            self.member = self.person('M1')
+            Assignment.objects.create(
+                personnel=self.member, section=self.guards, disposition='General Duty', date_of_posting=date(2020, 1, 1)
+            )
+
+    def superiors(self, service_number):
+        return [entry['serviceNumber'] for entry in chain_of(service_number)]
+
+    def assertMatchesRebuild(self):
+        def rows():
+            return sorted(CommandChain.objects.values_list('superior_id', 'subordinate_id', 'depth'))
+
+        maintained = rows()
+        rebuild_chain()
+        self.assertEqual(maintained, rows())
+
+    def test_new_head_moves_the_department_subtree(self):
+        self.assertEqual(self.superiors('M1'), ['P1', 'H1'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ops.head = self.person('H3')
+            self.ops.save()
+        self.assertEqual(self.superiors('M1'), ['P1', 'H3'])
+        self.assertMatchesRebuild()
+
+    def test_new_principal_officer_takes_over_the_section(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.guards.principal_officer = self.person('P3')
+            self.guards.save()
+        self.assertEqual(self.superiors('M1'), ['P3', 'H1'])
+        self.assertMatchesRebuild()
+
+    def test_posting_moves_the_person(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.create(
+                personnel=self.member, section=self.clerks, disposition='Clerk', date_of_posting=date(2024, 1, 1)
+            )
+        self.assertEqual(self.superiors('M1'), ['P2', 'H2'])
+        self.assertMatchesRebuild()
+
+
+class JobTests(TestCase):
+    def test_result_of_a_job_taken_over_by_another_worker_is_dropped(self):
+        def taken_over(job, params):
+            # The job was re-queued as stale and claimed by a second worker meanwhile
+            Job.objects.filter(pk=job.pk).update(status='PENDING', worker='')
+            claim_next_job('other:1')
+            return {'ran': 'first'}
+
+        with mock.patch.dict(JOB_HANDLERS, {'test.slow': taken_over}):
+            enqueue('test.slow')
+            job = claim_next_job('first:1')
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.result), ('RUNNING', 'other:1', None))
+
+    def test_owner_stores_its_result(self):
+        with mock.patch.dict(JOB_HANDLERS, {'test.quick': lambda job, params: {'ok': True}}):
+            enqueue('test.quick')
+            job = claim_next_job('first:1')
+            self.assertTrue(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('SUCCEEDED', {'ok': True}))
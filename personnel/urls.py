@@ -1,11 +1,27 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .api_views import PersonnelViewSet, SectionViewSet, LeaveViewSet
+from .api_views import (
+    PersonnelViewSet, SectionViewSet, LeaveViewSet, GuardDutyRosterViewSet,
+    JobViewSet, ReportViewSet, PromotionEligibilityViewSet, OrgViewSet,
+    AuditEntryViewSet, DashboardViewSet, AttachmentViewSet, FileViewSet, BatchViewSet,
+    ProfileViewSet
+)
 
 router = DefaultRouter()
 router.register(r'personnel', PersonnelViewSet)
 router.register(r'sections', SectionViewSet)
 router.register(r'leaves', LeaveViewSet)
+router.register(r'rosters', GuardDutyRosterViewSet)
+router.register(r'jobs', JobViewSet)
+router.register(r'reports', ReportViewSet, basename='reports')
+router.register(r'promotions', PromotionEligibilityViewSet)
+router.register(r'org', OrgViewSet, basename='org')
+router.register(r'audit', AuditEntryViewSet)
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'attachments', AttachmentViewSet)
+router.register(r'files', FileViewSet, basename='files')
+router.register(r'batch', BatchViewSet, basename='batch')
+router.register(r'profiles', ProfileViewSet, basename='profiles')
 
 urlpatterns = [
     path('', include(router.urls)),
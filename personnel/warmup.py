@@ -0,0 +1,80 @@
+"""
+Warm-up for application servers, so the first requests a worker serves are as
+fast as the rest.
+
+warm_up() pays the one-off costs that otherwise land on the first request:
+URL resolver population, model metadata caches, building every serializer's
+fields, and filling the reference-data caches (autocomplete index, dashboard).
+It is run from config/wsgi.py when WARM_UP_ON_START is set. Under gunicorn with
+preload_app (see gunicorn.conf.py) that happens once in the master, and every
+worker - including those restarted later - is forked already warm.
+"""
+import inspect
+import logging
+import time
+
+from django.apps import apps
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework import serializers as drf_serializers
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve_urls():
+    resolver = get_resolver()
+    # Touching reverse_dict populates the resolver for every namespace
+    resolver.reverse_dict
+    for pattern in resolver.url_patterns:
+        getattr(pattern, 'url_patterns', None)
+
+
+def _model_meta():
+    for model in apps.get_models():
+        meta = model._meta
+        meta.get_fields()
+        meta._relation_tree
+        for field in meta.concrete_fields:
+            if field.choices:
+                field.flatchoices
+
+
+def _serializers():
+    from . import serializers
+    for _, serializer_class in inspect.getmembers(serializers, inspect.isclass):
+        if issubclass(serializer_class, drf_serializers.Serializer) and serializer_class.__module__ == serializers.__name__:
+            serializer_class().fields
+
+
+def _reference_data():
+    from . import autocomplete
+    from .services import dashboard_summary
+    autocomplete.search('a')
+    dashboard_summary()
+
+
+WARM_UP_STEPS = [
+    ('urls', _resolve_urls),
+    ('models', _model_meta),
+    ('serializers', _serializers),
+    ('referenceData', _reference_data),
+]
+
+
+def warm_up():
+    """
+    Run every warm-up step and return {step: milliseconds}. A failing step is
+    logged and skipped - warm-up must never stop a server from starting.
+    Database connections are closed at the end so forked workers open their own.
+    """
+    timings = {}
+    for name, step in WARM_UP_STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step '%s' failed", name)
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    connections.close_all()
+    logger.info("Warm-up finished: %s", timings)
+    return timings
@@ -21,9 +21,9 @@ import {
   ArrowRightLeft,
   Settings
 } from 'lucide-react';
-import { Personnel, LeaveRecord, DutyAssignment, User, DutyType, Rank, Shift, PersonnelFormData, SectionData, LeaveFormData } from './types';
+import { Personnel, LeaveRecord, DutyAssignment, User, DutyType, Rank, Shift, PersonnelFormData, SectionData, LeaveFormData, DashboardSummary } from './types';
 import { mockLeaves, mockDuties } from './mockData';
-import { getPersonnel, createPersonnel, getSections, getLeaves, createLeave, approveLeave, rejectLeave, cancelLeave } from './api';
+import { getPersonnel, createPersonnel, getSections, getLeaves, getDashboard, createLeave, approveLeave, rejectLeave, cancelLeave } from './api';
 import { generateSmartRoster } from './geminiService';
 
 const ThemeContext = createContext({ isDarkMode: false, toggleTheme: () => { } });
@@ -160,8 +160,10 @@ const PersonnelDetailView: React.FC<{ personnel: Personnel; onBack: () => void }
       <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
         <div className="md:col-span-1">
           <div className={`rounded-xl shadow-sm border p-6 flex flex-col items-center text-center ${isDarkMode ? 'bg-[#333333] border-[#333333]' : 'bg-white border-[#D1D3D4]'}`}>
-            <div className={`w-32 h-32 rounded-full flex items-center justify-center text-4xl font-bold mb-4 ${isDarkMode ? 'bg-[#1A1A1B] text-white' : 'bg-[#D1D3D4]/30 text-[#333333]'}`}>
-              {personnel.firstName[0]}{personnel.lastName[0]}
+            <div className={`w-32 h-32 rounded-full overflow-hidden flex items-center justify-center text-4xl font-bold mb-4 ${isDarkMode ? 'bg-[#1A1A1B] text-white' : 'bg-[#D1D3D4]/30 text-[#333333]'}`}>
+              {personnel.photo?.['256']
+                ? <img src={personnel.photo['256']} alt="" className="w-full h-full object-cover" />
+                : <>{personnel.firstName[0]}{personnel.lastName[0]}</>}
             </div>
             <h2 className={`text-xl font-bold ${isDarkMode ? 'text-white' : 'text-[#333333]'}`}>{personnel.rank} {personnel.lastName}</h2>
             <p className={`font-medium ${isDarkMode ? 'text-[#D1D3D4]' : 'text-[#333333]/60'}`}>{personnel.serviceId}</p>
@@ -263,14 +265,20 @@ const TransfersView: React.FC = () => {
 };
 
 const DashboardView: React.FC<{
-  personnel: Personnel[],
-  leaves: LeaveRecord[],
   duties: DutyAssignment[],
   onViewTransfers: () => void
-}> = ({ personnel, leaves, duties, onViewTransfers }) => {
+}> = ({ duties, onViewTransfers }) => {
   const { isDarkMode } = useContext(ThemeContext);
-  const activePersonnel = personnel.filter(p => p.status === 'Active').length;
-  const onLeave = leaves.filter(l => l.status === 'Approved').length;
+  const [summary, setSummary] = useState<DashboardSummary | null>(null);
+
+  useEffect(() => {
+    getDashboard().then(setSummary);
+  }, []);
+
+  const totalPersonnel = summary?.headcount.total ?? 0;
+  const onLeave = summary?.leaves.onLeaveToday ?? 0;
+  const dutyPosts = summary ? summary.guardDuty.shifts.reduce((sum, s) => sum + s.assigned, 0) : 0;
+  const coverage = summary?.guardDuty.coverage;
   const today = new Array(24).fill(0); // mock distribution
 
   return (
@@ -284,7 +292,7 @@ const DashboardView: React.FC<{
             <span className="text-xs font-bold text-[#EF2B33] bg-[#EF2B33]/10 px-2 py-1 rounded">Active</span>
           </div>
           <p className={`text-sm font-medium ${isDarkMode ? 'text-[#D1D3D4]' : 'text-[#333333]/70'}`}>Total Personnel</p>
-          <h2 className={`text-3xl font-bold ${isDarkMode ? 'text-white' : 'text-[#333333]'}`}>{personnel.length}</h2>
+          <h2 className={`text-3xl font-bold ${isDarkMode ? 'text-white' : 'text-[#333333]'}`}>{totalPersonnel}</h2>
         </div>
 
         <div className={`p-6 rounded-xl border shadow-sm ${isDarkMode ? 'bg-[#333333] border-[#333333]' : 'bg-white border-[#D1D3D4]'}`}>
@@ -306,7 +314,7 @@ const DashboardView: React.FC<{
             <span className={`text-xs font-bold px-2 py-1 rounded ${isDarkMode ? 'text-[#D1D3D4] bg-[#1A1A1B]/50' : 'text-[#1A1A1B] bg-[#1A1A1B]/10'}`}>24h Ops</span>
           </div>
           <p className={`text-sm font-medium ${isDarkMode ? 'text-[#D1D3D4]' : 'text-[#333333]/70'}`}>Active Duty Posts</p>
-          <h2 className={`text-3xl font-bold ${isDarkMode ? 'text-white' : 'text-[#333333]'}`}>12</h2>
+          <h2 className={`text-3xl font-bold ${isDarkMode ? 'text-white' : 'text-[#333333]'}`}>{dutyPosts}</h2>
         </div>
 
         <div className={`p-6 rounded-xl border shadow-sm ${isDarkMode ? 'bg-[#333333] border-[#333333]' : 'bg-white border-[#D1D3D4]'}`}>
@@ -315,8 +323,8 @@ const DashboardView: React.FC<{
               <Activity size={20} />
             </div>
           </div>
-          <p className={`text-sm font-medium ${isDarkMode ? 'text-[#D1D3D4]' : 'text-[#333333]/70'}`}>Readiness Level</p>
-          <h2 className={`text-3xl font-bold ${isDarkMode ? 'text-white' : 'text-[#333333]'}`}>94%</h2>
+          <p className={`text-sm font-medium ${isDarkMode ? 'text-[#D1D3D4]' : 'text-[#333333]/70'}`}>Guard Coverage Today</p>
+          <h2 className={`text-3xl font-bold ${isDarkMode ? 'text-white' : 'text-[#333333]'}`}>{coverage != null ? `${coverage}%` : '—'}</h2>
         </div>
       </div>
 
@@ -839,7 +847,16 @@ const PersonnelView: React.FC<{ personnel: Personnel[]; onView: (id: string) =>
             {filtered.map(p => (
               <tr key={p.id} className={`transition-colors ${isDarkMode ? 'hover:bg-[#1A1A1B]/30' : 'hover:bg-[#D1D3D4]/10'}`}>
                 <td className={`px-6 py-4 text-sm font-medium ${isDarkMode ? 'text-[#D1D3D4]' : 'text-[#333333]/80'}`}>{p.serviceId}</td>
-                <td className={`px-6 py-4 text-sm font-bold ${isDarkMode ? 'text-white' : 'text-[#333333]'}`}>{p.firstName} {p.lastName}</td>
+                <td className={`px-6 py-4 text-sm font-bold ${isDarkMode ? 'text-white' : 'text-[#333333]'}`}>
+                  <div className="flex items-center space-x-3">
+                    <div className={`w-8 h-8 rounded-full overflow-hidden flex items-center justify-center text-[10px] font-bold ${isDarkMode ? 'bg-[#1A1A1B] text-[#D1D3D4]' : 'bg-[#D1D3D4]/30 text-[#333333]'}`}>
+                      {p.photo?.['64']
+                        ? <img src={p.photo['64']} alt="" loading="lazy" className="w-full h-full object-cover" />
+                        : <>{p.firstName[0]}{p.lastName[0]}</>}
+                    </div>
+                    <span>{p.firstName} {p.lastName}</span>
+                  </div>
+                </td>
                 <td className={`px-6 py-4 text-sm ${isDarkMode ? 'text-[#D1D3D4]' : 'text-[#333333]/80'}`}>
                   <span className={`px-2 py-1 rounded text-xs font-semibold ${isDarkMode ? 'bg-[#1A1A1B] text-[#D1D3D4]' : 'bg-[#D1D3D4]/30'}`}>{p.rank}</span>
                 </td>
@@ -1161,8 +1178,6 @@ export default function App() {
             {activeTab === 'home' && <HomeView />}
             {activeTab === 'dashboard' && (
               <DashboardView
-                personnel={personnelData}
-                leaves={mockLeaves}
                 duties={mockDuties}
                 onViewTransfers={() => setActiveTab('transfers')}
               />
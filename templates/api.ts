@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { Personnel, LeaveRecord, DutyAssignment, PersonnelFormData, SectionData, LeaveFormData } from './types';
+import { Personnel, LeaveRecord, DutyAssignment, PersonnelFormData, SectionData, LeaveFormData, DashboardSummary, BatchResult } from './types';
 
 // In Docker, 'localhost' refers to the container itself. 
 // When browser accesses it, it refers to the user's machine.
@@ -13,6 +13,14 @@ export const api = axios.create({
     },
 });
 
+// Several GETs in one round trip (POST /api/batch/); paths are relative to the API, e.g. '/sections/'
+export const batchGet = async (paths: string[]): Promise<BatchResult[]> => {
+    const response = await api.post('/batch/', {
+        requests: paths.map(path => ({ method: 'GET', url: `/api${path}` })),
+    });
+    return response.data;
+};
+
 export const getPersonnel = async (searchQuery?: string): Promise<Personnel[]> => {
     try {
         const params = searchQuery ? { search: searchQuery } : {};
@@ -52,6 +60,16 @@ export const getSections = async (): Promise<SectionData[]> => {
 };
 
 // Leave Management API
+export const getDashboard = async (): Promise<DashboardSummary | null> => {
+    try {
+        const response = await api.get('/dashboard/');
+        return response.data;
+    } catch (error) {
+        console.error("Failed to fetch dashboard:", error);
+        return null;
+    }
+};
+
 export const getLeaves = async (filters?: { status?: string; personnel?: string }): Promise<LeaveRecord[]> => {
     try {
         const params = filters || {};
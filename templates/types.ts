@@ -53,6 +53,8 @@ export interface Personnel {
   section: string;
   status: 'Active' | 'On Leave' | 'Suspended' | 'Retired';
   joinedDate: string;
+  // Thumbnail URLs of the passport photo by size in px; null until generated
+  photo?: Record<string, string> | null;
 }
 
 export interface PersonnelFormData {
@@ -105,6 +107,19 @@ export interface DutyAssignment {
   assignedAt: string;
 }
 
+export interface DashboardSummary {
+  date: string;
+  headcount: { total: number; byStatus: Record<string, number> };
+  leaves: { pending: number; approved: number; onLeaveToday: number };
+  guardDuty: {
+    shifts: { shift: string; required: number; assigned: number }[];
+    coverage: number | null;
+  };
+  sectionStrength: { id: number; name: string; department: string | null; strength: number }[];
+  unassigned: number;
+  generatedAt: string;
+}
+
 export interface TransferHistory {
   id: string;
   personnelId: string;
@@ -120,3 +135,9 @@ export interface User {
   role: 'Administrator' | 'Viewer';
 }
 
+
+export interface BatchResult<T = unknown> {
+  status: number;
+  body: T;
+  headers?: Record<string, string>;
+}